@@ -16,4 +16,19 @@ class CookieJWTAuthentication(BaseAuthentication):
             user = User.objects.get(pk=user_id)
         except Exception:
             raise exceptions.AuthenticationFailed('Invalid or expired token.')
-        return (user, token)
\ No newline at end of file
+        return (user, token)
+
+
+async def authenticate_async(request):
+    """
+    Async counterpart of CookieJWTAuthentication for the ASGI views, which run outside DRF
+    Returns the user or None without a cookie, raises AuthenticationFailed for a bad token
+    """
+    token = request.COOKIES.get('access_token')
+    if not token:
+        return None
+    try:
+        payload = decode_token(token, expected_type='access')
+        return await User.objects.aget(pk=payload.get('sub'))
+    except Exception:
+        raise exceptions.AuthenticationFailed('Invalid or expired token.')
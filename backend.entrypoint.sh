@@ -39,6 +39,26 @@ else:
     print(f"Superuser '{username}' already exists.")
 EOF
 
-python manage.py rqworker default &
+python manage.py run_workers --health-file /tmp/videoflix-workers.json &
+WORKERS_PID=$!
 
-exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 --reload
+# SERVER_MODE=asgi: uvicorn workers serve the async video views, slow segment downloads no longer pin a worker
+if [ "$SERVER_MODE" = "asgi" ]; then
+  gunicorn core.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000 --reload &
+else
+  gunicorn core.wsgi:application --bind 0.0.0.0:8000 --reload &
+fi
+SERVER_PID=$!
+
+# This shell is PID 1: pass docker stop's SIGTERM on to gunicorn and the worker supervisor,
+# so running transcodes get RQ_WORKER_SHUTDOWN_TIMEOUT seconds to finish instead of being killed
+trap 'kill -TERM "$SERVER_PID" "$WORKERS_PID" 2>/dev/null' TERM INT
+
+set +e
+wait "$SERVER_PID"
+STATUS=$?
+# Either a signal interrupted the wait or gunicorn exited on its own, stop the supervisor in both cases
+kill -TERM "$WORKERS_PID" 2>/dev/null
+wait "$SERVER_PID"
+wait "$WORKERS_PID"
+exit $STATUS
@@ -84,6 +84,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
+# 'asgi' serves the video list, playlist and segment endpoints with async views (gunicorn + uvicorn workers
+# on core.asgi, see backend.entrypoint.sh); 'wsgi' keeps the sync DRF views under gunicorn sync workers
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
 
 DATABASES = {
     "default": {
@@ -107,16 +111,89 @@ CACHES = {
     }
 }
 
+RQ_CONNECTION = {
+    'HOST': os.environ.get("REDIS_HOST", default="redis"),
+    'PORT': os.environ.get("REDIS_PORT", default=6379),
+    'DB': os.environ.get("REDIS_DB", default=0),
+    'REDIS_CLIENT_KWARGS': {},
+}
+
+# Jobs are routed by kind and cost: account emails, short and long transcodes, housekeeping
 RQ_QUEUES = {
-    'default': {
-        'HOST': os.environ.get("REDIS_HOST", default="redis"),
-        'PORT': os.environ.get("REDIS_PORT", default=6379),
-        'DB': os.environ.get("REDIS_DB", default=0),
-        'DEFAULT_TIMEOUT': 900,
-        'REDIS_CLIENT_KWARGS': {},
-    },
+    'default': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
+    'emails': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 60},
+    'video_short': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
+    'video_long': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 3600},
+    'maintenance': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
 }
 
+# Workers listening on several queues serve them by smooth weighted round robin:
+# out of 20 consecutive jobs, 10 come from 'emails' whenever it has work waiting
+RQ = {'WORKER_CLASS': 'core.workers.WeightedWorker'}
+RQ_QUEUE_WEIGHTS = {'emails': 10, 'video_short': 5, 'default': 2, 'video_long': 2, 'maintenance': 1}
+
+# Worker pool started by 'manage.py run_workers': N warm workers recycled after RQ_WORKER_MAX_JOBS jobs
+RQ_WORKERS = int(os.getenv('RQ_WORKERS', 2))
+RQ_WORKER_MAX_JOBS = int(os.getenv('RQ_WORKER_MAX_JOBS', 50))
+RQ_WORKER_QUEUES = os.getenv('RQ_WORKER_QUEUES', 'emails,video_short,video_long,maintenance,default').split(',')
+RQ_WORKER_SHUTDOWN_TIMEOUT = float(os.getenv('RQ_WORKER_SHUTDOWN_TIMEOUT', 300))
+RQ_WORKER_RESPAWN_DELAY = 1
+# Imported once by the supervisor so forked workers and their work horses start warm
+RQ_WORKER_PRELOAD = ['video_app.tasks', 'video_app.cleanup', 'auth_app.tasks']
+
+# Transcodes estimated to cost more than this many 720p-equivalent seconds go to 'video_long'
+VIDEO_LONG_COST = float(os.getenv('VIDEO_LONG_COST', 1800))
+
+# Video job timeout: base seconds plus factor times the encode cost, so long sources are not killed while healthy
+VIDEO_JOB_TIMEOUT_BASE = int(os.getenv('VIDEO_JOB_TIMEOUT_BASE', 300))
+VIDEO_JOB_TIMEOUT_FACTOR = float(os.getenv('VIDEO_JOB_TIMEOUT_FACTOR', 3))
+# Failed video jobs are retried after VIDEO_JOB_RETRY_DELAY, 2x, 4x ... seconds, then land in the FailedTask table
+VIDEO_JOB_RETRIES = int(os.getenv('VIDEO_JOB_RETRIES', 3))
+VIDEO_JOB_RETRY_DELAY = int(os.getenv('VIDEO_JOB_RETRY_DELAY', 60))
+
+# 'single' decodes the source once for all renditions, 'serial' runs one ffmpeg per rendition,
+# 'fanout' enqueues one job per rendition so several workers can encode the same video in parallel,
+# 'chunked' splits long sources at keyframes and encodes the chunks in parallel; their audio is always
+# encoded once into the shared audio rendition (see HLS_SHARED_AUDIO)
+VIDEO_TRANSCODE_MODE = os.getenv('VIDEO_TRANSCODE_MODE', 'single')
+VIDEO_CHUNK_MIN_DURATION = float(os.getenv('VIDEO_CHUNK_MIN_DURATION', 600))
+VIDEO_CHUNK_SECONDS = float(os.getenv('VIDEO_CHUNK_SECONDS', 60))
+VIDEO_CHUNK_WORKERS = int(os.getenv('VIDEO_CHUNK_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+# 'local' encodes chunks in parallel ffmpeg processes on one worker, 'rq' enqueues one job per chunk
+VIDEO_CHUNK_DISPATCH = os.getenv('VIDEO_CHUNK_DISPATCH', 'local')
+# Resumable uploads: total size limit and the largest chunk a single PATCH may carry
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 20 * 1024 ** 3))
+UPLOAD_CHUNK_MAX_SIZE = int(os.getenv('UPLOAD_CHUNK_MAX_SIZE', 64 * 1024 ** 2))
+# 'ts' writes one MPEG-TS file per segment, 'fmp4' one fragmented MP4 (CMAF) file per rendition
+# addressed by byte ranges; chunked encoding always falls back to whole-file encodes with fmp4
+HLS_SEGMENT_FORMAT = os.getenv('HLS_SEGMENT_FORMAT', 'ts')
+# Encode audio once into hls/<id>/audio, referenced by every variant of master.m3u8 as an EXT-X-MEDIA group;
+# players then have to load master.m3u8, the per-resolution playlists carry no audio. Off by default because
+# clients that play /api/video/<id>/<resolution>/index.m3u8 directly would lose sound
+HLS_SHARED_AUDIO = os.getenv('HLS_SHARED_AUDIO', 'False') == 'True'
+# Minimum seconds between two progress updates a worker writes to Redis per encode
+VIDEO_PROGRESS_INTERVAL = float(os.getenv('VIDEO_PROGRESS_INTERVAL', 2))
+# Per-video transcode locks expire after this many seconds unless the holding worker renews them
+VIDEO_LOCK_TIMEOUT = int(os.getenv('VIDEO_LOCK_TIMEOUT', 120))
+
+# Seek-preview sprite sheets: one tile every TRICKPLAY_INTERVAL seconds, COLUMNS x ROWS tiles per sheet
+TRICKPLAY_ENABLED = os.getenv('TRICKPLAY_ENABLED', 'True') == 'True'
+TRICKPLAY_INTERVAL = int(os.getenv('TRICKPLAY_INTERVAL', 10))
+TRICKPLAY_WIDTH = int(os.getenv('TRICKPLAY_WIDTH', 160))
+TRICKPLAY_COLUMNS = int(os.getenv('TRICKPLAY_COLUMNS', 5))
+TRICKPLAY_ROWS = int(os.getenv('TRICKPLAY_ROWS', 5))
+
+# Host-wide encode scheduler: 'throughput' runs many encodes with few threads each,
+# 'latency' few encodes with many threads; ENCODE_MAX_CONCURRENT=0 derives the limit from the cores
+ENCODE_SCHEDULER_ENABLED = os.getenv('ENCODE_SCHEDULER_ENABLED', 'True') == 'True'
+ENCODE_POLICY = os.getenv('ENCODE_POLICY', 'throughput')
+ENCODE_MAX_CONCURRENT = int(os.getenv('ENCODE_MAX_CONCURRENT', 0))
+ENCODE_SLOT_LEASE = int(os.getenv('ENCODE_SLOT_LEASE', 60))
+ENCODE_SLOT_POLL = float(os.getenv('ENCODE_SLOT_POLL', 2))
+ENCODE_QUEUES = ['video_short', 'video_long']
+# (minimum waiting jobs, x264 preset): the deeper the queue, the faster the preset
+ENCODE_PRESETS = [(0, 'medium'), (4, 'fast'), (16, 'veryfast')]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -142,6 +219,30 @@ STATIC_ROOT = BASE_DIR / "static"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# 'django' streams media files through the app, 'x-accel' (nginx) and 'x-sendfile' (Apache, lighttpd) only
+# authorise the request and let the front proxy send the file; see nginx/videoflix.conf
+MEDIA_DELIVERY = os.getenv('MEDIA_DELIVERY', 'django')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Browser caching of HLS objects: segments and sprites are immutable, playlists long-lived but revalidated
+# with their ETag; 'private' because every object requires authentication
+MEDIA_CACHE_SCOPE = os.getenv('MEDIA_CACHE_SCOPE', 'private')
+MEDIA_IMMUTABLE_MAX_AGE = int(os.getenv('MEDIA_IMMUTABLE_MAX_AGE', 365 * 24 * 3600))
+MEDIA_MANIFEST_MAX_AGE = int(os.getenv('MEDIA_MANIFEST_MAX_AGE', 24 * 3600))
+# Rendition playlists carry HMAC-signed segment URLs valid for at least MEDIA_URL_TTL seconds, so segment
+# requests skip JWT decoding and database lookups; the TTL has to cover a full viewing session
+MEDIA_SIGNED_URLS = os.getenv('MEDIA_SIGNED_URLS', 'True') == 'True'
+MEDIA_URL_TTL = int(os.getenv('MEDIA_URL_TTL', 6 * 3600))
+MEDIA_SIGNING_KEY = os.getenv('MEDIA_SIGNING_KEY') or SECRET_KEY
+# Host-local LRU copies of playlists and the first segments on tmpfs, shared by all app processes;
+# 'manage.py hot_cache_stats' reports the hit rate for sizing HOT_CACHE_MAX_BYTES
+HOT_CACHE_ENABLED = os.getenv('HOT_CACHE_ENABLED', 'True') == 'True'
+HOT_CACHE_DIR = os.getenv('HOT_CACHE_DIR', '/dev/shm/videoflix-hot')
+HOT_CACHE_MAX_BYTES = int(os.getenv('HOT_CACHE_MAX_BYTES', 256 * 1024 ** 2))
+HOT_CACHE_MAX_OBJECT = int(os.getenv('HOT_CACHE_MAX_OBJECT', 4 * 1024 ** 2))
+HOT_CACHE_SEGMENTS = int(os.getenv('HOT_CACHE_SEGMENTS', 3))
+# Serving a segment queues posix_fadvise(WILLNEED) read-ahead of the next PREFETCH_SEGMENTS segments
+# of the rendition, so the player's following requests hit warm pages; 0 disables it
+PREFETCH_SEGMENTS = int(os.getenv('PREFETCH_SEGMENTS', 2))
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
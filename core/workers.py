@@ -0,0 +1,247 @@
+"""RQ worker classes used by the rqworker management command (see RQ['WORKER_CLASS']) and the worker supervisor"""
+import json
+import logging
+import os
+import signal
+import socket
+import time
+import django_rq
+from django import db
+from django.conf import settings
+from rq import Worker
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker gets to take its work horse down after the second SIGTERM before it is killed
+COLD_SHUTDOWN_GRACE = 10
+
+
+class WorkHorseKilled(Exception):
+    """Failure reason of a job whose work horse died without handling the job's failure itself"""
+
+
+def queue_weight(name: str) -> int:
+    """Share of jobs a queue gets relative to the others, 1 for queues without a configured weight"""
+    return settings.RQ_QUEUE_WEIGHTS.get(name, 1)
+
+
+class WeightedWorker(Worker):
+    """
+    Worker that serves its queues by smooth weighted round robin
+    After each job every queue with jobs waiting earns its weight in credit and the queue that was served
+    pays the sum of those weights; the next dequeue tries the queues in order of credit
+    Heavy queues still get their turn, but light queues are checked first most of the time.
+    Empty queues are simply skipped by the dequeue and start from zero credit once they have work again,
+    and credit is capped at the sum of all weights, so a queue that was idle or busy for a long time
+    cannot take over the worker when the others fill up
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._credits = {queue.name: 0 for queue in self.queues}
+        self._ordered_queues = sorted(self.queues, key=lambda queue: -queue_weight(queue.name))
+
+    def waiting_queues(self) -> set:
+        """Names of the queues that have jobs waiting, counted in one round trip"""
+        with self.connection.pipeline() as pipeline:
+            for queue in self.queues:
+                pipeline.llen(queue.key)
+            counts = pipeline.execute()
+        return {queue.name for queue, count in zip(self.queues, counts) if count}
+
+    def reorder_queues(self, reference_queue):
+        active = self.waiting_queues() | {reference_queue.name}
+        limit = sum(queue_weight(queue.name) for queue in self.queues)
+        for queue in self.queues:
+            if queue.name in active:
+                self._credits[queue.name] += queue_weight(queue.name)
+            else:
+                self._credits[queue.name] = 0
+        self._credits[reference_queue.name] -= sum(queue_weight(name) for name in active)
+        for name, credit in self._credits.items():
+            self._credits[name] = max(-limit, min(limit, credit))
+        self._ordered_queues = sorted(
+            self.queues, key=lambda queue: (-self._credits[queue.name], -queue_weight(queue.name))
+        )
+
+    def handle_work_horse_killed(self, job, retpid, ret_val, rusage):
+        """
+        RQ skips the job's failure callback when the work horse dies (OOM kill, SIGKILL, segfault),
+        so the dead-letter callback is run here before the job is failed or retried
+        Only jobs enqueued with that callback are dead-lettered, other jobs just fail as usual
+        """
+        super().handle_work_horse_killed(job, retpid, ret_val, rusage)
+        from video_app.deadletter import record_failure
+        if job.failure_callback is not record_failure:
+            return
+        error = WorkHorseKilled(f'Work horse terminated unexpectedly; waitpid returned {ret_val}')
+        record_failure(job, self.connection, WorkHorseKilled, error, None)
+
+
+class WorkerSupervisor:
+    """
+    Keeps a fixed number of forked RQ workers running on one host
+    Django and the task modules are imported once in the supervisor, so every worker (and every
+    work horse a worker forks per job) starts warm. Workers exit after max_jobs jobs to bound memory
+    growth and are replaced; SIGTERM/SIGINT are forwarded so running jobs can finish
+    """
+
+    def __init__(self, queue_names: list, num_workers: int, max_jobs: int = None, target=None):
+        self.queue_names = queue_names
+        self.num_workers = num_workers
+        self.max_jobs = max_jobs
+        self.target = target or self.run_worker
+        self.slots = {}
+        self.stopping = False
+
+    def run_worker(self, slot: int):
+        """Body of a worker process: one rq worker that stops after max_jobs jobs"""
+        worker = django_rq.get_worker(*self.queue_names, name=worker_name(slot, os.getpid()))
+        worker.work(max_jobs=self.max_jobs, with_scheduler=slot == 0)
+
+    def spawn(self, slot: int):
+        """Fork the worker process for a slot"""
+        db.connections.close_all()
+        pid = os.fork()
+        if pid == 0:
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self.target(slot)
+            except Exception:
+                logger.exception(f'Worker in slot {slot} crashed')
+                code = 1
+            finally:
+                os._exit(code)
+        try:
+            os.setpgid(pid, pid)
+        except OSError:
+            pass
+        previous = self.slots.get(slot, {})
+        self.slots[slot] = {
+            'pid': pid,
+            'started_at': time.time(),
+            'restarts': previous.get('restarts', -1) + 1,
+            'last_exit': previous.get('last_exit'),
+        }
+        logger.info(f'Started worker {slot} (pid {pid})')
+
+    def start(self):
+        """Start every worker slot"""
+        for slot in range(self.num_workers):
+            self.spawn(slot)
+
+    def reap(self) -> list:
+        """Collect exited workers and, unless shutting down, replace them; returns the exited slots"""
+        exited = []
+        for slot, state in self.slots.items():
+            if state['pid'] is None:
+                continue
+            pid, status = os.waitpid(state['pid'], os.WNOHANG)
+            if pid == 0:
+                continue
+            state['pid'], state['last_exit'] = None, os.waitstatus_to_exitcode(status)
+            exited.append(slot)
+            logger.info(f'Worker {slot} exited with code {state["last_exit"]}')
+        for slot in exited:
+            if not self.stopping:
+                if self.slots[slot]['last_exit'] != 0:
+                    time.sleep(settings.RQ_WORKER_RESPAWN_DELAY)
+                self.spawn(slot)
+        return exited
+
+    def alive(self) -> list:
+        """Slots whose worker process is still running"""
+        return [slot for slot, state in self.slots.items() if state['pid'] is not None]
+
+    def wait(self, timeout: float):
+        """Reap exited workers until none is left or timeout seconds passed"""
+        deadline = time.monotonic() + timeout
+        while self.alive() and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+
+    def stop(self, timeout: float):
+        """
+        Ask all workers for a warm shutdown and wait for running jobs to finish
+        Workers still busy after timeout seconds get a second SIGTERM, rq's cold shutdown, which kills
+        the work horse's process group including its ffmpeg; whatever is left of a worker's own process
+        group after COLD_SHUTDOWN_GRACE seconds is killed
+        """
+        self.stopping = True
+        for slot in self.alive():
+            os.kill(self.slots[slot]['pid'], signal.SIGTERM)
+        self.wait(timeout)
+        for slot in self.alive():
+            logger.warning(f'Worker {slot} did not stop within {timeout}s, forcing a cold shutdown')
+            os.kill(self.slots[slot]['pid'], signal.SIGTERM)
+        self.wait(COLD_SHUTDOWN_GRACE)
+        for slot in self.alive():
+            pid = self.slots[slot]['pid']
+            logger.warning(f'Worker {slot} ignored the cold shutdown, killing its process group')
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+            self.slots[slot]['pid'] = None
+
+    def health(self) -> list:
+        """Per-worker report: process state plus the state and job counters rq keeps in Redis"""
+        connection = django_rq.get_connection(self.queue_names[0])
+        now = time.time()
+        report = []
+        for slot, state in sorted(self.slots.items()):
+            entry = {
+                'slot': slot,
+                'pid': state['pid'],
+                'alive': state['pid'] is not None,
+                'uptime': round(now - state['started_at']) if state['pid'] else 0,
+                'restarts': state['restarts'],
+                'last_exit': state['last_exit'],
+            }
+            worker = None
+            if state['pid']:
+                try:
+                    worker = Worker.find_by_key(Worker.redis_worker_namespace_prefix + worker_name(slot, state['pid']),
+                                                connection=connection)
+                except Exception as e:
+                    logger.warning(f'Could not read state of worker {slot}: {e}')
+            if worker:
+                entry.update({
+                    'state': worker.get_state(),
+                    'current_job': worker.get_current_job_id(),
+                    'successful_jobs': worker.successful_job_count,
+                    'failed_jobs': worker.failed_job_count,
+                })
+            report.append(entry)
+        return report
+
+    def run(self, shutdown_timeout: float, health_interval: float, health_file: str = None):
+        """Supervise the workers until SIGTERM or SIGINT, logging the health report every health_interval seconds"""
+        signals = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: signals.append(signum))
+        signal.signal(signal.SIGINT, lambda signum, frame: signals.append(signum))
+        self.start()
+        next_report = time.monotonic()
+        while not signals:
+            self.reap()
+            if time.monotonic() >= next_report:
+                report = self.health()
+                for entry in report:
+                    logger.info(f'Worker health: {entry}')
+                if health_file:
+                    with open(health_file + '.tmp', 'w') as output:
+                        json.dump({'checked_at': time.time(), 'workers': report}, output)
+                    os.replace(health_file + '.tmp', health_file)
+                next_report = time.monotonic() + health_interval
+            time.sleep(1)
+        logger.info(f'Received signal {signals[0]}, stopping {len(self.alive())} workers')
+        self.stop(shutdown_timeout)
+
+
+def worker_name(slot: int, pid: int) -> str:
+    """rq worker name, unique per host, slot and process"""
+    return f'{socket.gethostname()}.{slot}.{pid}'
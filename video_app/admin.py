@@ -1,23 +1,57 @@
 
 from django.contrib import admin
-from video_app.models import Video
+from video_app.deadletter import requeue_failed
+from video_app.models import FailedTask, UploadSession, Video
 
 @admin.register(Video)
 class VideoAdmin(admin.ModelAdmin):
     """Admin configuration for Video model."""
-    list_display = ('id', 'title', 'category', 'created_at', 'updated_at')  
+    list_display = ('id', 'title', 'category', 'status', 'created_at', 'updated_at')  
     search_fields = ('title', 'description', 'category')
-    list_filter = ('created_at', 'category')
+    list_filter = ('status', 'created_at', 'category')
     ordering = ('-created_at',)
     fieldsets = (
         ('Primary Info', {'fields': ('title', 'description', 'category')}),
         ('Media', {'fields': ('file', 'thumbnail')}),
+        ('Processing', {'fields': ('status', 'status_changed_at', 'ready_at', 'failure_reason')}),
+        ('Source', {'fields': ('duration', 'width', 'height', 'bitrate', 'video_codec', 'audio_codec', 'file_size'), 'classes': ('collapse',)}),
         # ('File', {'fields': ('file',)}),
         ('Timestamps', {'fields': ('created_at', 'updated_at'), 'classes': ('collapse',)}),
     )
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = (
+        'created_at', 'updated_at', 'status_changed_at', 'ready_at',
+        'duration', 'width', 'height', 'bitrate', 'video_codec', 'audio_codec', 'file_size',
+    )
     
     def has_thumbnail(self, obj):
         """Show ✓ if a thumbnail exists."""
         return bool(obj.thumbnail)
     has_thumbnail.boolean = True
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    """Admin overview of resumable uploads."""
+    list_display = ('id', 'filename', 'user', 'offset', 'length', 'video', 'updated_at')
+    search_fields = ('filename', 'title')
+    readonly_fields = ('offset', 'length', 'video', 'created_at', 'updated_at')
+
+
+@admin.register(FailedTask)
+class FailedTaskAdmin(admin.ModelAdmin):
+    """Admin view of the dead-letter queue: jobs that failed after all retries, with a bulk requeue action."""
+    list_display = ('job_id', 'func_name', 'video', 'queue', 'attempts', 'failed_at', 'requeued_at')
+    list_filter = ('queue', 'func_name', 'failed_at')
+    search_fields = ('job_id', 'func_name', 'reason')
+    readonly_fields = (
+        'job_id', 'queue', 'func_name', 'args', 'timeout', 'video', 'reason', 'traceback',
+        'attempts', 'failed_at', 'requeued_at',
+    )
+    actions = ('requeue_tasks',)
+
+    @admin.action(description='Requeue selected tasks')
+    def requeue_tasks(self, request, queryset):
+        """Put the selected jobs back on their queues."""
+        for task in queryset:
+            requeue_failed(task)
+        self.message_user(request, f'Requeued {queryset.count()} task(s)')
@@ -0,0 +1,110 @@
+"""
+Async versions of the list, playlist and segment endpoints, routed instead of the DRF views when SERVER_MODE is 'asgi'
+Database access goes through the async ORM and file bodies are streamed by an async generator, so under
+uvicorn a client reading a segment slowly holds a coroutine instead of a worker process
+They answer like the DRF views: same status codes, JSON {'detail': ...} errors, same caching headers
+"""
+import os
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from auth_app.authentication import authenticate_async
+from video_app.models import Video
+from video_app.api.serializers import VideoSerializer
+from video_app.api.responses import media_response, signed_cache_control, signed_playlist_response
+from video_app.api.views import SEGMENT_CONTENT_TYPES
+from video_app.prefetch import prefetch_next
+from video_app.signing import verify
+
+# stat, ETag sidecar and hot-cache lookups are short blocking calls, they run in the thread pool
+# instead of the thread_sensitive executor so concurrent requests do not queue behind each other
+media_response_async = sync_to_async(media_response, thread_sensitive=False)
+signed_playlist_response_async = sync_to_async(signed_playlist_response, thread_sensitive=False)
+path_exists = sync_to_async(os.path.exists, thread_sensitive=False)
+
+
+class AsyncAPIView(View):
+    """Async Django view that turns DRF exceptions and Http404 into the JSON errors the DRF views return"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except (exceptions.NotAuthenticated, exceptions.AuthenticationFailed) as e:
+            # no WWW-Authenticate challenge, so like APIView.handle_exception answer 403 instead of 401
+            return JsonResponse({'detail': e.detail}, status=403)
+        except exceptions.APIException as e:
+            return JsonResponse({'detail': e.detail}, status=e.status_code)
+        except Http404 as e:
+            return JsonResponse({'detail': str(e) or 'Not found.'}, status=404)
+
+    async def authenticate(self, request):
+        """Logged-in user from the access_token cookie, NotAuthenticated (403) without one"""
+        user = await authenticate_async(request)
+        if user is None:
+            raise exceptions.NotAuthenticated()
+        return user
+
+    async def get_ready_video(self, movie_id: int) -> Video:
+        try:
+            return await Video.objects.aget(pk=movie_id, status=Video.Status.READY)
+        except Video.DoesNotExist:
+            raise Http404("Video not found")
+
+
+class AsyncVideoListView(AsyncAPIView):
+    """
+    Return a list of all videos that finished transcoding
+    Requires JWT authentication
+    """
+
+    async def get(self, request, *args, **kwargs):
+        await self.authenticate(request)
+        videos = [video async for video in Video.objects.filter(status=Video.Status.READY)]
+        data = VideoSerializer(videos, many=True, context={'request': request}).data
+        return JsonResponse(data, safe=False)
+
+
+class AsyncVideoStreamView(AsyncAPIView):
+    """
+    Returns the HLS playlist (index.m3u8) for a given video and resolution
+    Requires JWT authentication
+    """
+
+    async def get(self, request, movie_id: int, resolution: str, *args, **kwargs):
+        await self.authenticate(request)
+        video = await self.get_ready_video(movie_id)
+        manifest_path = os.path.join(settings.MEDIA_ROOT, 'hls', str(video.id), resolution, 'index.m3u8')
+        if not await path_exists(manifest_path):
+            raise Http404("Manifest not found for this resolution")
+        if settings.MEDIA_SIGNED_URLS:
+            return await signed_playlist_response_async(request, manifest_path, video.id, resolution)
+        return await media_response_async(request, manifest_path, 'application/vnd.apple.mpegurl', cache='manifest')
+
+
+class AsyncVideoSegmentView(AsyncAPIView):
+    """
+    Returns a single HLS video segment or the fragmented MP4 file of a single-file rendition, streamed asynchronously
+    Requires JWT authentication or the signed URL from the rendition playlist; signed requests
+    touch neither the user nor the video table
+    """
+
+    async def get(self, request, movie_id: int, resolution: str, segment: str, *args, **kwargs):
+        expires, sig = request.GET.get('expires'), request.GET.get('sig')
+        signed = expires is not None or sig is not None
+        if signed and not verify(movie_id, resolution, segment, expires, sig):
+            raise exceptions.AuthenticationFailed('Invalid or expired media signature.')
+        if not signed:
+            await self.authenticate(request)
+            if not await Video.objects.filter(pk=movie_id, status=Video.Status.READY).aexists():
+                raise Http404("Video not found")
+        segment_path = os.path.join(settings.MEDIA_ROOT, 'hls', str(movie_id), resolution, segment)
+        content_type = SEGMENT_CONTENT_TYPES.get(os.path.splitext(segment)[1])
+        if not content_type or not await path_exists(segment_path):
+            raise Http404("Segment not found")
+        prefetch_next(segment_path)
+        response = await media_response_async(request, segment_path, content_type, asynchronous=True)
+        if signed and 'Cache-Control' in response:
+            response['Cache-Control'] = signed_cache_control(int(expires))
+        return response
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.permissions import BasePermission
+from video_app.signing import verify
+
+
+class SignedURLAuthentication(BaseAuthentication):
+    """
+    Accept segment requests that carry a valid expires/sig pair issued with the playlist
+    No token is decoded and no user is loaded; requests without a signature fall through
+    to the next authentication class
+    """
+    def authenticate(self, request):
+        expires, sig = request.query_params.get('expires'), request.query_params.get('sig')
+        if expires is None and sig is None:
+            return None
+        kwargs = request.parser_context['kwargs']
+        if not verify(kwargs['movie_id'], kwargs['resolution'], kwargs['segment'], expires, sig):
+            raise exceptions.AuthenticationFailed('Invalid or expired media signature.')
+        return (AnonymousUser(), int(expires))
+
+
+class IsAuthenticatedOrSigned(BasePermission):
+    """Allow logged-in users and requests authenticated by a signed media URL"""
+    def has_permission(self, request, view):
+        if isinstance(request.successful_authenticator, SignedURLAuthentication):
+            return True
+        return bool(request.user and request.user.is_authenticated)
@@ -0,0 +1,189 @@
+"""
+File responses for media objects: byte-range requests into single-file renditions,
+conditional GET against precomputed ETags and a Cache-Control policy per object type
+Under ASGI the body is streamed by an async generator, so a slow client holds a coroutine, not a worker
+"""
+import asyncio
+import os
+import re
+import time
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from video_app.etags import file_etag
+from video_app.hotcache import open_cached
+from video_app.signing import expiry, sign_playlist
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header: str, size: int):
+    """
+    Translate a single-range Range header into an inclusive (start, end) pair
+    Returns None to serve the whole file (no, malformed or multi-range header)
+    and raises ValueError if the range lies outside the file
+    """
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(f'Range {header} not satisfiable for {size} bytes')
+    return start, end
+
+
+def iter_range(media, start: int, length: int):
+    """Read length bytes from start of an open file in CHUNK_SIZE blocks, then close it"""
+    with media:
+        media.seek(start)
+        while length > 0:
+            block = media.read(min(CHUNK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+async def aiter_range(media, start: int, length: int):
+    """
+    Async counterpart of iter_range: every block is read in the default thread pool, while waiting
+    for the client to take it the event loop is free, so no thread is held between two blocks
+    """
+    try:
+        await asyncio.to_thread(media.seek, start)
+        while length > 0:
+            block = await asyncio.to_thread(media.read, min(CHUNK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        media.close()
+
+
+def offload_response(path: str, content_type: str) -> HttpResponse:
+    """
+    Empty response that hands the file to the front proxy, which then sends it with sendfile
+    'x-accel' (nginx) redirects to MEDIA_ACCEL_PREFIX + the path below MEDIA_ROOT, 'x-sendfile'
+    (Apache, lighttpd) names the absolute path; the proxy also answers Range requests itself
+    """
+    relative = os.path.relpath(path, settings.MEDIA_ROOT)
+    if relative.startswith('..'):
+        raise Http404("File not found")
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_DELIVERY == 'x-accel':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(relative)
+    else:
+        response['X-Sendfile'] = os.path.abspath(path)
+    return response
+
+
+def cache_control(kind: str) -> str:
+    """
+    Cache-Control for a media object: segments and sprite sheets never change once written,
+    VOD playlists are long-lived but revalidated, since a re-transcode rewrites them
+    """
+    if kind == 'immutable':
+        return f'{settings.MEDIA_CACHE_SCOPE}, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    return f'{settings.MEDIA_CACHE_SCOPE}, max-age={settings.MEDIA_MANIFEST_MAX_AGE}'
+
+
+def range_allowed(request, etag: str, last_modified: int) -> bool:
+    """
+    If-Range: the Range header only applies while the client's copy is current, otherwise the whole file is sent
+    A date only validates with a strong match on Last-Modified, an ETag must match exactly
+    """
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def file_response(request, media, content_type: str, size: int, use_range: bool, asynchronous: bool = False):
+    """
+    Full file or, for a satisfiable single Range, 206 Partial Content; 416 for ranges outside the file
+    media is an open binary file the response takes over; asynchronous streams the body with
+    aiter_range instead of a file iterator
+    """
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size) if use_range else None
+    except ValueError:
+        media.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None and not asynchronous:
+        return FileResponse(media, content_type=content_type)
+    if byte_range is None:
+        response = StreamingHttpResponse(aiter_range(media, 0, size), content_type=content_type)
+        response['Content-Length'] = str(size)
+        return response
+    start, end = byte_range
+    stream = aiter_range if asynchronous else iter_range
+    response = StreamingHttpResponse(stream(media, start, end - start + 1), status=206, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def media_response(request, path: str, content_type: str, cache: str = 'immutable', asynchronous: bool = False):
+    """
+    Serve a media file with strong validators and the Cache-Control of its kind ('immutable' or 'manifest')
+    If-None-Match / If-Modified-Since are answered with 304 before the file is opened,
+    Range requests with 206 Partial Content; byte-range HLS playlists (EXT-X-BYTERANGE)
+    address fragments inside one file this way
+    Small hot objects are read from the host's tmpfs cache; with MEDIA_DELIVERY set to a proxy mode
+    only the internal redirect header is returned; asynchronous selects the async body for ASGI views
+    """
+    stat = os.stat(path)
+    etag = file_etag(path, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if settings.MEDIA_DELIVERY != 'django':
+            response = offload_response(path, content_type)
+        else:
+            response = file_response(request, open_cached(path, stat), content_type, stat.st_size,
+                                     range_allowed(request, etag, last_modified), asynchronous)
+    if response.status_code in (200, 206, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = cache_control(cache)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def signed_playlist_response(request, path: str, video_id: int, resolution: str):
+    """
+    Rendition playlist with signed, expiring segment URLs
+    The ETag combines the file's ETag with the expiry window, and the playlist may only be cached
+    while the URLs in it stay valid for at least MEDIA_URL_TTL
+    """
+    expires = expiry()
+    stat = os.stat(path)
+    etag = f'{file_etag(path, stat)[:-1]}-{expires}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        with open_cached(path, stat) as playlist:
+            body = sign_playlist(playlist.read().decode(), video_id, resolution, expires)
+        response = HttpResponse(body, content_type='application/vnd.apple.mpegurl')
+    if response.status_code in (200, 304):
+        max_age = max(0, expires - settings.MEDIA_URL_TTL - int(time.time()))
+        response['ETag'] = etag
+        response['Cache-Control'] = f'private, max-age={max_age}'
+    return response
+
+
+def signed_cache_control(expires: int) -> str:
+    """Segments fetched through a signed URL may sit in shared caches, but not beyond the URL's expiry"""
+    return f'public, max-age={max(0, expires - int(time.time()))}, immutable'
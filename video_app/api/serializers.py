@@ -7,8 +7,14 @@ class VideoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Video
-        fields = ['id', 'created_at', 'title', 'description', 'thumbnail_url', 'category']
-        read_only_fields = ['id', 'created_at', 'thumbnail_url']
+        fields = [
+            'id', 'created_at', 'title', 'description', 'thumbnail_url', 'category',
+            'duration', 'width', 'height', 'bitrate', 'video_codec', 'audio_codec', 'file_size',
+        ]
+        read_only_fields = [
+            'id', 'created_at', 'thumbnail_url',
+            'duration', 'width', 'height', 'bitrate', 'video_codec', 'audio_codec', 'file_size',
+        ]
 
     def get_thumbnail_url(self, obj):
         """Return absolute thumbnail URL or None if missing"""
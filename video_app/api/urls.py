@@ -1,10 +1,21 @@
 """Endpoints for video app"""
+from django.conf import settings
 from django.urls import path
-from video_app.api.views import VideoListView, VideoStreamView, VideoSegmentView
+from video_app.api.async_views import AsyncVideoListView, AsyncVideoSegmentView, AsyncVideoStreamView
+from video_app.api.views import VideoListView, VideoStreamView, VideoSegmentView, VideoProgressView, TranscodeQueueProgressView, VideoTrickplayView, VideoMasterPlaylistView, UploadCreateView, UploadView
+
+if settings.SERVER_MODE == 'asgi':
+    VideoListView, VideoStreamView, VideoSegmentView = AsyncVideoListView, AsyncVideoStreamView, AsyncVideoSegmentView
 
 
 urlpatterns = [
     path('video/', VideoListView.as_view(), name='video-list'),
+    path('uploads/', UploadCreateView.as_view(), name='upload-create'),
+    path('uploads/<uuid:upload_id>/', UploadView.as_view(), name='upload-detail'),
+    path('video/progress/', TranscodeQueueProgressView.as_view(), name='video-progress-list'),
+    path('video/<int:movie_id>/progress/', VideoProgressView.as_view(), name='video-progress'),
+    path('video/<int:movie_id>/master.m3u8', VideoMasterPlaylistView.as_view(), name='video-master'),
+    path('video/<int:movie_id>/trickplay/<str:filename>', VideoTrickplayView.as_view(), name='video-trickplay'),
     path('video/<int:movie_id>/<str:resolution>/index.m3u8', VideoStreamView.as_view(), name='video-stream'),
     path('video/<int:movie_id>/<str:resolution>/<str:segment>', VideoSegmentView.as_view(), name='video-segment'),
 ]
@@ -1,19 +1,35 @@
 import os
-from django.http import FileResponse, Http404
+import re
+from django.http import Http404
 from django.conf import settings
+from django.urls import reverse
 from rest_framework import generics, permissions
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from video_app.models import Video
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.settings import api_settings
+from video_app.models import UploadSession, Video
 from video_app.api.serializers import VideoSerializer
+from video_app.api.authentication import IsAuthenticatedOrSigned, SignedURLAuthentication
+from video_app.api.responses import media_response, signed_cache_control, signed_playlist_response
+from video_app.prefetch import prefetch_next
+from video_app.progress import get_progress, get_all_progress, summarize
+from video_app.hls import MASTER_PLAYLIST
+from video_app.trickplay import TRICKPLAY_DIR, VTT_NAME
+from video_app.uploads import (
+    TUS_VERSION, UploadError, append_chunk, complete_upload, create_upload, delete_upload, parse_checksum, parse_metadata,
+)
+
+TRICKPLAY_FILES = re.compile(r'^(thumbnails\.vtt|sprite_\d+\.jpg)$')
+SEGMENT_CONTENT_TYPES = {'.ts': 'video/MP2T', '.mp4': 'video/mp4', '.m4s': 'video/iso.segment'}
 
 
 class VideoListView(generics.ListAPIView):
     """
-    Return a list of all available videos
+    Return a list of all videos that finished transcoding
     Requires JWT authentication
     """
-    queryset = Video.objects.all()
+    queryset = Video.objects.filter(status=Video.Status.READY)
     serializer_class = VideoSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -34,7 +50,7 @@ class VideoStreamView(APIView):
 
     def get(self, request, movie_id: int, resolution: str, *args, **kwargs):
         try:
-            video = Video.objects.get(pk=movie_id)
+            video = Video.objects.get(pk=movie_id, status=Video.Status.READY)
         except Video.DoesNotExist:
             raise Http404("Video not found")
         manifest_path = os.path.join(
@@ -44,34 +60,188 @@ class VideoStreamView(APIView):
             resolution,
             'index.m3u8'
         )
+        if os.path.exists(manifest_path) and settings.MEDIA_SIGNED_URLS:
+            return signed_playlist_response(request, manifest_path, video.id, resolution)
         if os.path.exists(manifest_path):
-            return FileResponse(
-                open(manifest_path, 'rb'),
-                content_type='application/vnd.apple.mpegurl'
-            )
+            return media_response(request, manifest_path, 'application/vnd.apple.mpegurl', cache='manifest')
         else:
             raise Http404("Manifest not found for this resolution")
 
 
-class VideoSegmentView(APIView):
+class VideoMasterPlaylistView(APIView):
     """
-    Returns a single HLS video segment (.ts) for a given movie and resolution
+    Returns the adaptive HLS master playlist (master.m3u8) listing every rendition of a video
     Requires JWT authentication
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, movie_id: int, resolution: str, segment: str, *args, **kwargs):
+    def get(self, request, movie_id: int, *args, **kwargs):
         try:
-            video = Video.objects.get(pk=movie_id)
+            video = Video.objects.get(pk=movie_id, status=Video.Status.READY)
         except Video.DoesNotExist:
             raise Http404("Video not found")
+        manifest_path = os.path.join(settings.MEDIA_ROOT, 'hls', str(video.id), MASTER_PLAYLIST)
+        if not os.path.exists(manifest_path):
+            raise Http404("Master playlist not found")
+        return media_response(request, manifest_path, 'application/vnd.apple.mpegurl', cache='manifest')
+
+
+class VideoSegmentView(APIView):
+    """
+    Returns a single HLS video segment (.ts) or the fragmented MP4 file of a single-file rendition
+    Range requests are answered with 206 so byte-range playlists can fetch one fragment at a time
+    Requires JWT authentication or the signed URL from the rendition playlist; signed requests
+    touch neither the user nor the video table and may be stored by shared caches until they expire
+    """
+    authentication_classes = [SignedURLAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    permission_classes = [IsAuthenticatedOrSigned]
+
+    def get(self, request, movie_id: int, resolution: str, segment: str, *args, **kwargs):
+        signed = isinstance(request.successful_authenticator, SignedURLAuthentication)
+        if not signed and not Video.objects.filter(pk=movie_id, status=Video.Status.READY).exists():
+            raise Http404("Video not found")
         segment_path = os.path.join(
             settings.MEDIA_ROOT,
             'hls',
-            str(video.id),
+            str(movie_id),
             resolution,
             segment
         )
-        if os.path.exists(segment_path):
-            return FileResponse(open(segment_path, 'rb'), content_type='video/MP2T')
-        raise Http404("Segment not found")
\ No newline at end of file
+        content_type = SEGMENT_CONTENT_TYPES.get(os.path.splitext(segment)[1])
+        if not content_type or not os.path.exists(segment_path):
+            raise Http404("Segment not found")
+        prefetch_next(segment_path)
+        response = media_response(request, segment_path, content_type)
+        if signed and 'Cache-Control' in response:
+            response['Cache-Control'] = signed_cache_control(request.auth)
+        return response
+
+
+class VideoTrickplayView(APIView):
+    """
+    Returns the seek-preview WebVTT index (thumbnails.vtt) or one of its sprite sheets
+    Requires JWT authentication
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, movie_id: int, filename: str, *args, **kwargs):
+        if not TRICKPLAY_FILES.match(filename):
+            raise Http404("Preview file not found")
+        try:
+            video = Video.objects.get(pk=movie_id, status=Video.Status.READY)
+        except Video.DoesNotExist:
+            raise Http404("Video not found")
+        path = os.path.join(settings.MEDIA_ROOT, 'hls', str(video.id), TRICKPLAY_DIR, filename)
+        if not os.path.exists(path):
+            raise Http404("Preview file not found")
+        if filename == VTT_NAME:
+            return media_response(request, path, 'text/vtt', cache='manifest')
+        return media_response(request, path, 'image/jpeg')
+
+
+class VideoProgressView(APIView):
+    """
+    Returns live transcoding progress (percent, speed, ETA) per rendition of a video
+    Requires JWT authentication
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, movie_id: int, *args, **kwargs):
+        try:
+            video = Video.objects.only('status').get(pk=movie_id)
+        except Video.DoesNotExist:
+            raise Http404("Video not found")
+        progress = get_progress(movie_id)
+        return Response({'video_id': movie_id, 'status': video.status, 'percent': summarize(progress), 'renditions': progress})
+
+
+class TranscodeQueueProgressView(APIView):
+    """
+    Returns transcoding progress of every video that is being or was recently encoded
+    Requires admin privileges
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        progress = get_all_progress()
+        return Response([
+            {'video_id': video_id, 'percent': summarize(items), 'renditions': items}
+            for video_id, items in sorted(progress.items())
+        ])
+
+
+def tus_response(status_code: int, headers: dict = None, data=None) -> Response:
+    """Response carrying the Tus-Resumable header every tus reply needs"""
+    response = Response(data, status=status_code)
+    response['Tus-Resumable'] = TUS_VERSION
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+class UploadCreateView(APIView):
+    """
+    Starts a resumable upload (tus creation): Upload-Length gives the size,
+    Upload-Metadata the base64 encoded filename, title, description and category
+    Requires admin privileges
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            length = int(request.headers.get('Upload-Length', ''))
+        except ValueError:
+            return tus_response(400, data={'detail': 'Upload-Length header is required'})
+        try:
+            session = create_upload(request.user, length, parse_metadata(request.headers.get('Upload-Metadata')))
+        except UploadError as e:
+            return tus_response(e.status, data={'detail': str(e)})
+        location = request.build_absolute_uri(reverse('upload-detail', args=[session.id]))
+        return tus_response(201, {'Location': location, 'Upload-Offset': '0'})
+
+
+class UploadView(APIView):
+    """
+    A resumable upload: HEAD reports the offset to resume from, PATCH appends a chunk
+    (application/offset+octet-stream, optional Upload-Checksum) and DELETE aborts the upload
+    The chunk that reaches Upload-Length creates the Video and starts transcoding
+    Requires admin privileges
+    """
+    permission_classes = [IsAdminUser]
+
+    def get_session(self, request, upload_id) -> UploadSession:
+        try:
+            return UploadSession.objects.get(pk=upload_id, user=request.user, video__isnull=True)
+        except UploadSession.DoesNotExist:
+            raise Http404("Upload not found")
+
+    def head(self, request, upload_id, *args, **kwargs):
+        session = self.get_session(request, upload_id)
+        return tus_response(200, {
+            'Upload-Offset': str(session.offset),
+            'Upload-Length': str(session.length),
+            'Cache-Control': 'no-store',
+        })
+
+    def patch(self, request, upload_id, *args, **kwargs):
+        session = self.get_session(request, upload_id)
+        if request.content_type != 'application/offset+octet-stream':
+            return tus_response(415, data={'detail': 'Content-Type must be application/offset+octet-stream'})
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return tus_response(400, data={'detail': 'Upload-Offset and Content-Length headers are required'})
+        try:
+            checksum = parse_checksum(request.headers.get('Upload-Checksum'))
+            new_offset = append_chunk(session, offset, request.stream, length, checksum)
+        except UploadError as e:
+            return tus_response(e.status, data={'detail': str(e)})
+        headers = {'Upload-Offset': str(new_offset)}
+        if new_offset == session.length:
+            headers['Video-Id'] = str(complete_upload(session).id)
+        return tus_response(204, headers)
+
+    def delete(self, request, upload_id, *args, **kwargs):
+        delete_upload(self.get_session(request, upload_id))
+        return tus_response(204)
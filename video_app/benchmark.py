@@ -0,0 +1,232 @@
+"""Reproducible transcoding benchmark on synthetic lavfi sources, compared against a stored baseline"""
+import multiprocessing
+import os
+import resource
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.test import override_settings
+from video_app import tasks
+from video_app.scheduler import available_cores, plan_encode
+
+FRAME_RATE = 25
+BENCHMARK_VIDEO_ID = 1
+# Metrics where a higher value is worse; a case regresses if one of them grows beyond the tolerance
+COMPARED_METRICS = ('wall_seconds', 'cpu_seconds', 'peak_rss_kb')
+
+
+def clip_name(duration: int, height: int) -> str:
+    """File name of a synthetic clip, e.g. testsrc_720p_10s.mp4"""
+    return f'testsrc_{height}p_{duration}s.mp4'
+
+
+def build_clip_cmd(output_path: str, duration: int, height: int) -> list:
+    """
+    ffmpeg command for a deterministic 16:9 test clip: testsrc2 video with a sine tone
+    Bit-exact flags and a single encoder thread make the clip byte-identical between runs
+    """
+    width = round(height * 16 / 9 / 2) * 2
+    return [
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={FRAME_RATE}:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=48000:duration={duration}',
+        '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', '-g', str(FRAME_RATE * 2), '-threads', '1',
+        '-c:a', 'aac',
+        '-fflags', '+bitexact', '-flags:v', '+bitexact', '-flags:a', '+bitexact',
+        '-shortest', output_path,
+    ]
+
+
+def generate_clip(work_dir: str, duration: int, height: int) -> str:
+    """Create the test clip in work_dir/sources unless it already exists, and return its path"""
+    source_dir = os.path.join(work_dir, 'sources')
+    os.makedirs(source_dir, exist_ok=True)
+    path = os.path.join(source_dir, clip_name(duration, height))
+    if not os.path.exists(path):
+        subprocess.run(build_clip_cmd(path + '.tmp.mp4', duration, height), check=True, capture_output=True)
+        os.replace(path + '.tmp.mp4', path)
+    return path
+
+
+class LocalJob:
+    """A job the pipeline enqueued while benchmarking"""
+
+    def __init__(self, func, args: tuple, depends_on):
+        self.func = func
+        self.args = args
+        if depends_on is None:
+            depends_on = []
+        self.depends_on = depends_on if isinstance(depends_on, list) else [depends_on]
+        self.done = False
+
+
+class LocalQueue:
+    """
+    Stand-in for RQ while benchmarking: keeps the jobs plan_transcode enqueues and runs them in dependency order
+    Jobs whose dependencies are done run side by side on RQ_WORKERS threads, like the worker pool would take them
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self.jobs = []
+
+    def enqueue(self, queue_name: str, func, *args, video_id: int = None, timeout: int = None, depends_on=None):
+        job = LocalJob(func, args, depends_on)
+        self.jobs.append(job)
+        return job
+
+    def run(self):
+        """Run every job, raising the first exception a job raises, like a failed job that blocks its dependents"""
+        while not all(job.done for job in self.jobs):
+            ready = [job for job in self.jobs if not job.done and all(dep.done for dep in job.depends_on)]
+            if not ready:
+                raise RuntimeError('Enqueued jobs wait for each other')
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for job, _ in zip(ready, pool.map(lambda job: job.func(*job.args), ready)):
+                    job.done = True
+
+
+class NullReporter:
+    """Progress reporter that publishes nothing"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, block: dict):
+        pass
+
+    def fail(self):
+        pass
+
+
+@contextmanager
+def offline_pipeline(media_root: str, queue: LocalQueue, encoder: dict = None):
+    """
+    Run the real transcoding pipeline of video_app.tasks without database and Redis
+    Status and metadata writes, locks, progress and the encode slot are stubbed, enqueued jobs go to queue;
+    everything that touches media files and ffmpeg stays as it is
+    """
+    @contextmanager
+    def no_lock(video_id, label):
+        yield True
+
+    @contextmanager
+    def fixed_slot(label=''):
+        yield encoder or {'threads': None, 'preset': None}
+
+    stubs = {
+        'set_status': lambda *args, **kwargs: None,
+        'store_metadata': lambda *args: None,
+        'save_thumbnail': lambda *args: None,
+        'reuse_duplicate': lambda *args: False,
+        'transcode_lock': no_lock,
+        'encode_slot': fixed_slot,
+        'ProgressReporter': NullReporter,
+        'enqueue_job': queue.enqueue,
+    }
+    originals = {name: getattr(tasks, name) for name in stubs}
+    for name, stub in stubs.items():
+        setattr(tasks, name, stub)
+    try:
+        with override_settings(MEDIA_ROOT=media_root, HOT_CACHE_DIR=os.path.join(media_root, 'hot')):
+            yield
+    finally:
+        for name, original in originals.items():
+            setattr(tasks, name, original)
+
+
+def directory_bytes(path: str) -> int:
+    """Total size of all files below path"""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def measure_case(input_path: str, media_root: str, duration: float, encoder: dict = None) -> dict:
+    """
+    Transcode one clip with plan_transcode and the jobs it enqueues, in the configured
+    VIDEO_TRANSCODE_MODE, and measure it: probe, encodes, previews and finalize
+    Runs in a fresh process, so RUSAGE_CHILDREN only covers the ffmpeg processes of this case
+    """
+    queue = LocalQueue(settings.RQ_WORKERS)
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.monotonic()
+    with offline_pipeline(media_root, queue, encoder):
+        tasks.plan_transcode(BENCHMARK_VIDEO_ID, input_path)
+        queue.run()
+    wall = time.monotonic() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    base_dir = os.path.join(media_root, 'hls', str(BENCHMARK_VIDEO_ID))
+    if not os.path.exists(os.path.join(base_dir, tasks.COMPLETE_MARKER)):
+        raise tasks.TranscodeError(f'Pipeline did not finish {input_path}')
+    return {
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu, 3),
+        'realtime_factor': round(duration / wall, 3) if wall else 0.0,
+        'peak_rss_kb': after.ru_maxrss,
+        'output_bytes': {
+            name: directory_bytes(os.path.join(base_dir, name))
+            for name in sorted(os.listdir(base_dir)) if os.path.isdir(os.path.join(base_dir, name))
+        },
+    }
+
+
+def benchmark_encoder() -> dict:
+    """Threads and preset the encode scheduler would hand out on this host with an empty queue"""
+    if not settings.ENCODE_SCHEDULER_ENABLED:
+        return None
+    plan = plan_encode(available_cores(), settings.ENCODE_POLICY, 0, settings.ENCODE_MAX_CONCURRENT)
+    return {'threads': plan['threads'], 'preset': plan['preset']}
+
+
+def run_benchmark(work_dir: str, durations: list, heights: list, repeat: int = 1) -> dict:
+    """
+    Benchmark every duration x height combination and return the report
+    With repeat > 1 the fastest run of each case is kept, which filters out noise from other processes
+    """
+    encoder = benchmark_encoder()
+    cases = {}
+    for height in heights:
+        for duration in durations:
+            source = generate_clip(work_dir, duration, height)
+            runs = []
+            for _ in range(repeat):
+                media_root = os.path.join(work_dir, 'output', f'{height}p_{duration}s')
+                shutil.rmtree(media_root, ignore_errors=True)
+                os.makedirs(media_root)
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('fork')) as pool:
+                    runs.append(pool.submit(measure_case, source, media_root, float(duration), encoder).result())
+            cases[f'{height}p_{duration}s'] = min(runs, key=lambda run: run['wall_seconds'])
+    return {
+        'mode': settings.VIDEO_TRANSCODE_MODE,
+        'chunk_dispatch': settings.VIDEO_CHUNK_DISPATCH,
+        'shared_audio': settings.HLS_SHARED_AUDIO,
+        'segment_format': settings.HLS_SEGMENT_FORMAT,
+        'trickplay': settings.TRICKPLAY_ENABLED,
+        'encoder': encoder,
+        'cores': available_cores(),
+        'cases': cases,
+    }
+
+
+def compare_reports(report: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Return a message for every case metric that got worse than the baseline by more than tolerance
+    (0.1 = 10 %); cases missing from either side are ignored
+    """
+    regressions = []
+    for case, result in report['cases'].items():
+        reference = baseline.get('cases', {}).get(case)
+        if not reference:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = reference.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append(f'{case}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.1f}%)')
+    return regressions
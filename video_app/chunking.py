@@ -0,0 +1,101 @@
+"""Split long sources into keyframe-aligned chunks and stitch the chunk playlists back together"""
+import math
+import os
+import subprocess
+from video_app.ffmpeg import SEGMENT_FILES
+from video_app.probe import ProbeError
+
+
+def probe_keyframes(input_path: str) -> list:
+    """
+    Return the timestamps (seconds) of all keyframes in the first video stream
+    Only packet flags are read, nothing is decoded
+    """
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        input_path,
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        raise ProbeError(f'ffprobe could not list keyframes of {input_path}: {e.stderr.decode().strip()}')
+    keyframes = []
+    for line in result.stdout.decode().splitlines():
+        pts, _, flags = line.partition(',')
+        if 'K' in flags and pts not in ('', 'N/A'):
+            keyframes.append(float(pts))
+    return sorted(keyframes)
+
+
+def plan_chunks(keyframes: list, duration: float, target_seconds: float) -> list:
+    """
+    Cut [0, duration) into (start, end) chunks of roughly target_seconds
+    Every boundary is a source keyframe so each chunk can be decoded on its own
+    """
+    chunks = []
+    start = 0.0
+    for keyframe in keyframes:
+        if keyframe - start >= target_seconds and duration - keyframe >= target_seconds / 2:
+            chunks.append((start, keyframe))
+            start = keyframe
+    chunks.append((start, duration))
+    return chunks
+
+
+def chunk_name(index: int) -> str:
+    """File name prefix shared by a chunk's playlist and segments"""
+    return f'chunk_{index:03d}'
+
+
+def parse_segments(playlist_path: str) -> list:
+    """Return (duration, uri) for every segment of a media playlist"""
+    segments = []
+    duration = None
+    with open(playlist_path) as playlist:
+        for line in playlist:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',')[0])
+            elif line and not line.startswith('#') and duration is not None:
+                segments.append((duration, line))
+                duration = None
+    return segments
+
+
+def stitch_playlists(chunk_playlists: list, out_path: str) -> int:
+    """
+    Concatenate the segments of consecutive chunk playlists into one VOD playlist
+    Chunks are encoded with their source offset so timestamps continue without discontinuities
+    The segments are renamed to the segment_NNN.ts names of unchunked renditions, so the hot cache
+    and read-ahead treat them alike; a retry after an interrupted stitch skips segments already renamed
+    Returns the number of segments written
+    """
+    segments = []
+    for path in chunk_playlists:
+        segments += parse_segments(path)
+    out_dir = os.path.dirname(out_path)
+    names = [SEGMENT_FILES['ts'] % number for number in range(len(segments))]
+    for (_, uri), name in zip(segments, names):
+        if os.path.exists(os.path.join(out_dir, uri)):
+            os.replace(os.path.join(out_dir, uri), os.path.join(out_dir, name))
+    target = max((math.ceil(duration) for duration, _ in segments), default=0)
+    lines = [
+        '#EXTM3U',
+        '#EXT-X-VERSION:3',
+        f'#EXT-X-TARGETDURATION:{target}',
+        '#EXT-X-MEDIA-SEQUENCE:0',
+        '#EXT-X-PLAYLIST-TYPE:VOD',
+    ]
+    for (duration, _), name in zip(segments, names):
+        lines += [f'#EXTINF:{duration:.6f},', name]
+    lines.append('#EXT-X-ENDLIST')
+    tmp_path = f'{out_path}.tmp'
+    with open(tmp_path, 'w') as playlist:
+        playlist.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, out_path)
+    for path in chunk_playlists:
+        os.remove(path)
+    return len(segments)
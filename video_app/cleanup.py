@@ -0,0 +1,100 @@
+"""Removal of media files that belong to deleted videos, and a scan for orphans left on the media volume"""
+import logging
+import os
+import shutil
+import time
+from django.conf import settings
+from video_app.hotcache import invalidate
+from video_app.models import UploadSession, Video
+from video_app.uploads import UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def tree_size(path: str) -> int:
+    """Bytes used by a file or by all files below a directory, without following symlinks"""
+    if not os.path.isdir(path) or os.path.islink(path):
+        return os.lstat(path).st_size if os.path.lexists(path) else 0
+    total = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                total += tree_size(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+def remove_path(path: str) -> int:
+    """Delete a file or directory tree and return the bytes it used"""
+    size = tree_size(path)
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+    return size
+
+
+def remove_video_media(video_id: int, file_name: str = '', thumbnail_name: str = '') -> int:
+    """
+    Delete the source, HLS tree and thumbnail of a deleted video, returns the reclaimed bytes
+    Source and thumbnail files that another video still references are kept
+    """
+    paths = [os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id))]
+    if file_name and not Video.objects.filter(file=file_name).exists():
+        paths.append(os.path.join(settings.MEDIA_ROOT, file_name))
+    if thumbnail_name and not Video.objects.filter(thumbnail=thumbnail_name).exists():
+        paths.append(os.path.join(settings.MEDIA_ROOT, thumbnail_name))
+    reclaimed = sum(remove_path(path) for path in paths)
+    invalidate(video_id)
+    logger.info(f'Removed media of deleted video {video_id}, reclaimed {reclaimed} bytes')
+    return reclaimed
+
+
+def old_entries(directory: str, min_age: float):
+    """Yield scandir entries of a directory last modified more than min_age seconds ago"""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - min_age
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                yield entry
+
+
+def find_orphans(min_age: float = 0) -> dict:
+    """
+    Scan hls/, videos/, thumbnails/ and uploads/ for entries no database row refers to
+    The referenced names are loaded once, so the scan costs one query per table and one
+    directory listing per folder; entries younger than min_age seconds are skipped to
+    leave uploads and transcodes in progress alone
+    Returns {category: [paths]}
+    """
+    root = settings.MEDIA_ROOT
+    video_ids = set()
+    files, thumbnails = set(), set()
+    for video_id, file_name, thumbnail_name in Video.objects.values_list('id', 'file', 'thumbnail'):
+        video_ids.add(str(video_id))
+        files.add(file_name)
+        if thumbnail_name:
+            thumbnails.add(thumbnail_name)
+    uploads = {f'{upload_id}.part' for upload_id in UploadSession.objects.values_list('id', flat=True)}
+    return {
+        'hls': [
+            entry.path for entry in old_entries(os.path.join(root, 'hls'), min_age)
+            if entry.is_dir(follow_symlinks=False) and entry.name not in video_ids
+        ],
+        'videos': [
+            entry.path for entry in old_entries(os.path.join(root, 'videos'), min_age)
+            if entry.is_file(follow_symlinks=False) and f'videos/{entry.name}' not in files
+        ],
+        'thumbnails': [
+            entry.path for entry in old_entries(os.path.join(root, 'thumbnails'), min_age)
+            if entry.is_file(follow_symlinks=False) and f'thumbnails/{entry.name}' not in thumbnails
+            and os.path.splitext(entry.name)[0] not in video_ids
+        ],
+        'uploads': [
+            entry.path for entry in old_entries(os.path.join(root, UPLOAD_DIR), min_age)
+            if entry.is_file(follow_symlinks=False) and entry.name not in uploads
+        ],
+    }
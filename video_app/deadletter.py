@@ -0,0 +1,81 @@
+"""Dead-letter handling: video jobs that failed after their last retry are kept in FailedTask and can be requeued"""
+import logging
+import traceback
+import types
+import django_rq
+from django.conf import settings
+from django.utils import timezone
+from rq.exceptions import InvalidJobOperation, NoSuchJobError
+from rq.job import Job
+from video_app.models import FailedTask, Video
+from video_app.tasks import TranscodeDeferred, enqueue_job, set_status
+
+logger = logging.getLogger(__name__)
+
+
+def record_failure(job, connection, exc_type, exc_value, tb):
+    """
+    RQ failure callback, called after every failed attempt before RQ schedules the retry
+    Attempts that will be retried are only logged; the last one is stored as FailedTask
+    and marks the video as failed. Jobs deferred by a held encode lock are rescheduled without
+    using up a retry. Timeouts raise inside the work horse and reach this callback;
+    for a killed work horse it is called by WeightedWorker.handle_work_horse_killed
+    """
+    reason = ''.join(traceback.format_exception_only(exc_type, exc_value)).strip()
+    if issubclass(exc_type, TranscodeDeferred):
+        defer(job, reason)
+        return
+    if job.should_retry:
+        logger.warning(f'Job {job.id} ({job.func_name}) failed, {job.retries_left} retries left: {reason}')
+        return
+    video_id = job.meta.get('video_id')
+    video = Video.objects.filter(pk=video_id).first() if video_id else None
+    attempts = settings.VIDEO_JOB_RETRIES + 1 if job.retries_left is not None else 1
+    previous = FailedTask.objects.filter(job_id=job.id).values_list('attempts', flat=True).first() or 0
+    FailedTask.objects.update_or_create(job_id=job.id, defaults={
+        'queue': job.origin,
+        'func_name': job.func_name,
+        'args': list(job.args),
+        'timeout': job.timeout,
+        'video': video,
+        'reason': reason,
+        'traceback': ''.join(traceback.format_tb(tb)) if isinstance(tb, types.TracebackType) else '',
+        'attempts': previous + attempts,
+        'failed_at': timezone.now(),
+    })
+    if video:
+        set_status(video.id, Video.Status.FAILED, reason)
+    logger.error(f'Job {job.id} ({job.func_name}) gave up after {attempts} attempts: {reason}')
+
+
+def defer(job, reason: str):
+    """
+    Hand the attempt back so RQ reschedules the job after VIDEO_JOB_RETRY_DELAY seconds
+    RQ's retry keeps the job id, so jobs depending on it are only released once it really ran
+    """
+    job.retries_left = (job.retries_left or 0) + 1
+    if not job.retry_intervals:
+        job.retry_intervals = [settings.VIDEO_JOB_RETRY_DELAY]
+    logger.info(f'Job {job.id} ({job.func_name}) deferred: {reason}')
+
+
+def requeue_failed(task: FailedTask) -> Job:
+    """
+    Put a dead-lettered job back on its queue with a fresh retry budget
+    The original RQ job is requeued while it still exists, so jobs depending on it are released once it succeeds;
+    otherwise a new job with the same function and arguments is enqueued
+    """
+    queue = django_rq.get_queue(task.queue)
+    try:
+        job = Job.fetch(task.job_id, connection=queue.connection)
+        job.retries_left = settings.VIDEO_JOB_RETRIES or None
+        job.save()
+        job = job.requeue()
+    except (NoSuchJobError, InvalidJobOperation):
+        job = enqueue_job(task.queue, task.func_name, *task.args, video_id=task.video_id, timeout=task.timeout)
+    if task.video and task.video.status == Video.Status.FAILED:
+        set_status(task.video_id, Video.Status.TRANSCODING)
+    task.requeued_at = timezone.now()
+    task.save(update_fields=['requeued_at'])
+    logger.info(f'Requeued failed job {task.job_id} ({task.func_name}) on {task.queue} as {job.id}')
+    return job
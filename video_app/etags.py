@@ -0,0 +1,69 @@
+"""Strong ETags for HLS output, hashed once when a transcode is finalized and kept in a sidecar file per video"""
+import json
+import logging
+import os
+from functools import lru_cache
+from django.conf import settings
+from video_app.idempotency import hash_file
+
+logger = logging.getLogger(__name__)
+
+ETAG_FILE = '.etags.json'
+
+
+def write_etags(base_dir: str) -> dict:
+    """
+    Hash every served file below base_dir and store {relative path: {etag, size, mtime_ns}} in base_dir/.etags.json
+    Entries whose size and mtime still match are kept, so hard-linked duplicates and retried
+    finalizers only hash what changed; dot files (markers, the sidecar itself) are skipped
+    """
+    previous = read_etags(base_dir)
+    entries = {}
+    for root, dirs, files in os.walk(base_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.startswith('.') or name.endswith('.tmp'):
+                continue
+            path = os.path.join(root, name)
+            key = os.path.relpath(path, base_dir).replace(os.sep, '/')
+            stat = os.stat(path)
+            entry = previous.get(key)
+            if not entry or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                entry = {'etag': f'"{hash_file(path)[:32]}"', 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            entries[key] = entry
+    sidecar = os.path.join(base_dir, ETAG_FILE)
+    with open(sidecar + '.tmp', 'w') as out:
+        json.dump(entries, out)
+    os.replace(sidecar + '.tmp', sidecar)
+    logger.info(f'Stored ETags of {len(entries)} files in {sidecar}')
+    return entries
+
+
+def read_etags(base_dir: str) -> dict:
+    """The sidecar of a video directory, empty if it was never written"""
+    sidecar = os.path.join(base_dir, ETAG_FILE)
+    try:
+        return load_sidecar(sidecar, os.stat(sidecar).st_mtime_ns)
+    except (OSError, ValueError):
+        return {}
+
+
+@lru_cache(maxsize=256)
+def load_sidecar(sidecar: str, mtime_ns: int) -> dict:
+    """Parse a sidecar once per version; the mtime is part of the cache key so rewrites are picked up"""
+    with open(sidecar) as source:
+        return json.load(source)
+
+
+def file_etag(path: str, stat: os.stat_result) -> str:
+    """
+    Precomputed ETag of a file below MEDIA_ROOT/hls/<video_id>/
+    Files without a current sidecar entry (older videos, files rewritten since) fall back to
+    a size/mtime validator, which is still strong for files replaced atomically
+    """
+    parts = os.path.relpath(path, settings.MEDIA_ROOT).split(os.sep)
+    if len(parts) > 2 and parts[0] == 'hls':
+        entry = read_etags(os.path.join(settings.MEDIA_ROOT, 'hls', parts[1])).get('/'.join(parts[2:]))
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['etag']
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
@@ -0,0 +1,256 @@
+"""Helpers that build and run ffmpeg command lines for the HLS pipeline"""
+import os
+import subprocess
+import threading
+from collections import deque
+
+
+HLS_SEGMENT_SECONDS = 4
+# fmp4 renditions are written as one CMAF file addressed by EXT-X-BYTERANGE
+SEGMENT_FILES = {'ts': 'segment_%03d.ts', 'fmp4': 'stream.mp4'}
+STDERR_TAIL_LINES = 200
+
+RENDITIONS = {
+    '480p': {'height': 480, 'bitrate': '800k'},
+    '720p': {'height': 720, 'bitrate': '2500k'},
+    '1080p': {'height': 1080, 'bitrate': '5000k'},
+}
+# Directory of the audio-only rendition every video variant references through an EXT-X-MEDIA group
+AUDIO_RENDITION = 'audio'
+AUDIO_BITRATE = '128k'
+
+
+def keyframe_args() -> list:
+    """Force a keyframe at every segment boundary so all renditions cut at the same timestamps"""
+    return ['-force_key_frames', f'expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})']
+
+
+def hls_options(segment_format: str = 'ts') -> dict:
+    """
+    Common HLS muxer options for a VOD playlist with fixed-length segments
+    segment_format 'fmp4' muxes fragmented MP4 into a single file per rendition instead of one .ts per segment
+    """
+    options = {'hls_time': str(HLS_SEGMENT_SECONDS), 'hls_playlist_type': 'vod'}
+    if segment_format == 'fmp4':
+        options.update(hls_segment_type='fmp4', hls_flags='single_file')
+    return options
+
+
+def hls_output_args(segment_pattern: str, playlist_path: str, segment_format: str = 'ts') -> list:
+    """HLS output writing playlist_path and the segments named by segment_pattern"""
+    args = ['-f', 'hls']
+    for name, value in hls_options(segment_format).items():
+        args += [f'-{name}', value]
+    return args + ['-hls_segment_filename', segment_pattern, playlist_path]
+
+
+def tee_hls_output(streams: str, segment_pattern: str, playlist_path: str, segment_format: str = 'ts') -> str:
+    """
+    One HLS output of the tee muxer, fed with the encoded streams selected by streams (e.g. 'v:1,a')
+    Option values are quoted so paths may contain ':'
+    """
+    options = {'select': streams, 'f': 'hls', **hls_options(segment_format), 'hls_segment_filename': segment_pattern}
+    return '[' + ':'.join(f"{name}=\\'{value}\\'" for name, value in options.items()) + ']' + playlist_path
+
+
+def encoder_args(encoder: dict = None, outputs: int = 1) -> list:
+    """
+    x264 preset and thread count handed out by the encode scheduler, ffmpeg defaults otherwise
+    -threads applies to every x264 instance of the command, so the slot's thread budget is split
+    between the outputs video streams one ffmpeg encodes
+    """
+    args = []
+    if encoder and encoder.get('preset'):
+        args += ['-preset', encoder['preset']]
+    if encoder and encoder.get('threads'):
+        args += ['-threads', str(max(1, encoder['threads'] // outputs))]
+    return args
+
+
+def audio_args(has_audio: bool) -> list:
+    """Encode audio to AAC, or drop it entirely for silent sources"""
+    return ['-c:a', 'aac'] if has_audio else ['-an']
+
+
+def build_rendition_cmd(input_path: str, out_dir: str, params: dict, has_audio: bool = True, encoder: dict = None,
+                        segment_format: str = 'ts') -> list:
+    """Build the ffmpeg command that encodes one rendition into out_dir/index.m3u8"""
+    return [
+        'ffmpeg', '-y',
+        '-i', input_path,
+        '-vf', f'scale=-2:{params["height"]}',
+        '-c:v', 'libx264',
+        '-b:v', params['bitrate'],
+        *encoder_args(encoder),
+        *keyframe_args(),
+        *audio_args(has_audio),
+        *hls_output_args(
+            os.path.join(out_dir, SEGMENT_FILES[segment_format]),
+            os.path.join(out_dir, 'index.m3u8'),
+            segment_format,
+        ),
+    ]
+
+
+def build_audio_cmd(input_path: str, out_dir: str, segment_format: str = 'ts') -> list:
+    """
+    Build the ffmpeg command that encodes the first audio track once into out_dir/index.m3u8
+    Video is not decoded, so the pass costs little more than reading the source
+    """
+    return [
+        'ffmpeg', '-y',
+        '-i', input_path,
+        '-map', '0:a:0',
+        '-vn',
+        '-c:a', 'aac',
+        '-b:a', AUDIO_BITRATE,
+        *hls_output_args(
+            os.path.join(out_dir, SEGMENT_FILES[segment_format]),
+            os.path.join(out_dir, 'index.m3u8'),
+            segment_format,
+        ),
+    ]
+
+
+def sprite_filter(label_in: str, label_out: str, trickplay: dict) -> str:
+    """Sample one frame every interval seconds, shrink it and tile the frames into sprite sheets"""
+    return (
+        f'[{label_in}]fps=1/{trickplay["interval"]},scale={trickplay["width"]}:{trickplay["height"]},'
+        f'tile={trickplay["columns"]}x{trickplay["rows"]}[{label_out}]'
+    )
+
+
+def preview_output_args(trickplay: dict = None, poster: dict = None) -> list:
+    """
+    Extra outputs fed from the same decode: sprite sheets as numbered JPEGs and a single poster frame
+    They read the filter graph outputs [sprites] and [poster]
+    """
+    args = []
+    if trickplay:
+        args += ['-map', '[sprites]', '-c:v', 'mjpeg', '-q:v', '5', '-f', 'image2', trickplay['pattern']]
+    if poster:
+        args += ['-map', '[poster]', '-ss', f'{poster["time"]:.3f}', '-frames:v', '1', '-q:v', '2', poster['path']]
+    return args
+
+
+def build_preview_cmd(input_path: str, trickplay: dict = None, poster: dict = None) -> list:
+    """Build an ffmpeg command that writes sprite sheets and the poster from one decode"""
+    branches = [name for name, wanted in (('sprites', trickplay), ('poster', poster)) if wanted]
+    graph = [f'[0:v]split={len(branches)}' + ''.join(f'[p{name}]' for name in branches)]
+    if trickplay:
+        graph.append(sprite_filter('psprites', 'sprites', trickplay))
+    if poster:
+        graph.append('[pposter]null[poster]')
+    return [
+        'ffmpeg', '-y',
+        '-i', input_path,
+        '-filter_complex', ';'.join(graph),
+        *preview_output_args(trickplay, poster),
+    ]
+
+
+def build_multi_rendition_cmd(input_path: str, base_dir: str, renditions: dict, has_audio: bool = True,
+                              chunk: dict = None, trickplay: dict = None, poster: dict = None, encoder: dict = None,
+                              segment_format: str = 'ts') -> list:
+    """
+    Build a single ffmpeg command that decodes the source once and writes every rendition
+    The decoded frames are split to one scaler per rendition; the tee muxer writes each scaled stream
+    together with the audio track, which is encoded only once, into base_dir/<resolution>/index.m3u8
+    With chunk={'name', 'start', 'end'} only that time range is encoded, into <name>.m3u8 and
+    <name>_NNN.ts, keeping source timestamps so chunk playlists can be stitched afterwards (chunks are always .ts)
+    trickplay and poster add seek-preview sprite sheets and the poster frame to the same decode
+    """
+    names = list(renditions)
+    count = len(names)
+    previews = [name for name, wanted in (('sprites', trickplay), ('poster', poster)) if wanted]
+    split = f'[0:v]split={count + len(previews)}' + ''.join(f'[v{i}]' for i in range(count))
+    split += ''.join(f'[p{name}]' for name in previews)
+    scalers = [f'[v{i}]scale=-2:{renditions[name]["height"]}[v{i}out]' for i, name in enumerate(names)]
+    if trickplay:
+        scalers.append(sprite_filter('psprites', 'sprites', trickplay))
+    if poster:
+        scalers.append('[pposter]null[poster]')
+    cmd = ['ffmpeg', '-y']
+    if chunk:
+        cmd += ['-ss', f'{chunk["start"]:.3f}']
+    cmd += ['-i', input_path]
+    if chunk:
+        cmd += ['-t', f'{chunk["end"] - chunk["start"]:.3f}', '-output_ts_offset', f'{chunk["start"]:.3f}']
+    cmd += ['-filter_complex', ';'.join([split, *scalers])]
+    for i in range(count):
+        cmd += ['-map', f'[v{i}out]']
+    if has_audio:
+        cmd += ['-map', '0:a:0']
+    cmd += ['-c:v', 'libx264']
+    for i, name in enumerate(names):
+        cmd += [f'-b:v:{i}', renditions[name]['bitrate']]
+    cmd += encoder_args(encoder, count)
+    cmd += keyframe_args()
+    cmd += audio_args(has_audio)
+    outputs = []
+    for i, name in enumerate(names):
+        out_dir = os.path.join(base_dir, name)
+        streams = f'v:{i},a' if has_audio else f'v:{i}'
+        if chunk:
+            outputs.append(tee_hls_output(streams, os.path.join(out_dir, f'{chunk["name"]}_%03d.ts'),
+                                          os.path.join(out_dir, f'{chunk["name"]}.m3u8')))
+        else:
+            outputs.append(tee_hls_output(streams, os.path.join(out_dir, SEGMENT_FILES[segment_format]),
+                                          os.path.join(out_dir, 'index.m3u8'), segment_format))
+    cmd += ['-f', 'tee', '|'.join(outputs)]
+    cmd += preview_output_args(trickplay, poster)
+    return cmd
+
+
+REQUIRED_ENCODERS = ('libx264', 'aac', 'mjpeg')
+
+
+def check_ffmpeg() -> str:
+    """
+    Verify that ffmpeg and ffprobe run and that ffmpeg has every encoder the pipeline uses
+    Returns the ffmpeg version line, raises RuntimeError describing what is missing
+    """
+    try:
+        version = subprocess.run(['ffmpeg', '-hide_banner', '-version'], check=True, capture_output=True)
+        encoders = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], check=True, capture_output=True)
+        subprocess.run(['ffprobe', '-hide_banner', '-version'], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f'ffmpeg/ffprobe are not usable: {e}')
+    available = {line.split()[1] for line in encoders.stdout.decode().splitlines() if len(line.split()) > 1}
+    missing = [name for name in REQUIRED_ENCODERS if name not in available]
+    if missing:
+        raise RuntimeError(f'ffmpeg lacks required encoders: {", ".join(missing)}')
+    return version.stdout.decode().splitlines()[0]
+
+
+def run_ffmpeg(cmd: list, on_progress=None):
+    """
+    Run ffmpeg while reading its -progress output as it arrives
+    on_progress is called with every key=value block ffmpeg reports; only the last
+    STDERR_TAIL_LINES lines of stderr are kept so chatty encodes do not grow memory
+    Raises subprocess.CalledProcessError with that stderr tail on failure, like subprocess.run(check=True)
+    Any exception while ffmpeg runs (job timeout, warm shutdown, a failing on_progress) kills it first,
+    so no orphaned encoder keeps writing into the rendition directory a retry is about to use
+    """
+    cmd = [cmd[0], '-nostats', '-progress', 'pipe:1', *cmd[1:]]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    reader = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+    reader.start()
+    block = {}
+    try:
+        for raw in process.stdout:
+            key, _, value = raw.decode(errors='replace').strip().partition('=')
+            block[key] = value
+            if key == 'progress':
+                if on_progress is not None:
+                    on_progress(block)
+                block = {}
+        returncode = process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    reader.join()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=b''.join(stderr_tail))
@@ -0,0 +1,164 @@
+"""Adaptive HLS master playlist built from measurements of the encoded renditions"""
+import json
+import logging
+import os
+import subprocess
+from video_app.chunking import parse_segments
+from video_app.ffmpeg import AUDIO_RENDITION
+
+logger = logging.getLogger(__name__)
+
+MASTER_PLAYLIST = 'master.m3u8'
+MEDIA_PLAYLIST = 'index.m3u8'
+AUDIO_GROUP = 'audio'
+
+# profile_idc and constraint flags of the RFC 6381 avc1 codec string
+H264_PROFILES = {
+    'Constrained Baseline': '42E0',
+    'Baseline': '4200',
+    'Main': '4D40',
+    'High': '6400',
+}
+AAC_PROFILES = {'LC': 'mp4a.40.2', 'HE-AAC': 'mp4a.40.5', 'HE-AACv2': 'mp4a.40.29'}
+
+
+def segment_sizes(playlist_path: str) -> list:
+    """
+    Return (duration, bytes) for every segment of a media playlist
+    Byte-range segments of single-file renditions use their EXT-X-BYTERANGE length, others the file size
+    """
+    base_dir = os.path.dirname(playlist_path)
+    sizes = []
+    duration, length = None, None
+    with open(playlist_path) as playlist:
+        for line in playlist:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',')[0])
+            elif line.startswith('#EXT-X-BYTERANGE:'):
+                length = int(line[len('#EXT-X-BYTERANGE:'):].split('@')[0])
+            elif line and not line.startswith('#') and duration is not None:
+                sizes.append((duration, length if length is not None else os.path.getsize(os.path.join(base_dir, line))))
+                duration, length = None, None
+    return sizes
+
+
+def measure_bandwidth(playlist_path: str) -> tuple:
+    """
+    Peak and average bitrate of a media playlist in bits per second, from the encoded segments
+    Peak is the highest single-segment bitrate, which is what BANDWIDTH must not be exceeded by
+    """
+    peak, total_bytes, total_duration = 0, 0, 0.0
+    for duration, size in segment_sizes(playlist_path):
+        if duration > 0:
+            peak = max(peak, int(size * 8 / duration))
+        total_bytes += size
+        total_duration += duration
+    if not total_duration:
+        return 0, 0
+    return peak, int(total_bytes * 8 / total_duration)
+
+
+def probe_segment(segment_path: str) -> dict:
+    """Video resolution and RFC 6381 codec strings of an encoded segment, empty if ffprobe fails"""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-print_format', 'json',
+        '-show_streams',
+        segment_path,
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True)
+        streams = json.loads(result.stdout.decode() or '{}').get('streams', [])
+    except (OSError, subprocess.CalledProcessError, ValueError) as e:
+        logger.warning(f'Could not probe segment {segment_path}: {e}')
+        return {}
+    return parse_segment_streams(streams)
+
+
+def parse_segment_streams(streams: list) -> dict:
+    """Reduce ffprobe streams of a segment to resolution and codec strings"""
+    info = {'codecs': []}
+    for stream in streams:
+        if stream.get('codec_type') == 'video' and 'width' not in info:
+            info['width'], info['height'] = stream.get('width'), stream.get('height')
+            codec = video_codec_string(stream)
+            if codec:
+                info['codecs'].append(codec)
+        elif stream.get('codec_type') == 'audio':
+            codec = audio_codec_string(stream)
+            if codec:
+                info['codecs'].append(codec)
+    return info
+
+
+def video_codec_string(stream: dict) -> str:
+    """avc1.PPCCLL string from the H.264 profile and level ffprobe reports"""
+    if stream.get('codec_name') != 'h264':
+        return ''
+    profile = H264_PROFILES.get(stream.get('profile'))
+    level = stream.get('level')
+    if not profile or not isinstance(level, int) or level <= 0:
+        return ''
+    return f'avc1.{profile}{level:02X}'
+
+
+def audio_codec_string(stream: dict) -> str:
+    """mp4a object type string for AAC audio"""
+    if stream.get('codec_name') != 'aac':
+        return ''
+    return AAC_PROFILES.get(stream.get('profile'), 'mp4a.40.2')
+
+
+def describe_variant(base_dir: str, res: str) -> dict:
+    """Measured attributes of one rendition for its EXT-X-STREAM-INF line"""
+    playlist_path = os.path.join(base_dir, res, MEDIA_PLAYLIST)
+    peak, average = measure_bandwidth(playlist_path)
+    variant = {'uri': f'{res}/{MEDIA_PLAYLIST}', 'bandwidth': peak, 'average_bandwidth': average}
+    segments = parse_segments(playlist_path)
+    if segments:
+        variant.update(probe_segment(os.path.join(base_dir, res, segments[0][1])))
+    return variant
+
+
+def build_master(variants: list, audio: dict = None) -> str:
+    """
+    Master playlist text with one variant stream per rendition, lowest bandwidth first
+    With a shared audio rendition it is declared once as an EXT-X-MEDIA group; every variant references
+    the group and adds the audio bitrate and codec, since BANDWIDTH covers all renditions played together
+    """
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-INDEPENDENT-SEGMENTS']
+    if audio:
+        lines.append(
+            f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="{AUDIO_GROUP}",NAME="Audio",DEFAULT=YES,AUTOSELECT=YES,URI="{audio["uri"]}"'
+        )
+    for variant in sorted(variants, key=lambda v: v['bandwidth']):
+        bandwidth, average, codecs = variant['bandwidth'], variant['average_bandwidth'], list(variant.get('codecs', []))
+        if audio:
+            bandwidth += audio['bandwidth']
+            average += audio['average_bandwidth']
+            codecs += audio.get('codecs', [])
+        attributes = [f'BANDWIDTH={bandwidth}', f'AVERAGE-BANDWIDTH={average}']
+        if variant.get('width') and variant.get('height'):
+            attributes.append(f'RESOLUTION={variant["width"]}x{variant["height"]}')
+        if codecs:
+            attributes.append(f'CODECS="{",".join(codecs)}"')
+        if audio:
+            attributes.append(f'AUDIO="{AUDIO_GROUP}"')
+        lines += [f'#EXT-X-STREAM-INF:{",".join(attributes)}', variant['uri']]
+    return '\n'.join(lines) + '\n'
+
+
+def write_master(base_dir: str, renditions: list) -> str:
+    """
+    Measure every rendition and write base_dir/master.m3u8 atomically, returning its path
+    A base_dir/audio rendition, if present, becomes the shared audio group of all variants
+    """
+    variants = [describe_variant(base_dir, res) for res in renditions]
+    has_audio = os.path.exists(os.path.join(base_dir, AUDIO_RENDITION, MEDIA_PLAYLIST))
+    audio = describe_variant(base_dir, AUDIO_RENDITION) if has_audio else None
+    path = os.path.join(base_dir, MASTER_PLAYLIST)
+    with open(path + '.tmp', 'w') as master:
+        master.write(build_master(variants, audio))
+    os.replace(path + '.tmp', path)
+    return path
@@ -0,0 +1,248 @@
+"""
+Host-local cache of small, frequently requested HLS objects on tmpfs, shared by every app process
+Playlists, preview indexes and the first HOT_CACHE_SEGMENTS segments of each rendition are copied into
+HOT_CACHE_DIR the first time they are served; later requests from any worker read the memory-backed copy
+Entries are keyed by the source file's size and mtime, so a rewritten file never hits a stale copy
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HOT_SUFFIXES = ('.m3u8', '.vtt')
+SEGMENT_NUMBER = re.compile(r'^segment_(\d+)\.(ts|m4s)$')
+STATS_DIR = '.stats'
+SIZE_FILE = '.size'
+STATS_FLUSH_INTERVAL = 5
+COUNTERS = ('hits', 'misses', 'stores', 'evictions')
+
+_counters = dict.fromkeys(COUNTERS, 0)
+_last_flush = 0.0
+
+
+def is_hot(path: str, size: int) -> bool:
+    """Playlists and the first segments of a rendition qualify, as long as they are small enough"""
+    if size > settings.HOT_CACHE_MAX_OBJECT:
+        return False
+    name = os.path.basename(path)
+    if name.endswith(HOT_SUFFIXES):
+        return True
+    match = SEGMENT_NUMBER.match(name)
+    return bool(match) and int(match.group(1)) < settings.HOT_CACHE_SEGMENTS
+
+
+def entry_path(path: str, stat: os.stat_result):
+    """Location of the cached copy of a file below MEDIA_ROOT/hls/<video_id>/, None for anything else"""
+    relative = os.path.relpath(path, os.path.join(settings.MEDIA_ROOT, 'hls'))
+    parts = relative.split(os.sep)
+    if len(parts) < 2 or not parts[0].isdigit():
+        return None
+    digest = hashlib.sha1(f'{relative}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()
+    return os.path.join(settings.HOT_CACHE_DIR, parts[0], digest + os.path.splitext(path)[1])
+
+
+def cached_copy(path: str, stat: os.stat_result) -> str:
+    """
+    Path to read the bytes of path from: the hot copy on a hit, a fresh copy after a miss
+    of an eligible object, or path itself; a hit refreshes the entry's mtime for LRU eviction
+    """
+    if not settings.HOT_CACHE_ENABLED or not is_hot(path, stat.st_size):
+        return path
+    hot = entry_path(path, stat)
+    if hot is None:
+        return path
+    try:
+        os.utime(hot)
+        record('hits')
+        return hot
+    except FileNotFoundError:
+        record('misses')
+    try:
+        store(path, hot)
+    except OSError as e:
+        logger.warning(f'Could not cache {path} in {settings.HOT_CACHE_DIR}: {e}')
+        return path
+    return hot
+
+
+def open_cached(path: str, stat: os.stat_result):
+    """
+    Open the bytes of path for reading, from the hot copy where cached_copy offers one
+    Another process may evict or invalidate that copy before it is opened, then path itself is read;
+    once open, the copy stays readable even if it is removed
+    """
+    hot = cached_copy(path, stat)
+    if hot != path:
+        try:
+            return open(hot, 'rb')
+        except FileNotFoundError:
+            logger.debug(f'Hot copy of {path} was removed before it could be read')
+    return open(path, 'rb')
+
+
+def store(path: str, hot: str):
+    """Copy a file into the cache atomically, then evict least recently used entries beyond the budget"""
+    os.makedirs(os.path.dirname(hot), exist_ok=True)
+    temp = f'{hot}.{os.getpid()}.tmp'
+    shutil.copyfile(path, temp)
+    size = os.path.getsize(temp)
+    os.replace(temp, hot)
+    record('stores')
+    if add_size(size) > settings.HOT_CACHE_MAX_BYTES:
+        evict()
+
+
+@contextmanager
+def size_lock():
+    """Exclusive lock on HOT_CACHE_DIR/.size, the byte count of all entries shared by every process"""
+    fd = os.open(os.path.join(settings.HOT_CACHE_DIR, SIZE_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def write_size(fd: int, total: int):
+    """Replace the byte count in the locked .size file"""
+    os.ftruncate(fd, 0)
+    os.pwrite(fd, str(total).encode(), 0)
+
+
+def add_size(delta: int) -> int:
+    """
+    Add delta bytes to the shared byte count and return the new total; without a count yet
+    (fresh tmpfs, older cache) the entries are summed once instead
+    """
+    with size_lock() as fd:
+        current = os.pread(fd, 32, 0)
+        total = max(0, int(current) + delta) if current else sum(size for _, size, _ in entries())
+        write_size(fd, total)
+    return total
+
+
+def entries() -> list:
+    """(mtime, size, path) of every cached object"""
+    found = []
+    if not os.path.isdir(settings.HOT_CACHE_DIR):
+        return found
+    for video_dir in os.scandir(settings.HOT_CACHE_DIR):
+        if video_dir.is_dir() and video_dir.name != STATS_DIR:
+            found.extend(video_entries(video_dir.path))
+    return found
+
+
+def video_entries(video_dir: str) -> list:
+    """(mtime, size, path) of the cached objects of one video"""
+    found = []
+    try:
+        listing = list(os.scandir(video_dir))
+    except FileNotFoundError:
+        return found
+    for entry in listing:
+        if entry.name.endswith('.tmp'):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        found.append((stat.st_mtime, stat.st_size, entry.path))
+    return found
+
+
+def evict():
+    """
+    Remove the least recently used entries once the cache exceeds HOT_CACHE_MAX_BYTES, down to 90% of it
+    Only called when a store pushes the byte count over the budget; the scan also corrects the count,
+    and holding its lock keeps concurrent stores in several workers from evicting twice
+    """
+    with size_lock() as fd:
+        cached = entries()
+        total = sum(size for _, size, _ in cached)
+        removed = 0
+        if total > settings.HOT_CACHE_MAX_BYTES:
+            for _, size, path in sorted(cached):
+                if total <= settings.HOT_CACHE_MAX_BYTES * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+        write_size(fd, total)
+    if removed:
+        record('evictions', removed)
+
+
+def invalidate(video_id: int):
+    """Drop every cached object of a video, e.g. after it was transcoded again"""
+    video_dir = os.path.join(settings.HOT_CACHE_DIR, str(video_id))
+    size = sum(size for _, size, _ in video_entries(video_dir))
+    shutil.rmtree(video_dir, ignore_errors=True)
+    if size:
+        add_size(-size)
+
+
+def record(counter: str, amount: int = 1):
+    """Count a cache event; the counters of this process are written out at most every few seconds"""
+    global _last_flush
+    _counters[counter] += amount
+    if time.monotonic() - _last_flush >= STATS_FLUSH_INTERVAL:
+        _last_flush = time.monotonic()
+        flush_stats()
+
+
+def flush_stats():
+    """Write this process's counters to HOT_CACHE_DIR/.stats/<pid>.json"""
+    stats_dir = os.path.join(settings.HOT_CACHE_DIR, STATS_DIR)
+    try:
+        os.makedirs(stats_dir, exist_ok=True)
+        path = os.path.join(stats_dir, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as out:
+            json.dump(_counters, out)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        logger.warning(f'Could not write hot cache stats: {e}')
+
+
+def cache_stats() -> dict:
+    """
+    Counters summed over all processes that served from this cache, plus its current size and hit rate
+    This process contributes its live counters instead of its last flushed file
+    """
+    totals = dict(_counters)
+    stats_dir = os.path.join(settings.HOT_CACHE_DIR, STATS_DIR)
+    for name in os.listdir(stats_dir) if os.path.isdir(stats_dir) else []:
+        if not name.endswith('.json') or name == f'{os.getpid()}.json':
+            continue
+        try:
+            with open(os.path.join(stats_dir, name)) as source:
+                counters = json.load(source)
+        except (OSError, ValueError):
+            continue
+        for counter in COUNTERS:
+            totals[counter] += counters.get(counter, 0)
+    cached = entries()
+    lookups = totals['hits'] + totals['misses']
+    return {
+        **totals,
+        'hit_rate': totals['hits'] / lookups if lookups else 0.0,
+        'entries': len(cached),
+        'bytes': sum(size for _, size, _ in cached),
+        'max_bytes': settings.HOT_CACHE_MAX_BYTES,
+    }
+
+
+def reset_stats():
+    """Forget the counters of all processes, e.g. before measuring a new cache size"""
+    _counters.update(dict.fromkeys(COUNTERS, 0))
+    shutil.rmtree(os.path.join(settings.HOT_CACHE_DIR, STATS_DIR), ignore_errors=True)
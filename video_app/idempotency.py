@@ -0,0 +1,93 @@
+"""Content-addressed dedup, completion markers and per-video locks that make transcoding safe to retry"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+import django_rq
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DONE_MARKER = '.done'
+LOCK_KEY = 'videoflix:lock:transcode:{video_id}:{label}'
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, read in blocks so multi-GB sources do not need to fit in memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_rendition_done(out_dir: str) -> bool:
+    """A rendition is done once its completion marker was written after a successful encode"""
+    return os.path.exists(os.path.join(out_dir, DONE_MARKER))
+
+
+def mark_rendition_done(out_dir: str):
+    """Write the completion marker so retried jobs skip this rendition"""
+    with open(os.path.join(out_dir, DONE_MARKER), 'w'):
+        pass
+
+
+def link_tree(src_dir: str, dst_dir: str) -> int:
+    """
+    Recreate src_dir under dst_dir with hard links, falling back to copies across filesystems
+    Returns the number of files linked or copied
+    """
+    count = 0
+    for root, _, files in os.walk(src_dir):
+        target_root = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for name in files:
+            src, dst = os.path.join(root, name), os.path.join(target_root, name)
+            if os.path.exists(dst):
+                os.remove(dst)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+            count += 1
+    return count
+
+
+@contextmanager
+def transcode_lock(video_id: int, label: str = 'video'):
+    """
+    Hold a Redis lock so only one worker transcodes a video (or one rendition of it) at a time
+    Yields False if another worker holds the lock. The lock expires after VIDEO_LOCK_TIMEOUT
+    seconds unless it is renewed, so a crashed worker never blocks retries for long
+    """
+    timeout = settings.VIDEO_LOCK_TIMEOUT
+    lock = django_rq.get_connection('default').lock(
+        LOCK_KEY.format(video_id=video_id, label=label), timeout=timeout, blocking=False
+    )
+    if not lock.acquire():
+        yield False
+        return
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(timeout / 3):
+            try:
+                lock.reacquire()
+            except Exception as e:
+                logger.warning(f'Could not renew transcode lock for video {video_id} ({label}): {e}')
+                return
+
+    renewer = threading.Thread(target=renew, daemon=True)
+    renewer.start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        renewer.join()
+        try:
+            lock.release()
+        except Exception as e:
+            logger.warning(f'Could not release transcode lock for video {video_id} ({label}): {e}')
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from video_app.benchmark import compare_reports, run_benchmark
+from video_app.tasks import TranscodeError
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the transcoding pipeline on synthetic ffmpeg sources
+    Runs offline: clips come from lavfi testsrc2/sine and go through the real pipeline of the configured
+    VIDEO_TRANSCODE_MODE, with database, Redis and RQ replaced by in-process stand-ins
+    """
+    help = 'Benchmark HLS transcoding on generated test clips and compare against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--durations', default='10,60', help='Clip durations in seconds, comma separated')
+        parser.add_argument('--heights', default='720,1080', help='Clip heights in pixels, comma separated')
+        parser.add_argument('--repeat', type=int, default=1, help='Runs per case, the fastest one is kept')
+        parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'videoflix-benchmark'),
+                            help='Where clips are cached and outputs are written')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='Compare against this JSON report and fail on regressions')
+        parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed slowdown before failing (0.1 = 10%%)')
+
+    def handle(self, *args, **options):
+        try:
+            durations = [int(value) for value in options['durations'].split(',')]
+            heights = [int(value) for value in options['heights'].split(',')]
+        except ValueError:
+            raise CommandError('--durations and --heights take comma separated integers')
+        try:
+            report = run_benchmark(options['work_dir'], durations, heights, options['repeat'])
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f'ffmpeg failed: {(e.stderr or b"").decode(errors="replace")}')
+        except TranscodeError as e:
+            raise CommandError(f'Transcoding pipeline failed: {e}')
+        for case, result in report['cases'].items():
+            self.stdout.write(
+                f'{case}: {result["wall_seconds"]}s wall, {result["cpu_seconds"]}s cpu, '
+                f'{result["realtime_factor"]}x realtime, {result["peak_rss_kb"] // 1024} MB peak RSS'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f'Report written to {options["output"]}')
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = compare_reports(report, json.load(baseline), options['tolerance'])
+            if regressions:
+                raise CommandError('Transcoding regressed against baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from video_app.cleanup import find_orphans, remove_path, tree_size
+
+
+def format_bytes(size: int) -> str:
+    """Human readable size, e.g. 1.5 GB"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}' if unit != 'B' else f'{size} B'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+
+class Command(BaseCommand):
+    """Find media files and HLS trees no Video or upload refers to anymore and delete them"""
+    help = 'Remove orphaned HLS directories, source files, thumbnails and stale upload parts from MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+        parser.add_argument('--min-age', type=float, default=24,
+                            help='Skip entries modified within this many hours (default 24)')
+
+    def handle(self, *args, **options):
+        orphans = find_orphans(options['min_age'] * 3600)
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        total = 0
+        for category, paths in orphans.items():
+            size = 0
+            for path in paths:
+                size += tree_size(path) if options['dry_run'] else remove_path(path)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'  {path}')
+            total += size
+            self.stdout.write(f'{verb} {len(paths)} orphaned {category} entries ({format_bytes(size)})')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {format_bytes(total)} in total'))
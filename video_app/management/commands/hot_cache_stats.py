@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from video_app.hotcache import cache_stats, reset_stats
+from video_app.management.commands.cleanup_media import format_bytes
+
+
+class Command(BaseCommand):
+    """Report how well the host-local hot-object cache works, to size HOT_CACHE_MAX_BYTES"""
+    help = 'Show hit rate, size and evictions of the tmpfs hot-object cache on this host'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after reporting')
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(f'Cache directory: {settings.HOT_CACHE_DIR}')
+        self.stdout.write(
+            f'Entries: {stats["entries"]}, {format_bytes(stats["bytes"])} of {format_bytes(stats["max_bytes"])}'
+        )
+        self.stdout.write(
+            f'Hits: {stats["hits"]}, misses: {stats["misses"]}, hit rate: {stats["hit_rate"]:.1%}'
+        )
+        self.stdout.write(f'Stores: {stats["stores"]}, evictions: {stats["evictions"]}')
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,46 @@
+import importlib
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.workers import WorkerSupervisor
+from video_app.ffmpeg import check_ffmpeg
+
+
+class Command(BaseCommand):
+    """
+    Run a pool of preloaded RQ workers on this host
+    Scale throughput by raising --workers (RQ_WORKERS); workers are recycled after --max-jobs jobs
+    """
+    help = 'Start N warm RQ workers, recycle them after M jobs and shut them down gracefully on SIGTERM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.RQ_WORKERS, help='Number of worker processes')
+        parser.add_argument('--max-jobs', type=int, default=settings.RQ_WORKER_MAX_JOBS,
+                            help='Jobs a worker runs before it is replaced, 0 for no limit')
+        parser.add_argument('--queues', default=','.join(settings.RQ_WORKER_QUEUES), help='Comma separated queue names')
+        parser.add_argument('--shutdown-timeout', type=float, default=settings.RQ_WORKER_SHUTDOWN_TIMEOUT,
+                            help='Seconds running jobs get to finish on shutdown before workers are killed')
+        parser.add_argument('--health-interval', type=float, default=30, help='Seconds between health reports')
+        parser.add_argument('--health-file', help='Also write the health report as JSON to this file')
+        parser.add_argument('--skip-ffmpeg-check', action='store_true', help='Start without verifying ffmpeg')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        queue_names = [name for name in options['queues'].split(',') if name]
+        unknown = [name for name in queue_names if name not in settings.RQ_QUEUES]
+        if unknown:
+            raise CommandError(f'Unknown queues: {", ".join(unknown)}')
+        if not options['skip_ffmpeg_check']:
+            try:
+                self.stdout.write(f'Using {check_ffmpeg()}')
+            except RuntimeError as e:
+                raise CommandError(str(e))
+        for module in settings.RQ_WORKER_PRELOAD:
+            importlib.import_module(module)
+        self.stdout.write(
+            f'Starting {options["workers"]} workers on {", ".join(queue_names)}, '
+            f'recycled after {options["max_jobs"] or "unlimited"} jobs'
+        )
+        supervisor = WorkerSupervisor(queue_names, options['workers'], options['max_jobs'] or None)
+        supervisor.run(options['shutdown_timeout'], options['health_interval'], options['health_file'])
+        self.stdout.write(self.style.SUCCESS('All workers stopped'))
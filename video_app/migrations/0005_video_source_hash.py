@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0004_video_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='source_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the source file, used to reuse HLS output of identical uploads', max_length=64),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0005_video_source_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='failure_reason',
+            field=models.TextField(blank=True, help_text='Why processing failed, if it did'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='ready_at',
+            field=models.DateTimeField(blank=True, help_text='When the HLS output was completed', null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='status',
+            field=models.CharField(choices=[('uploaded', 'Uploaded'), ('probing', 'Probing'), ('transcoding', 'Transcoding'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='uploaded', help_text='Processing state, only ready videos are listed and streamed', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, help_text='When the processing state last changed', null=True),
+        ),
+    ]
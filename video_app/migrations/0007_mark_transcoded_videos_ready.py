@@ -0,0 +1,27 @@
+import glob
+import os
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+def mark_transcoded_ready(apps, schema_editor):
+    """Videos uploaded before the status field existed are ready if they have a rendition playlist on disk"""
+    Video = apps.get_model('video_app', 'Video')
+    ready_ids = [
+        video_id for video_id in Video.objects.values_list('id', flat=True)
+        if glob.glob(os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id), '*', 'index.m3u8'))
+    ]
+    now = timezone.now()
+    Video.objects.filter(id__in=ready_ids).update(status='ready', status_changed_at=now, ready_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0006_video_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_transcoded_ready, migrations.RunPython.noop),
+    ]
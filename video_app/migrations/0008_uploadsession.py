@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:50
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0007_mark_transcoded_videos_ready'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(help_text='Original file name of the upload', max_length=255)),
+                ('title', models.CharField(help_text='Title of the video created from this upload', max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(blank=True, max_length=100, null=True)),
+                ('length', models.BigIntegerField(help_text='Total size of the upload in bytes')),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes received so far')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+                ('video', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='video_app.video')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0009_video_media_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailedTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(help_text='RQ job id, reused when the job is requeued', max_length=64, unique=True)),
+                ('queue', models.CharField(max_length=50)),
+                ('func_name', models.CharField(help_text='Dotted path of the task function', max_length=255)),
+                ('args', models.JSONField(blank=True, default=list)),
+                ('timeout', models.PositiveIntegerField(blank=True, help_text='Job timeout in seconds, empty for the queue default', null=True)),
+                ('reason', models.TextField(help_text='Exception of the last attempt')),
+                ('traceback', models.TextField(blank=True)),
+                ('attempts', models.PositiveIntegerField(default=1, help_text='Attempts made before the job was given up')),
+                ('failed_at', models.DateTimeField(help_text='When the last attempt failed')),
+                ('requeued_at', models.DateTimeField(blank=True, help_text='When the job was last requeued from the admin', null=True)),
+                ('video', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='failed_tasks', to='video_app.video')),
+            ],
+            options={
+                'ordering': ('-failed_at',),
+            },
+        ),
+    ]
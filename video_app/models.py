@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.db import models
 import os
+import uuid
 
 
 def video_upload_path(instance, filename):
@@ -13,6 +15,15 @@ def thumbnail_upload_path(instance, filename):
 
 class Video(models.Model):
     """Stores an uploaded video file and basic metadata"""
+
+    class Status(models.TextChoices):
+        """Processing states: uploaded -> probing -> transcoding -> ready / failed"""
+        UPLOADED = 'uploaded', 'Uploaded'
+        PROBING = 'probing', 'Probing'
+        TRANSCODING = 'transcoding', 'Transcoding'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
     title = models.CharField(max_length=200, help_text='Short display title')
     description = models.TextField(blank=True, help_text='Optional description')
     category = models.CharField(
@@ -23,6 +34,18 @@ class Video(models.Model):
     )
     file = models.FileField(upload_to=video_upload_path, help_text='Upload the original video file')
     thumbnail = models.ImageField(upload_to=thumbnail_upload_path, blank=True, null=True, help_text='Optional thumbnail image')
+    source_hash = models.CharField(max_length=64, blank=True, db_index=True, help_text='SHA-256 of the source file, used to reuse HLS output of identical uploads')
+    duration = models.FloatField(blank=True, null=True, db_index=True, help_text='Runtime in seconds, from ffprobe')
+    width = models.PositiveIntegerField(blank=True, null=True, help_text='Source width in pixels')
+    height = models.PositiveIntegerField(blank=True, null=True, db_index=True, help_text='Source height in pixels')
+    bitrate = models.PositiveBigIntegerField(blank=True, null=True, help_text='Source bitrate in bits per second')
+    video_codec = models.CharField(max_length=32, blank=True, help_text='Source video codec, e.g. h264')
+    audio_codec = models.CharField(max_length=32, blank=True, help_text='Source audio codec, empty for silent sources')
+    file_size = models.PositiveBigIntegerField(blank=True, null=True, help_text='Source file size in bytes')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.UPLOADED, db_index=True, help_text='Processing state, only ready videos are listed and streamed')
+    status_changed_at = models.DateTimeField(blank=True, null=True, help_text='When the processing state last changed')
+    ready_at = models.DateTimeField(blank=True, null=True, help_text='When the HLS output was completed')
+    failure_reason = models.TextField(blank=True, help_text='Why processing failed, if it did')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -35,3 +58,56 @@ class Video(models.Model):
     def __str__(self):
         """Human-readable representation in admin dropdowns etc"""
         return self.title or f'Video #{self.pk}'
+
+
+class UploadSession(models.Model):
+    """
+    A resumable (tus-style) upload in progress
+    Chunks are appended to MEDIA_ROOT/uploads/<id>.part; once offset reaches length the file
+    is moved into videos/ and the Video is created
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255, help_text='Original file name of the upload')
+    title = models.CharField(max_length=200, help_text='Title of the video created from this upload')
+    description = models.TextField(blank=True)
+    category = models.CharField(max_length=100, blank=True, null=True)
+    length = models.BigIntegerField(help_text='Total size of the upload in bytes')
+    offset = models.BigIntegerField(default=0, help_text='Bytes received so far')
+    video = models.OneToOneField(Video, on_delete=models.SET_NULL, blank=True, null=True, related_name='upload_session')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta options for the UploadSession model"""
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        """Human-readable representation in admin dropdowns etc"""
+        return f'{self.filename} ({self.offset}/{self.length} bytes)'
+
+
+class FailedTask(models.Model):
+    """
+    Dead-letter entry for a background job that still failed after its last retry
+    Keeps what is needed to requeue it: queue, function path, positional arguments and the RQ job id
+    """
+    job_id = models.CharField(max_length=64, unique=True, help_text='RQ job id, reused when the job is requeued')
+    queue = models.CharField(max_length=50)
+    func_name = models.CharField(max_length=255, help_text='Dotted path of the task function')
+    args = models.JSONField(default=list, blank=True)
+    timeout = models.PositiveIntegerField(blank=True, null=True, help_text='Job timeout in seconds, empty for the queue default')
+    video = models.ForeignKey(Video, on_delete=models.SET_NULL, blank=True, null=True, related_name='failed_tasks')
+    reason = models.TextField(help_text='Exception of the last attempt')
+    traceback = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=1, help_text='Attempts made before the job was given up')
+    failed_at = models.DateTimeField(help_text='When the last attempt failed')
+    requeued_at = models.DateTimeField(blank=True, null=True, help_text='When the job was last requeued from the admin')
+
+    class Meta:
+        """Meta options for the FailedTask model"""
+        ordering = ('-failed_at',)
+
+    def __str__(self):
+        """Human-readable representation in admin dropdowns etc"""
+        return f'{self.func_name.rsplit(".", 1)[-1]} ({self.job_id})'
@@ -0,0 +1,113 @@
+"""
+Read-ahead of the segments a player requests next: HLS playback is sequential, so once segment_010.ts
+is served the following PREFETCH_SEGMENTS files of the same rendition are handed to the kernel with
+posix_fadvise(WILLNEED), which reads them into the page cache in the background
+The advice is issued by one daemon thread per process, so a slow open() on the network-backed media
+volume never delays the response being served
+"""
+import logging
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_NAME = re.compile(r'^(?P<prefix>.*_)(?P<number>\d+)(?P<suffix>\.(ts|m4s))$')
+QUEUE_SIZE = 256
+RECENT_SIZE = 4096
+READ_BLOCK = 1024 * 1024
+
+_queue = queue.Queue(QUEUE_SIZE)
+_recent = OrderedDict()
+_worker_pid = None
+_lock = threading.Lock()
+
+
+def next_segments(path: str, count: int) -> list:
+    """Paths of the count segments after path in the same rendition, keeping the zero padding of the number"""
+    directory, name = os.path.split(path)
+    match = SEGMENT_NAME.match(name)
+    if not match:
+        return []
+    digits = match.group('number')
+    first = int(digits) + 1
+    return [
+        os.path.join(directory, f"{match.group('prefix')}{number:0{len(digits)}d}{match.group('suffix')}")
+        for number in range(first, first + count)
+    ]
+
+
+def warm(path: str) -> bool:
+    """
+    Start reading a whole file into the page cache, False if it does not exist
+    Without posix_fadvise (macOS) the file is read and discarded instead
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while os.read(fd, READ_BLOCK):
+                pass
+    finally:
+        os.close(fd)
+    return True
+
+
+def seen(path: str) -> bool:
+    """True if this process advised path recently, otherwise remember it (LRU of RECENT_SIZE paths)"""
+    if path in _recent:
+        _recent.move_to_end(path)
+        return True
+    _recent[path] = None
+    if len(_recent) > RECENT_SIZE:
+        _recent.popitem(last=False)
+    return False
+
+
+def run(paths: queue.Queue):
+    """Prefetch thread: warm every queued segment that was not advised recently"""
+    while True:
+        path = paths.get()
+        try:
+            if not seen(path) and not warm(path):
+                _recent.pop(path, None)
+        except OSError as e:
+            logger.warning(f'Read-ahead of {path} failed: {e}')
+        finally:
+            paths.task_done()
+
+
+def ensure_worker():
+    """Start the prefetch thread of this process; a forked worker gets its own queue and thread"""
+    global _queue, _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    with _lock:
+        if _worker_pid != os.getpid():
+            _queue = queue.Queue(QUEUE_SIZE)
+            _recent.clear()
+            threading.Thread(target=run, args=(_queue,), name='segment-prefetch', daemon=True).start()
+            _worker_pid = os.getpid()
+
+
+def prefetch_next(path: str):
+    """
+    Queue read-ahead of the PREFETCH_SEGMENTS segments after path; never blocks,
+    paths that do not fit into the queue are dropped, 0 disables read-ahead
+    """
+    count = settings.PREFETCH_SEGMENTS
+    if count <= 0:
+        return
+    ensure_worker()
+    for segment in next_segments(path, count):
+        try:
+            _queue.put_nowait(segment)
+        except queue.Full:
+            return
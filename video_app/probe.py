@@ -0,0 +1,99 @@
+"""Source analysis with ffprobe before any encoding work is scheduled"""
+import json
+import subprocess
+
+
+class ProbeError(Exception):
+    """Raised when a source file cannot be read or decoded as a video"""
+
+
+def probe_source(input_path: str) -> dict:
+    """
+    Read resolution, duration, codecs and bitrate of a source file with ffprobe
+    Raises ProbeError for files that are not a decodable video
+    """
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        input_path,
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True)
+        data = json.loads(result.stdout.decode() or '{}')
+    except subprocess.CalledProcessError as e:
+        raise ProbeError(f'ffprobe could not read {input_path}: {e.stderr.decode().strip()}')
+    except ValueError:
+        raise ProbeError(f'ffprobe returned invalid output for {input_path}')
+    info = parse_probe_output(data)
+    verify_decodable(input_path)
+    return info
+
+
+def parse_probe_output(data: dict) -> dict:
+    """Reduce ffprobe JSON to the fields the pipeline needs"""
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video' and not is_cover_art(s)), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    if video is None:
+        raise ProbeError('Source has no video stream')
+    fmt = data.get('format', {})
+    info = {
+        'width': to_int(video.get('width')),
+        'height': to_int(video.get('height')),
+        'duration': to_float(fmt.get('duration')) or to_float(video.get('duration')),
+        'video_codec': video.get('codec_name', ''),
+        'audio_codec': audio.get('codec_name', '') if audio else '',
+        'bitrate': to_int(fmt.get('bit_rate')) or to_int(video.get('bit_rate')),
+        'has_audio': audio is not None,
+    }
+    if not info['width'] or not info['height']:
+        raise ProbeError('Source video stream has no resolution')
+    if not info['duration']:
+        raise ProbeError('Source has no duration')
+    return info
+
+
+def verify_decodable(input_path: str):
+    """Decode the first video frame so truncated or corrupt files fail before encoding"""
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-i', input_path,
+        '-map', '0:v:0',
+        '-frames:v', '1',
+        '-f', 'null', '-',
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        raise ProbeError(f'Source {input_path} cannot be decoded: {e.stderr.decode().strip()}')
+
+
+def select_renditions(renditions: dict, source_height: int) -> dict:
+    """Drop renditions that would upscale the source, always keeping the smallest one"""
+    selected = {res: params for res, params in renditions.items() if params['height'] <= source_height}
+    if not selected:
+        smallest = min(renditions, key=lambda res: renditions[res]['height'])
+        selected = {smallest: renditions[smallest]}
+    return selected
+
+
+def is_cover_art(stream: dict) -> bool:
+    """Embedded cover images show up as video streams but carry no motion"""
+    return bool(stream.get('disposition', {}).get('attached_pic'))
+
+
+def to_int(value) -> int:
+    """Parse an ffprobe number, ffprobe reports missing values as 'N/A'"""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def to_float(value) -> float:
+    """Parse an ffprobe float, ffprobe reports missing values as 'N/A'"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
@@ -0,0 +1,116 @@
+"""Live transcoding progress, published to Redis by the workers and read by the API"""
+import json
+import logging
+import time
+import django_rq
+from django.conf import settings
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+PROGRESS_KEY = 'videoflix:progress:{video_id}'
+PROGRESS_TTL = 60 * 60 * 24
+
+
+def progress_key(video_id: int) -> str:
+    """Redis hash holding one JSON entry per rendition (or chunk) of a video"""
+    return PROGRESS_KEY.format(video_id=video_id)
+
+
+def publish_progress(video_id: int, labels, stats: dict):
+    """
+    Store the same stats under every label, e.g. all renditions of a single-decode run
+    Progress is best effort, a Redis hiccup must never abort an encode
+    """
+    payload = json.dumps(stats)
+    key = progress_key(video_id)
+    try:
+        with django_rq.get_connection('default').pipeline() as pipe:
+            for label in labels:
+                pipe.hset(key, label, payload)
+            pipe.expire(key, PROGRESS_TTL)
+            pipe.execute()
+    except RedisError as e:
+        logger.warning(f'Could not publish progress for video {video_id}: {e}')
+
+
+def get_progress(video_id: int) -> dict:
+    """Return {label: stats} for everything currently known about a video"""
+    connection = django_rq.get_connection('default')
+    raw = connection.hgetall(progress_key(video_id))
+    return {label.decode(): json.loads(value) for label, value in raw.items()}
+
+
+def get_all_progress() -> dict:
+    """Return progress of every video that published stats within PROGRESS_TTL"""
+    connection = django_rq.get_connection('default')
+    prefix = PROGRESS_KEY.format(video_id='')
+    result = {}
+    for key in connection.scan_iter(match=f'{prefix}*', count=500):
+        video_id = key.decode()[len(prefix):]
+        if video_id.isdigit():
+            result[int(video_id)] = get_progress(int(video_id))
+    return result
+
+
+def summarize(progress: dict) -> float:
+    """Overall percent of a video as the mean over its published labels"""
+    if not progress:
+        return 0.0
+    return round(sum(stats.get('percent', 0.0) for stats in progress.values()) / len(progress), 1)
+
+
+def parse_speed(value: str) -> float:
+    """ffmpeg reports speed as e.g. '1.52x' or 'N/A' before the first frame"""
+    try:
+        return float(value.rstrip('x'))
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+class ProgressReporter:
+    """
+    Callback for run_ffmpeg that turns raw -progress blocks into percent, speed and ETA
+    and publishes them at most every VIDEO_PROGRESS_INTERVAL seconds
+    """
+
+    def __init__(self, video_id: int, labels, duration: float):
+        self.video_id = video_id
+        self.labels = list(labels)
+        self.duration = duration or 0.0
+        self.interval = settings.VIDEO_PROGRESS_INTERVAL
+        self.last_publish = None
+        self.last_stats = {'percent': 0.0, 'speed': 0.0, 'eta_seconds': None, 'out_time': 0.0}
+
+    def __call__(self, block: dict):
+        finished = block.get('progress') == 'end'
+        now = time.monotonic()
+        if not finished and self.last_publish is not None and now - self.last_publish < self.interval:
+            return
+        self.last_publish = now
+        self.last_stats = self.stats(block, finished)
+        publish_progress(self.video_id, self.labels, self.last_stats)
+
+    def stats(self, block: dict, finished: bool) -> dict:
+        """Compute the published numbers from one progress block"""
+        try:
+            out_time = max(0, int(block.get('out_time_us', 0))) / 1_000_000
+        except ValueError:
+            out_time = 0.0
+        speed = parse_speed(block.get('speed'))
+        percent = 100.0 if finished else (min(99.9, out_time / self.duration * 100) if self.duration else 0.0)
+        remaining = max(0.0, self.duration - out_time)
+        return {
+            'state': 'done' if finished else 'running',
+            'percent': round(percent, 1),
+            'speed': speed,
+            'eta_seconds': 0 if finished else (round(remaining / speed) if speed else None),
+            'out_time': round(out_time, 1),
+            'updated_at': time.time(),
+        }
+
+    def fail(self):
+        """Mark the labels as failed so clients stop waiting"""
+        stats = {**self.last_stats, 'state': 'failed', 'eta_seconds': None, 'updated_at': time.time()}
+        publish_progress(self.video_id, self.labels, stats)
@@ -0,0 +1,103 @@
+"""Host-aware limit on concurrent ffmpeg encodes and the x264 threads/preset each encode gets"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import django_rq
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SLOTS_KEY = 'videoflix:encode-slots:{host}'
+
+# Lease-based semaphore: members are slot tokens scored by their expiry timestamp,
+# so slots of crashed workers free themselves once their lease runs out
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return redis.call('ZCARD', KEYS[1])
+end
+return 0
+"""
+
+
+def available_cores() -> int:
+    """Cores this process may run on, respecting CPU affinity of the container"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_encode(cores: int, policy: str, queue_depth: int, max_concurrent: int = 0) -> dict:
+    """
+    Decide how many encodes may run on a host and how they share its cores
+    'throughput' runs many encodes with few threads each, 'latency' few encodes with many threads
+    The x264 preset gets faster as the queue of waiting videos grows
+    """
+    if max_concurrent:
+        slots = max_concurrent
+    elif policy == 'latency':
+        slots = max(1, cores // 8)
+    else:
+        slots = max(1, cores // 2)
+    preset = settings.ENCODE_PRESETS[0][1]
+    for min_depth, name in settings.ENCODE_PRESETS:
+        if queue_depth >= min_depth:
+            preset = name
+    return {'slots': slots, 'threads': max(1, cores // slots), 'preset': preset}
+
+
+def queue_depth() -> int:
+    """Number of jobs waiting in the queues that carry encode work"""
+    return sum(django_rq.get_queue(name).count for name in settings.ENCODE_QUEUES)
+
+
+@contextmanager
+def encode_slot(label: str = ''):
+    """
+    Block until this host has a free encode slot and yield the encoder settings to use
+    Yields {'threads', 'preset'}; with the scheduler disabled both are None and ffmpeg picks defaults
+    """
+    if not settings.ENCODE_SCHEDULER_ENABLED:
+        yield {'threads': None, 'preset': None}
+        return
+    connection = django_rq.get_connection('default')
+    plan = plan_encode(available_cores(), settings.ENCODE_POLICY, queue_depth(), settings.ENCODE_MAX_CONCURRENT)
+    key = SLOTS_KEY.format(host=socket.gethostname())
+    token = uuid.uuid4().hex
+    lease = settings.ENCODE_SLOT_LEASE
+    acquire = connection.register_script(ACQUIRE_SCRIPT)
+    waited = time.monotonic()
+    while True:
+        now = time.time()
+        active = acquire(keys=[key], args=[now, now + lease, plan['slots'], token, lease * 2])
+        if active:
+            break
+        time.sleep(settings.ENCODE_SLOT_POLL)
+    logger.info(
+        f'Encode slot {active}/{plan["slots"]} acquired for {label or "encode"} after {time.monotonic() - waited:.1f}s: '
+        f'{plan["threads"]} threads, preset {plan["preset"]}'
+    )
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(lease / 3):
+            try:
+                connection.zadd(key, {token: time.time() + lease}, xx=True)
+            except Exception as e:
+                logger.warning(f'Could not renew encode slot for {label or "encode"}: {e}')
+
+    renewer = threading.Thread(target=renew, daemon=True)
+    renewer.start()
+    try:
+        yield {'threads': plan['threads'], 'preset': plan['preset']}
+    finally:
+        stop.set()
+        renewer.join()
+        connection.zrem(key, token)
@@ -1,10 +1,11 @@
-import django_rq
 import logging                                 
 from django.apps import apps                   
-from django.db.models.signals import post_save 
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver           
 from video_app.models import Video
-from video_app.tasks import transcode_to_hls
+from video_app.cleanup import remove_video_media
+from video_app.tasks import enqueue_job, plan_transcode
 
 logger = logging.getLogger(__name__)           
 Video = apps.get_model('video_app', 'Video')   
@@ -17,7 +18,17 @@ def video_post_save(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=Video)
 def enqueue_transcode(sender, instance: Video, created, **kwargs):
-    """After a new Video is uploaded, enqueue transcoding job"""
+    """After a new Video is uploaded, enqueue the probe job that schedules transcoding on a size-matched queue"""
     if created and instance.file:
-        queue = django_rq.get_queue("default")
-        queue.enqueue(transcode_to_hls, instance.id, instance.file.path)
\ No newline at end of file
+        enqueue_job("video_short", plan_transcode, instance.id, instance.file.path, video_id=instance.id)
+
+
+@receiver(post_delete, sender=Video)
+def enqueue_media_cleanup(sender, instance: Video, **kwargs):
+    """
+    After a Video is deleted, remove its source, HLS tree and thumbnail in the background
+    The job is only enqueued once the delete is committed, so it never sees the row it checks
+    for shared files, and a rolled back delete keeps its media
+    """
+    args = (instance.id, instance.file.name or '', instance.thumbnail.name or '')
+    transaction.on_commit(lambda: enqueue_job("maintenance", remove_video_media, *args))
@@ -0,0 +1,63 @@
+"""HMAC-signed, expiring segment URLs that are rewritten into the rendition playlists the API serves"""
+import re
+import time
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+SIGNATURE_SALT = 'video_app.signing.segment'
+URI_ATTRIBUTE = re.compile(r'URI="([^"?]+)"')
+
+
+def expiry(now: float = None) -> int:
+    """
+    Expiry timestamp for URLs issued now: at least MEDIA_URL_TTL seconds ahead, rounded up to a
+    quarter of the TTL so every viewer of a video gets the same URLs within that window,
+    which keeps playlist ETags stable and lets a shared cache reuse segment responses
+    """
+    now = time.time() if now is None else now
+    window = max(1, settings.MEDIA_URL_TTL // 4)
+    return int(-(-(now + settings.MEDIA_URL_TTL) // window) * window)
+
+
+def signature(video_id: int, resolution: str, name: str, expires: int) -> str:
+    """Hex HMAC-SHA256 over the segment location and its expiry"""
+    value = f'{video_id}/{resolution}/{name}:{expires}'
+    return salted_hmac(SIGNATURE_SALT, value, secret=settings.MEDIA_SIGNING_KEY, algorithm='sha256').hexdigest()[:32]
+
+
+def verify(video_id: int, resolution: str, name: str, expires: str, sig: str, now: float = None) -> bool:
+    """Constant-time check of a signed segment URL; expired or malformed parameters never verify"""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < (time.time() if now is None else now):
+        return False
+    return constant_time_compare(signature(video_id, resolution, name, expires), sig or '')
+
+
+def signed_uri(video_id: int, resolution: str, uri: str, expires: int) -> str:
+    """Append expires and sig to a segment URI relative to the rendition playlist"""
+    return f'{uri}?expires={expires}&sig={signature(video_id, resolution, uri, expires)}'
+
+
+def sign_playlist(text: str, video_id: int, resolution: str, expires: int) -> str:
+    """
+    Sign every segment line and URI="..." attribute (EXT-X-MAP init sections) of a media playlist
+    The same file name appears on every byte-range line of a single-file rendition, so each name is signed once
+    """
+    signed = {}
+
+    def sign(uri: str) -> str:
+        if uri not in signed:
+            signed[uri] = signed_uri(video_id, resolution, uri, expires)
+        return signed[uri]
+
+    lines = []
+    for line in text.splitlines():
+        if line.startswith('#'):
+            line = URI_ATTRIBUTE.sub(lambda match: f'URI="{sign(match.group(1))}"', line)
+        elif line.strip():
+            line = sign(line.strip())
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
@@ -1,76 +1,574 @@
 import subprocess
 import os
 import logging
+import shutil
+import django_rq
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.utils import timezone
+from rq import Callback, Retry
 from video_app.models import Video
+from video_app.ffmpeg import (
+    AUDIO_RENDITION, RENDITIONS, build_audio_cmd, build_rendition_cmd, build_multi_rendition_cmd, build_preview_cmd,
+    run_ffmpeg,
+)
+from video_app.probe import ProbeError, probe_source, select_renditions
+from video_app.chunking import probe_keyframes, plan_chunks, chunk_name, stitch_playlists
+from video_app.etags import write_etags
+from video_app.hls import write_master
+from video_app.hotcache import invalidate
+from video_app.progress import ProgressReporter
+from video_app.scheduler import encode_slot
+from video_app.trickplay import TRICKPLAY_DIR, VTT_NAME, trickplay_params, write_vtt
+from video_app.idempotency import hash_file, is_rendition_done, mark_rendition_done, link_tree, transcode_lock
 
 logger = logging.getLogger(__name__)
 
+COMPLETE_MARKER = '.complete'
 
-def generate_thumbnail(video_id: int, input_path: str):
+
+class TranscodeError(Exception):
+    """Raised when a transcoding step fails and dependent jobs must not run"""
+
+
+class TranscodeDeferred(Exception):
+    """
+    Raised by a job whose encode lock is held by another worker; the dead-letter callback reschedules
+    the same job (its dependents keep waiting) without using up a retry or touching the video
     """
-    Create a single thumbnail (JPG) from the middle of the video using ffmpeg
+
+
+def generate_thumbnail(video_id: int, input_path: str, info: dict = None):
+    """
+    Create a single thumbnail (JPG) from the video using ffmpeg
     Saves to MEDIA_ROOT/thumbnails/<video_id>.jpg
+    When the source info is known, the trickplay sprite sheets are rendered in the same decode
     """
     output_dir = os.path.join(settings.MEDIA_ROOT, 'thumbnails')
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, f'{video_id}.jpg')
-
-    cmd = [
-        'ffmpeg', '-y',
-        '-i', input_path,
-        '-ss', '00:00:02',
-        '-vframes', '1',
-        '-q:v', '2',
-        output_path
-    ]
+    base_dir = os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id))
+    trickplay = trickplay_params(base_dir, info) if info and settings.TRICKPLAY_ENABLED else None
+    cmd = build_preview_cmd(input_path, trickplay, poster_params(output_path, info))
     try:
         subprocess.run(cmd, check=True, capture_output=True)
+        if trickplay:
+            write_vtt(base_dir, info['duration'], trickplay)
         logger.info(f'Thumbnail created for video {video_id}')
-        from video_app.models import Video
-        video = Video.objects.get(id=video_id)
-        relative_path = os.path.relpath(output_path, settings.MEDIA_ROOT)
-        video.thumbnail.name = relative_path
-        video.save(update_fields=['thumbnail'])
+        save_thumbnail(video_id, output_path)
+        return True
     except subprocess.CalledProcessError as e:
         logger.error(f'Failed to create thumbnail for {video_id}: {e.stderr.decode()}')
+        return False
+
+
+def poster_params(output_path: str, info: dict = None) -> dict:
+    """Take the poster at 2 seconds, or halfway through clips shorter than 4 seconds"""
+    time = min(2.0, info['duration'] / 2) if info else 2.0
+    return {'time': time, 'path': output_path}
+
+
+def save_thumbnail(video_id: int, output_path: str):
+    """Point Video.thumbnail at a file below MEDIA_ROOT"""
+    video = Video.objects.get(id=video_id)
+    relative_path = os.path.relpath(output_path, settings.MEDIA_ROOT)
+    video.thumbnail.name = relative_path
+    video.save(update_fields=['thumbnail'])
+
+
+def set_status(video_id: int, status: str, reason: str = ''):
+    """
+    Record a processing state change of a video with a single UPDATE
+    A late failure of a leftover job never downgrades a video that is already ready
+    """
+    now = timezone.now()
+    updates = {'status': status, 'status_changed_at': now, 'failure_reason': reason}
+    if status == Video.Status.READY:
+        updates['ready_at'] = now
+    videos = Video.objects.filter(pk=video_id)
+    if status == Video.Status.FAILED:
+        videos = videos.exclude(status=Video.Status.READY)
+    videos.update(**updates)
+
+
+def plan_transcode(video_id: int, input_path: str):
+    """
+    Probe the source before any encoding is scheduled
+    Broken uploads are rejected here, otherwise the encoding job(s) are enqueued
+    with only the renditions that make sense for the source
+    Identical sources that were transcoded before are reused instead of encoded again
+    """
+    with transcode_lock(video_id, 'plan') as acquired:
+        if not acquired:
+            logger.info(f'Video {video_id} is already being planned by another worker')
+            return None
+        set_status(video_id, Video.Status.PROBING)
+        try:
+            info = probe_source(input_path)
+        except ProbeError as e:
+            logger.error(f'Rejected video {video_id}, source cannot be transcoded: {e}')
+            set_status(video_id, Video.Status.FAILED, str(e))
+            return None
+        store_metadata(video_id, input_path, info)
+        renditions = list(select_renditions(RENDITIONS, info['height']))
+        logger.info(
+            f'Probed video {video_id}: {info["width"]}x{info["height"]}, {info["duration"]:.1f}s, '
+            f'{info["video_codec"]}/{info["audio_codec"] or "no audio"}, renditions {", ".join(renditions)}'
+        )
+        if reuse_duplicate(video_id, input_path):
+            return None
+        queue_name = transcode_queue(info, renditions)
+        set_status(video_id, Video.Status.TRANSCODING)
+        if settings.VIDEO_TRANSCODE_MODE == 'fanout':
+            return enqueue_fanout(video_id, input_path, renditions, info, queue_name)
+        if use_chunking(info) and settings.VIDEO_CHUNK_DISPATCH == 'rq':
+            return enqueue_chunked(video_id, input_path, renditions, info, queue_name)
+        return enqueue_job(queue_name, transcode_to_hls, video_id, input_path, info,
+                           video_id=video_id, timeout=job_timeout(encode_cost(info, renditions)))
+
+
+def store_metadata(video_id: int, input_path: str, info: dict):
+    """Persist the probed source properties so list pages never have to open the media files"""
+    Video.objects.filter(pk=video_id).update(
+        duration=info['duration'],
+        width=info['width'],
+        height=info['height'],
+        bitrate=info['bitrate'] or None,
+        video_codec=info['video_codec'],
+        audio_codec=info['audio_codec'],
+        file_size=os.path.getsize(input_path),
+    )
+
+
+def encode_cost(info: dict, renditions: list) -> float:
+    """Estimated encode work in 720p-equivalent seconds: duration times the pixel count of every rendition"""
+    pixels = sum((RENDITIONS[res]['height'] / 720) ** 2 for res in renditions)
+    return info['duration'] * pixels
+
+
+def transcode_queue(info: dict, renditions: list) -> str:
+    """Expensive encodes go to 'video_long' so they cannot hold up short clips on 'video_short'"""
+    return 'video_long' if encode_cost(info, renditions) > settings.VIDEO_LONG_COST else 'video_short'
+
+
+def job_timeout(cost: float) -> int:
+    """Seconds a job with the given encode cost may run: a fixed base plus VIDEO_JOB_TIMEOUT_FACTOR per cost second"""
+    return int(settings.VIDEO_JOB_TIMEOUT_BASE + settings.VIDEO_JOB_TIMEOUT_FACTOR * cost)
 
 
-def transcode_to_hls(video_id: int, input_path: str):
+def retry_policy():
+    """Retry failed video jobs VIDEO_JOB_RETRIES times, doubling the delay after every attempt"""
+    if settings.VIDEO_JOB_RETRIES <= 0:
+        return None
+    delays = [settings.VIDEO_JOB_RETRY_DELAY * 2 ** attempt for attempt in range(settings.VIDEO_JOB_RETRIES)]
+    return Retry(max=settings.VIDEO_JOB_RETRIES, interval=delays)
+
+
+def enqueue_job(queue_name: str, func, *args, video_id: int = None, timeout: int = None, depends_on=None):
+    """
+    Enqueue a video job with retries and the dead-letter callback
+    Without a timeout the queue's DEFAULT_TIMEOUT applies; the video id is kept in the job meta
+    so a final failure can be attributed to its video
+    """
+    queue = django_rq.get_queue(queue_name)
+    return queue.enqueue(
+        func, *args,
+        job_timeout=timeout,
+        retry=retry_policy(),
+        on_failure=Callback('video_app.deadletter.record_failure'),
+        meta={'video_id': video_id},
+        depends_on=depends_on,
+    )
+
+
+def reuse_duplicate(video_id: int, input_path: str) -> bool:
+    """
+    Hash the source and, if an identical upload is already fully transcoded,
+    hard-link its HLS output and thumbnail instead of encoding again
+    """
+    source_hash = hash_file(input_path)
+    Video.objects.filter(pk=video_id).update(source_hash=source_hash)
+    candidates = Video.objects.filter(source_hash=source_hash).exclude(pk=video_id).order_by('pk')
+    for duplicate in candidates:
+        duplicate_dir = os.path.join(settings.MEDIA_ROOT, 'hls', str(duplicate.id))
+        marker = os.path.join(duplicate_dir, COMPLETE_MARKER)
+        if not os.path.exists(marker):
+            continue
+        with open(marker) as complete:
+            renditions = complete.read().split()
+        linked = link_tree(duplicate_dir, os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id)))
+        reuse_thumbnail(video_id, duplicate)
+        finalize_transcode(video_id, renditions)
+        logger.info(f'Video {video_id} has the same source as video {duplicate.id}, reused {linked} HLS files')
+        return True
+    return False
+
+
+def reuse_thumbnail(video_id: int, duplicate: Video):
+    """Link the thumbnail of an identical video to MEDIA_ROOT/thumbnails/<video_id>.<ext>"""
+    if not duplicate.thumbnail:
+        return
+    source = os.path.join(settings.MEDIA_ROOT, duplicate.thumbnail.name)
+    if not os.path.exists(source):
+        return
+    relative_path = os.path.join('thumbnails', f'{video_id}{os.path.splitext(source)[1]}')
+    target = os.path.join(settings.MEDIA_ROOT, relative_path)
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+    video = Video.objects.get(id=video_id)
+    video.thumbnail.name = relative_path
+    video.save(update_fields=['thumbnail'])
+
+
+def transcode_to_hls(video_id: int, input_path: str, info: dict = None):
     """
     Transcode a video file into multiple HLS renditions (480p, 720p, 1080p)
     Creates directories: media/hls/<video_id>/<resolution>/index.m3u8
+    Depending on VIDEO_TRANSCODE_MODE the source is decoded once for all renditions ('single'),
+    once per rendition ('serial') or split into keyframe-aligned chunks encoded in parallel ('chunked')
+    Renditions finished by an earlier attempt are skipped, so a retried job resumes
+    A failed rendition raises TranscodeError so RQ retries the job instead of leaving renditions missing;
+    a held encode lock defers the job until the other worker is done instead of counting as success
     """
+    with transcode_lock(video_id, 'encode') as acquired:
+        if not acquired:
+            raise TranscodeDeferred(f'Video {video_id} is already being transcoded by another worker')
+        encode_all_renditions(video_id, input_path, info)
+
+
+def encode_all_renditions(video_id: int, input_path: str, info: dict = None):
+    """Encode every pending rendition of a video, then create the thumbnail and finalize"""
     logger.info(f'Starting HLS transcoding for video {video_id}: {input_path}')
+    set_status(video_id, Video.Status.TRANSCODING)
+    if info is None:
+        try:
+            info = probe_source(input_path)
+        except ProbeError as e:
+            logger.error(f'Rejected video {video_id}, source cannot be transcoded: {e}')
+            set_status(video_id, Video.Status.FAILED, str(e))
+            return
+    renditions = select_renditions(RENDITIONS, info['height'])
     base_dir = os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id))
     os.makedirs(base_dir, exist_ok=True)
-    renditions = {
-        '480p': {'scale': 'scale=-2:480', 'bitrate': '800k'},
-        '720p': {'scale': 'scale=-2:720', 'bitrate': '2500k'},
-        '1080p': {'scale': 'scale=-2:1080', 'bitrate': '5000k'},
-    }
-    for res, params in renditions.items():
-        out_dir = os.path.join(base_dir, res)
-        os.makedirs(out_dir, exist_ok=True)
-        out_path = os.path.join(out_dir, 'index.m3u8')
-        cmd = [
-            'ffmpeg', '-y',
-            '-i', input_path,
-            '-vf', params['scale'],
-            '-c:v', 'libx264',
-            '-b:v', params['bitrate'],
-            '-c:a', 'aac',
-            '-f', 'hls',
-            '-hls_time', '4',
-            '-hls_playlist_type', 'vod',
-            '-hls_segment_filename', os.path.join(out_dir, 'segment_%03d.ts'),
-            out_path,
-        ]
-        logger.debug(f'Running ffmpeg for {res}: {" ".join(cmd)}')
-        try:
-            subprocess.run(cmd, check=True, capture_output=True)
-            logger.info(f'Successfully transcoded {res} for video {video_id}')
-        except subprocess.CalledProcessError as e:
-            logger.error(f'Error transcoding {res} for video {video_id}: {e.stderr.decode()}')
+    pending = {res: params for res, params in renditions.items() if not is_rendition_done(os.path.join(base_dir, res))}
+    finished = [res for res in renditions if res not in pending]
+    if finished:
+        logger.info(f'Video {video_id}: skipping finished renditions {", ".join(finished)}')
+    if not pending:
+        ok = True
+    elif use_chunking(info):
+        ok = transcode_chunked(video_id, input_path, base_dir, pending, info)
+    elif settings.VIDEO_TRANSCODE_MODE in ('single', 'chunked'):
+        ok = transcode_single_decode(video_id, input_path, base_dir, pending, info)
+    else:
+        ok = all(
+            transcode_rendition(video_id, input_path, base_dir, res, params, info)
+            for res, params in pending.items()
+        )
+    if not ok:
+        fail_transcode(video_id, f'Encoding failed for video {video_id}')
+    if shared_audio(info) and not transcode_audio(video_id, input_path, base_dir, info):
+        fail_transcode(video_id, f'Audio encoding failed for video {video_id}')
     logger.info(f'Completed transcoding for video {video_id}')
-    generate_thumbnail(video_id, input_path)
+    if not (previews_done(video_id) or generate_thumbnail(video_id, input_path, info)):
+        fail_transcode(video_id, f'Thumbnail generation failed for video {video_id}')
+    finalize_transcode(video_id, list(renditions))
+
+
+def previews_done(video_id: int) -> bool:
+    """True if the encode pass already produced the poster and, if enabled, the trickplay index"""
+    poster = os.path.exists(os.path.join(settings.MEDIA_ROOT, 'thumbnails', f'{video_id}.jpg'))
+    vtt = os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id), TRICKPLAY_DIR, VTT_NAME)
+    return poster and (os.path.exists(vtt) or not settings.TRICKPLAY_ENABLED)
+
+
+def transcode_rendition(video_id: int, input_path: str, base_dir: str, res: str, params: dict, info: dict):
+    """Encode a single rendition with its own ffmpeg process, unless an earlier attempt finished it"""
+    out_dir = os.path.join(base_dir, res)
+    if is_rendition_done(out_dir):
+        logger.info(f'Rendition {res} of video {video_id} is already done')
+        return True
+    os.makedirs(out_dir, exist_ok=True)
+    reporter = ProgressReporter(video_id, [res], info['duration'])
+    try:
+        with encode_slot(f'video {video_id} {res}') as encoder:
+            cmd = build_rendition_cmd(input_path, out_dir, params, muxed_audio(info), encoder,
+                                      settings.HLS_SEGMENT_FORMAT)
+            logger.debug(f'Running ffmpeg for {res}: {" ".join(cmd)}')
+            run_ffmpeg(cmd, reporter)
+        mark_rendition_done(out_dir)
+        logger.info(f'Successfully transcoded {res} for video {video_id}')
+        return True
+    except subprocess.CalledProcessError as e:
+        reporter.fail()
+        logger.error(f'Error transcoding {res} for video {video_id}: {e.stderr.decode(errors="replace")}')
+        return False
+
+
+def shared_audio(info: dict) -> bool:
+    """
+    With HLS_SHARED_AUDIO the audio track is encoded once into its own rendition instead of into every variant
+    Chunked encodes always do this: AAC encoded per chunk would restart with encoder priming at every boundary
+    """
+    return info['has_audio'] and (settings.HLS_SHARED_AUDIO or use_chunking(info))
+
+
+def muxed_audio(info: dict) -> bool:
+    """Whether the video renditions themselves carry the audio track"""
+    return info['has_audio'] and not shared_audio(info)
+
+
+def transcode_audio(video_id: int, input_path: str, base_dir: str, info: dict):
+    """Encode the audio track once into base_dir/audio, unless an earlier attempt finished it"""
+    out_dir = os.path.join(base_dir, AUDIO_RENDITION)
+    if is_rendition_done(out_dir):
+        logger.info(f'Audio of video {video_id} is already done')
+        return True
+    os.makedirs(out_dir, exist_ok=True)
+    reporter = ProgressReporter(video_id, [AUDIO_RENDITION], info['duration'])
+    try:
+        cmd = build_audio_cmd(input_path, out_dir, settings.HLS_SEGMENT_FORMAT)
+        logger.debug(f'Running ffmpeg for audio: {" ".join(cmd)}')
+        run_ffmpeg(cmd, reporter)
+        mark_rendition_done(out_dir)
+        logger.info(f'Successfully encoded audio for video {video_id}')
+        return True
+    except subprocess.CalledProcessError as e:
+        reporter.fail()
+        logger.error(f'Error encoding audio for video {video_id}: {e.stderr.decode(errors="replace")}')
+        return False
+
+
+def transcode_single_decode(video_id: int, input_path: str, base_dir: str, renditions: dict, info: dict):
+    """
+    Decode the source once and encode all renditions in one ffmpeg run
+    The same decode also renders the trickplay sprite sheets and the poster frame
+    """
+    for res in renditions:
+        os.makedirs(os.path.join(base_dir, res), exist_ok=True)
+    trickplay = trickplay_params(base_dir, info) if settings.TRICKPLAY_ENABLED else None
+    thumbnail_dir = os.path.join(settings.MEDIA_ROOT, 'thumbnails')
+    os.makedirs(thumbnail_dir, exist_ok=True)
+    poster = poster_params(os.path.join(thumbnail_dir, f'{video_id}.jpg'), info)
+    reporter = ProgressReporter(video_id, renditions, info['duration'])
+    try:
+        with encode_slot(f'video {video_id}') as encoder:
+            cmd = build_multi_rendition_cmd(input_path, base_dir, renditions, muxed_audio(info),
+                                            trickplay=trickplay, poster=poster, encoder=encoder,
+                                            segment_format=settings.HLS_SEGMENT_FORMAT)
+            logger.debug(f'Running single-decode ffmpeg: {" ".join(cmd)}')
+            run_ffmpeg(cmd, reporter)
+        for res in renditions:
+            mark_rendition_done(os.path.join(base_dir, res))
+        if trickplay:
+            write_vtt(base_dir, info['duration'], trickplay)
+        if os.path.exists(poster['path']):
+            save_thumbnail(video_id, poster['path'])
+        logger.info(f'Successfully transcoded {", ".join(renditions)} for video {video_id}')
+        return True
+    except subprocess.CalledProcessError as e:
+        reporter.fail()
+        logger.error(f'Error transcoding video {video_id}: {e.stderr.decode(errors="replace")}')
+        return False
+
+
+def use_chunking(info: dict) -> bool:
+    """
+    Only sources long enough to keep several ffmpeg processes busy are split into chunks
+    Chunk playlists are stitched segment by segment, so chunking needs .ts output
+    """
+    return (
+        settings.VIDEO_TRANSCODE_MODE == 'chunked'
+        and settings.HLS_SEGMENT_FORMAT == 'ts'
+        and info['duration'] >= settings.VIDEO_CHUNK_MIN_DURATION
+    )
+
+
+def plan_source_chunks(input_path: str, info: dict) -> list:
+    """Cut the source at keyframes into chunks of about VIDEO_CHUNK_SECONDS"""
+    keyframes = probe_keyframes(input_path)
+    spans = plan_chunks(keyframes, info['duration'], settings.VIDEO_CHUNK_SECONDS)
+    return [{'name': chunk_name(i), 'start': start, 'end': end} for i, (start, end) in enumerate(spans)]
+
+
+def encode_chunk(video_id: int, input_path: str, base_dir: str, renditions: dict, info: dict, chunk: dict):
+    """Encode one time range of the source into all renditions, skipping chunks a previous attempt finished"""
+    if all(is_playlist_complete(os.path.join(base_dir, res, f'{chunk["name"]}.m3u8')) for res in renditions):
+        logger.info(f'{chunk["name"]} of video {video_id} is already encoded')
+        return True
+    reporter = ProgressReporter(video_id, [chunk['name']], chunk['end'] - chunk['start'])
+    try:
+        with encode_slot(f'video {video_id} {chunk["name"]}') as encoder:
+            cmd = build_multi_rendition_cmd(input_path, base_dir, renditions, muxed_audio(info), chunk, encoder=encoder)
+            logger.debug(f'Running ffmpeg for {chunk["name"]} of video {video_id}: {" ".join(cmd)}')
+            run_ffmpeg(cmd, reporter)
+        logger.info(f'Encoded {chunk["name"]} ({chunk["start"]:.1f}s-{chunk["end"]:.1f}s) for video {video_id}')
+        return True
+    except subprocess.CalledProcessError as e:
+        reporter.fail()
+        logger.error(f'Error encoding {chunk["name"]} for video {video_id}: {e.stderr.decode(errors="replace")}')
+        return False
+
+
+def stitch_chunks(base_dir: str, renditions, chunks: list):
+    """Join the chunk playlists of every rendition into one contiguous index.m3u8"""
+    for res in renditions:
+        out_dir = os.path.join(base_dir, res)
+        if is_rendition_done(out_dir):
+            continue
+        playlists = [os.path.join(out_dir, f'{chunk["name"]}.m3u8') for chunk in chunks]
+        stitch_playlists(playlists, os.path.join(out_dir, 'index.m3u8'))
+        mark_rendition_done(out_dir)
+
+
+def transcode_chunked(video_id: int, input_path: str, base_dir: str, renditions: dict, info: dict):
+    """Encode keyframe-aligned chunks in parallel ffmpeg processes, then stitch the playlists"""
+    try:
+        chunks = plan_source_chunks(input_path, info)
+    except ProbeError as e:
+        logger.error(f'Cannot split video {video_id} into chunks: {e}')
+        return False
+    for res in renditions:
+        os.makedirs(os.path.join(base_dir, res), exist_ok=True)
+    logger.info(f'Encoding video {video_id} in {len(chunks)} chunks with {settings.VIDEO_CHUNK_WORKERS} parallel processes')
+    with ThreadPoolExecutor(max_workers=settings.VIDEO_CHUNK_WORKERS) as pool:
+        results = list(pool.map(
+            lambda chunk: encode_chunk(video_id, input_path, base_dir, renditions, info, chunk),
+            chunks,
+        ))
+    if not all(results):
+        return False
+    stitch_chunks(base_dir, renditions, chunks)
+    return True
+
+
+def enqueue_chunked(video_id: int, input_path: str, renditions: list, info: dict, queue_name: str = 'default'):
+    """
+    Enqueue one job per source chunk so chunks of one long video are encoded on several workers
+    A stitch job joins the playlists once all chunks are done, the finalizer waits for it and the thumbnail
+    """
+    chunks = plan_source_chunks(input_path, info)
+    chunk_jobs = [
+        enqueue_job(queue_name, encode_chunk_job, video_id, input_path, renditions, info, chunk, video_id=video_id,
+                    timeout=job_timeout(encode_cost({'duration': chunk['end'] - chunk['start']}, renditions)))
+        for chunk in chunks
+    ]
+    stitch_job = enqueue_job(queue_name, stitch_chunks_job, video_id, renditions, chunks,
+                             video_id=video_id, depends_on=chunk_jobs)
+    thumbnail_job = enqueue_job(queue_name, generate_thumbnail_job, video_id, input_path, info,
+                                video_id=video_id, timeout=job_timeout(info['duration']))
+    jobs = [stitch_job, thumbnail_job, *enqueue_audio(video_id, input_path, info, queue_name)]
+    return enqueue_job(queue_name, finalize_transcode, video_id, renditions, video_id=video_id, depends_on=jobs)
+
+
+def encode_chunk_job(video_id: int, input_path: str, renditions: list, info: dict, chunk: dict):
+    """RQ entry point for one chunk, raises so the stitch job is not released on failure"""
+    base_dir = os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id))
+    for res in renditions:
+        os.makedirs(os.path.join(base_dir, res), exist_ok=True)
+    selected = {res: RENDITIONS[res] for res in renditions}
+    with transcode_lock(video_id, chunk['name']) as acquired:
+        if not acquired:
+            raise TranscodeDeferred(f'{chunk["name"]} of video {video_id} is being encoded by another worker')
+        if not encode_chunk(video_id, input_path, base_dir, selected, info, chunk):
+            fail_transcode(video_id, f'Encoding {chunk["name"]} failed for video {video_id}')
+
+
+def stitch_chunks_job(video_id: int, renditions: list, chunks: list):
+    """RQ entry point that stitches the chunk playlists of a video"""
+    stitch_chunks(os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id)), renditions, chunks)
+
+
+def enqueue_fanout(video_id: int, input_path: str, renditions: list, info: dict, queue_name: str = 'default'):
+    """
+    Enqueue one job per rendition plus a thumbnail job so several workers can encode in parallel
+    A finalizer job depends on all of them and only runs once every part has succeeded
+    """
+    jobs = [
+        enqueue_job(queue_name, transcode_rendition_job, video_id, input_path, res, info,
+                    video_id=video_id, timeout=job_timeout(encode_cost(info, [res])))
+        for res in renditions
+    ]
+    jobs.append(enqueue_job(queue_name, generate_thumbnail_job, video_id, input_path, info,
+                            video_id=video_id, timeout=job_timeout(info['duration'])))
+    jobs += enqueue_audio(video_id, input_path, info, queue_name)
+    return enqueue_job(queue_name, finalize_transcode, video_id, renditions, video_id=video_id, depends_on=jobs)
+
+
+def transcode_rendition_job(video_id: int, input_path: str, res: str, info: dict):
+    """RQ entry point for one rendition, raises so dependent jobs are not released on failure"""
+    base_dir = os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id))
+    with transcode_lock(video_id, res) as acquired:
+        if not acquired:
+            raise TranscodeDeferred(f'Rendition {res} of video {video_id} is being transcoded by another worker')
+        if not transcode_rendition(video_id, input_path, base_dir, res, RENDITIONS[res], info):
+            fail_transcode(video_id, f'Transcoding {res} failed for video {video_id}')
+
+
+def enqueue_audio(video_id: int, input_path: str, info: dict, queue_name: str) -> list:
+    """Enqueue the shared audio encode as its own job, returns an empty list when renditions carry audio"""
+    if not shared_audio(info):
+        return []
+    return [enqueue_job(queue_name, transcode_audio_job, video_id, input_path, info,
+                        video_id=video_id, timeout=job_timeout(info['duration']))]
+
+
+def transcode_audio_job(video_id: int, input_path: str, info: dict):
+    """RQ entry point for the shared audio rendition, raises so dependent jobs are not released on failure"""
+    base_dir = os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id))
+    with transcode_lock(video_id, AUDIO_RENDITION) as acquired:
+        if not acquired:
+            raise TranscodeDeferred(f'Audio of video {video_id} is being encoded by another worker')
+        if not transcode_audio(video_id, input_path, base_dir, info):
+            fail_transcode(video_id, f'Audio encoding failed for video {video_id}')
+
+
+def generate_thumbnail_job(video_id: int, input_path: str, info: dict = None):
+    """RQ entry point for the thumbnail and sprites, raises so dependent jobs are not released on failure"""
+    if not generate_thumbnail(video_id, input_path, info):
+        fail_transcode(video_id, f'Thumbnail generation failed for video {video_id}')
+
+
+def fail_transcode(video_id: int, reason: str):
+    """
+    Raise so RQ retries the job and does not release the jobs depending on this one
+    The video is only marked as failed by record_failure once the last retry failed
+    """
+    raise TranscodeError(reason)
+
+
+def finalize_transcode(video_id: int, renditions: list = None):
+    """
+    Mark a video as completely transcoded once every rendition playlist is finished
+    Writes the adaptive master playlist, the ETag sidecar and the marker file media/hls/<video_id>/.complete
+    listing the renditions, then switches the video to ready so it shows up in the list
+    A shared audio rendition, if one was started, has to be complete as well
+    """
+    renditions = renditions or list(RENDITIONS)
+    base_dir = os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id))
+    required = renditions + [AUDIO_RENDITION] if os.path.isdir(os.path.join(base_dir, AUDIO_RENDITION)) else renditions
+    for res in required:
+        if not is_playlist_complete(os.path.join(base_dir, res, 'index.m3u8')):
+            fail_transcode(video_id, f'Rendition {res} is incomplete for video {video_id}')
+    write_master(base_dir, renditions)
+    write_etags(base_dir)
+    invalidate(video_id)
+    # replaced rather than rewritten: a reused duplicate's tree hard-links the other video's marker
+    marker_path = os.path.join(base_dir, COMPLETE_MARKER)
+    with open(marker_path + '.tmp', 'w') as marker:
+        marker.write('\n'.join(renditions))
+    os.replace(marker_path + '.tmp', marker_path)
+    set_status(video_id, Video.Status.READY)
+    logger.info(f'Video {video_id} is fully transcoded')
+
+
+def is_playlist_complete(playlist_path: str) -> bool:
+    """A VOD playlist is complete once ffmpeg has written its end tag"""
+    if not os.path.exists(playlist_path):
+        return False
+    with open(playlist_path) as playlist:
+        return '#EXT-X-ENDLIST' in playlist.read()
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def hot_cache_dir(settings, tmp_path_factory):
+    """Keep the hot cache of every test in its own temporary directory instead of /dev/shm"""
+    settings.HOT_CACHE_DIR = str(tmp_path_factory.mktemp('hot-cache'))
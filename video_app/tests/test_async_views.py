@@ -0,0 +1,105 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory
+from auth_app.jwt_utils import create_access_token
+from video_app.api.async_views import AsyncVideoListView, AsyncVideoSegmentView, AsyncVideoStreamView
+from video_app.models import Video
+from video_app.signing import signature
+
+
+@pytest.fixture
+def rendition(tmp_path, settings):
+    """Ready video with a 720p rendition: one TS segment and a single-file fMP4"""
+    settings.MEDIA_ROOT = tmp_path
+    settings.HOT_CACHE_ENABLED = False
+    video = Video.objects.create(title='Async', file='videos/async.mp4', status=Video.Status.READY)
+    out_dir = tmp_path / 'hls' / str(video.id) / '720p'
+    out_dir.mkdir(parents=True)
+    (out_dir / 'segment_000.ts').write_bytes(b'a' * 100_000)
+    (out_dir / 'stream.mp4').write_bytes(b'0123456789')
+    (out_dir / 'index.m3u8').write_text('#EXTM3U\n#EXTINF:4.0,\nsegment_000.ts\n#EXT-X-ENDLIST\n')
+    return video
+
+
+@pytest.fixture
+def cookies(db):
+    """access_token cookie of an active user"""
+    user = get_user_model().objects.create_user(username='a@example.com', email='a@example.com', password='pw',
+                                                is_active=True)
+    return {'access_token': create_access_token(user)}
+
+
+def call(view, path: str, cookies=None, headers=None, **kwargs):
+    """Run an async view on a GET request and return the response with its body read"""
+    request = AsyncRequestFactory().get(path, headers=headers)
+    request.COOKIES.update(cookies or {})
+
+    async def run():
+        response = await view.as_view()(request, **kwargs)
+        body = b''.join([chunk async for chunk in response]) if response.streaming else response.content
+        return response, body
+    return async_to_sync(run)()
+
+
+@pytest.mark.django_db
+def test_async_views_require_authentication(rendition):
+    """Without cookie the async views answer 403 like the DRF views"""
+    response, body = call(AsyncVideoListView, '/api/video/')
+    assert response.status_code == 403
+    assert b'Authentication credentials were not provided.' in body
+    response, _ = call(AsyncVideoSegmentView, '/', cookies={'access_token': 'garbage'},
+                       movie_id=rendition.id, resolution='720p', segment='segment_000.ts')
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_async_list_and_playlist(rendition, cookies, settings):
+    """List returns ready videos only, the playlist carries signed segment URLs"""
+    Video.objects.create(title='Pending', file='videos/pending.mp4')
+    response, body = call(AsyncVideoListView, '/api/video/', cookies)
+    assert response.status_code == 200
+    assert [item['title'] for item in json.loads(body)] == ['Async']
+    settings.MEDIA_SIGNED_URLS = True
+    response, body = call(AsyncVideoStreamView, '/', cookies, movie_id=rendition.id, resolution='720p')
+    assert response.status_code == 200
+    assert b'segment_000.ts?expires=' in body
+    response, body = call(AsyncVideoStreamView, '/', cookies, movie_id=rendition.id, resolution='1080p')
+    assert response.status_code == 404
+    assert b'Manifest not found' in body
+
+
+@pytest.mark.django_db
+def test_async_segment_streams_whole_file_and_ranges(rendition, cookies):
+    """Segments are streamed in chunks by an async iterator, Range requests get 206"""
+    kwargs = {'movie_id': rendition.id, 'resolution': '720p'}
+    response, body = call(AsyncVideoSegmentView, '/', cookies, segment='segment_000.ts', **kwargs)
+    assert response.status_code == 200
+    assert response.is_async
+    assert response['Content-Length'] == '100000'
+    assert response['Content-Type'] == 'video/MP2T'
+    assert body == b'a' * 100_000
+    response, body = call(AsyncVideoSegmentView, '/', cookies, {'Range': 'bytes=2-5'}, segment='stream.mp4', **kwargs)
+    assert response.status_code == 206
+    assert response['Content-Range'] == 'bytes 2-5/10'
+    assert body == b'2345'
+    etag = response['ETag']
+    response, _ = call(AsyncVideoSegmentView, '/', cookies, {'If-None-Match': etag}, segment='stream.mp4', **kwargs)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_async_signed_segment_skips_database(rendition, django_assert_num_queries):
+    """A valid signature is enough, a tampered one is rejected"""
+    expires = 2 ** 31
+    sig = signature(rendition.id, '720p', 'stream.mp4', expires)
+    kwargs = {'movie_id': rendition.id, 'resolution': '720p', 'segment': 'stream.mp4'}
+    with django_assert_num_queries(0):
+        response, body = call(AsyncVideoSegmentView, f'/?expires={expires}&sig={sig}', **kwargs)
+    assert response.status_code == 200
+    assert body == b'0123456789'
+    assert response['Cache-Control'].startswith('public')
+    response, body = call(AsyncVideoSegmentView, f'/?expires={expires}&sig={sig[:-1]}0', **kwargs)
+    assert response.status_code == 403
+    assert b'Invalid or expired media signature.' in body
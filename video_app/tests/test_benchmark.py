@@ -0,0 +1,101 @@
+import os
+import pytest
+from video_app.benchmark import BENCHMARK_VIDEO_ID, LocalQueue, build_clip_cmd, compare_reports, measure_case
+from video_app.tasks import COMPLETE_MARKER
+
+
+def report(**metrics):
+    """Benchmark report with a single 720p case"""
+    case = {'wall_seconds': 10.0, 'cpu_seconds': 40.0, 'peak_rss_kb': 500_000, **metrics}
+    return {'cases': {'720p_10s': case}}
+
+
+def test_clip_cmd_is_deterministic_lavfi_source():
+    """Test clips come from testsrc2 and sine with bit-exact, single-threaded encoding"""
+    cmd = build_clip_cmd('/tmp/clip.mp4', 10, 720)
+    assert 'testsrc2=size=1280x720:rate=25:duration=10' in cmd
+    assert 'sine=frequency=440:sample_rate=48000:duration=10' in cmd
+    assert cmd[cmd.index('-threads') + 1] == '1'
+    assert '+bitexact' in cmd
+
+
+@pytest.fixture
+def fake_encoder(monkeypatch):
+    """
+    Replace ffprobe and ffmpeg with stand-ins that write finished playlists and the poster,
+    returning the list of ffmpeg commands the pipeline ran
+    """
+    cmds = []
+    info = {'width': 1280, 'height': 720, 'duration': 10.0, 'has_audio': True, 'bitrate': 2_000_000,
+            'video_codec': 'h264', 'audio_codec': 'aac'}
+
+    def fake_ffmpeg(cmd, on_progress=None):
+        cmds.append(cmd)
+        for arg in cmd:
+            if arg.endswith('.m3u8'):
+                for path in (output.split(']')[-1] for output in arg.split('|')):
+                    name = os.path.basename(path)
+                    segment = name.replace('.m3u8', '_000.ts') if name.startswith('chunk_') else 'segment_000.ts'
+                    with open(path, 'w') as playlist:
+                        playlist.write(f'#EXTM3U\n#EXTINF:4.0,\n{segment}\n#EXT-X-ENDLIST\n')
+                    with open(os.path.join(os.path.dirname(path), segment), 'wb') as ts:
+                        ts.write(b'ts')
+            elif arg.endswith('.jpg'):
+                open(arg, 'wb').close()
+
+    monkeypatch.setattr('video_app.tasks.probe_source', lambda path: dict(info))
+    monkeypatch.setattr('video_app.tasks.probe_keyframes', lambda path: [0.0, 5.0])
+    monkeypatch.setattr('video_app.tasks.run_ffmpeg', fake_ffmpeg)
+
+    def fake_run(cmd, **kwargs):
+        if cmd[0] != 'ffmpeg':
+            raise FileNotFoundError(cmd[0])
+        fake_ffmpeg(cmd)
+
+    monkeypatch.setattr('video_app.tasks.subprocess.run', fake_run)
+    return cmds
+
+
+@pytest.mark.parametrize('mode, chunked, ffmpeg_runs', [
+    ('single', False, 2),
+    ('serial', False, 4),
+    ('fanout', False, 4),
+    ('chunked', True, 4),
+])
+def test_benchmark_runs_real_pipeline(tmp_path, settings, fake_encoder, mode, chunked, ffmpeg_runs):
+    """Every mode goes through plan_transcode and its jobs, up to the master playlist and the completion marker"""
+    settings.VIDEO_TRANSCODE_MODE = mode
+    settings.VIDEO_CHUNK_DISPATCH = 'rq'
+    settings.VIDEO_CHUNK_MIN_DURATION = 5 if chunked else 3600
+    settings.VIDEO_CHUNK_SECONDS = 5
+    settings.HLS_SEGMENT_FORMAT = 'ts'
+    settings.HLS_SHARED_AUDIO = True
+    settings.TRICKPLAY_ENABLED = False
+    result = measure_case('/in/testsrc_720p_10s.mp4', str(tmp_path), 10.0)
+    assert len(fake_encoder) == ffmpeg_runs
+    assert any(cmd[2] == '-ss' for cmd in fake_encoder) == chunked
+    base_dir = tmp_path / 'hls' / str(BENCHMARK_VIDEO_ID)
+    assert (base_dir / 'master.m3u8').exists()
+    assert (base_dir / COMPLETE_MARKER).exists()
+    assert set(result['output_bytes']) == {'480p', '720p', 'audio'}
+
+
+def test_local_queue_runs_jobs_after_their_dependencies():
+    """Independent jobs run first, a job with dependencies only once they are done"""
+    order = []
+    queue = LocalQueue(2)
+    first = queue.enqueue('default', order.append, 'a')
+    second = queue.enqueue('default', order.append, 'b')
+    queue.enqueue('default', order.append, 'final', depends_on=[first, second])
+    queue.run()
+    assert sorted(order[:2]) == ['a', 'b']
+    assert order[2] == 'final'
+
+
+def test_regressions_beyond_tolerance_are_reported():
+    """Only metrics that grew by more than the tolerance count as regressions"""
+    baseline = report()
+    assert compare_reports(report(wall_seconds=10.5), baseline, 0.1) == []
+    regressions = compare_reports(report(wall_seconds=12.0, peak_rss_kb=400_000), baseline, 0.1)
+    assert regressions == ['720p_10s: wall_seconds 10.0 -> 12.0 (+20.0%)']
+    assert compare_reports({'cases': {'1080p_60s': {'wall_seconds': 99.0}}}, baseline, 0.1) == []
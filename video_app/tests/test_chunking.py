@@ -0,0 +1,67 @@
+import os
+from video_app.chunking import plan_chunks, stitch_playlists
+from video_app.ffmpeg import RENDITIONS, build_multi_rendition_cmd
+from video_app.tasks import muxed_audio, shared_audio
+
+
+def test_plan_chunks_cuts_on_keyframes():
+    """Every chunk boundary is a keyframe and chunks are at least the target length"""
+    keyframes = [0.0, 7.5, 13.0, 21.0, 29.0, 36.5, 44.0, 52.0, 58.0]
+    chunks = plan_chunks(keyframes, 60.0, 20)
+    assert chunks == [(0.0, 21.0), (21.0, 44.0), (44.0, 60.0)]
+    assert all(start in keyframes for start, _ in chunks)
+
+
+def test_plan_chunks_merges_short_tail():
+    """A boundary that would leave a tiny last chunk is skipped"""
+    keyframes = [0.0, 10.0, 20.0, 30.0]
+    assert plan_chunks(keyframes, 33.0, 10) == [(0.0, 10.0), (10.0, 20.0), (20.0, 33.0)]
+
+
+def test_plan_chunks_short_source_is_one_chunk():
+    """Sources shorter than one chunk are not split"""
+    assert plan_chunks([0.0, 2.0, 4.0], 5.0, 60) == [(0.0, 5.0)]
+
+
+def test_stitch_playlists_builds_one_contiguous_playlist(tmp_path):
+    """Chunk segments are concatenated in order and the chunk playlists are removed"""
+    first = tmp_path / 'chunk_000.m3u8'
+    second = tmp_path / 'chunk_001.m3u8'
+    first.write_text('#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXTINF:4.000000,\nchunk_000_000.ts\n#EXTINF:2.500000,\nchunk_000_001.ts\n#EXT-X-ENDLIST\n')
+    second.write_text('#EXTM3U\n#EXT-X-TARGETDURATION:5\n#EXTINF:4.600000,\nchunk_001_000.ts\n#EXT-X-ENDLIST\n')
+    for name in ('chunk_000_000.ts', 'chunk_000_001.ts', 'chunk_001_000.ts'):
+        (tmp_path / name).write_bytes(name.encode())
+    out = tmp_path / 'index.m3u8'
+    assert stitch_playlists([str(first), str(second)], str(out)) == 3
+    lines = out.read_text().splitlines()
+    assert '#EXT-X-TARGETDURATION:5' in lines
+    assert [line for line in lines if line.endswith('.ts')] == ['segment_000.ts', 'segment_001.ts', 'segment_002.ts']
+    assert (tmp_path / 'segment_002.ts').read_bytes() == b'chunk_001_000.ts'
+    assert not (tmp_path / 'chunk_000_000.ts').exists()
+    assert lines[-1] == '#EXT-X-ENDLIST'
+    assert lines.count('#EXT-X-ENDLIST') == 1
+    assert not first.exists() and not second.exists()
+
+
+def test_chunk_cmd_encodes_time_range_with_source_offset():
+    """Chunk commands seek to the keyframe, limit the duration and keep source timestamps"""
+    chunk = {'name': 'chunk_002', 'start': 120.0, 'end': 181.5}
+    cmd = build_multi_rendition_cmd('/in.mp4', '/out', RENDITIONS, True, chunk)
+    assert cmd[cmd.index('-ss') + 1] == '120.000'
+    assert cmd.index('-ss') < cmd.index('-i')
+    assert cmd[cmd.index('-t') + 1] == '61.500'
+    assert cmd[cmd.index('-output_ts_offset') + 1] == '120.000'
+    output = cmd[cmd.index('tee') + 1].split('|')[0]
+    assert output.endswith(os.path.join('/out', '480p', 'chunk_002.m3u8'))
+    assert f"hls_segment_filename=\\'{os.path.join('/out', '480p', 'chunk_002_%03d.ts')}\\'" in output
+
+
+def test_chunked_sources_encode_audio_once(settings):
+    """Chunks carry no audio, it goes to the shared audio rendition even with HLS_SHARED_AUDIO off"""
+    settings.VIDEO_TRANSCODE_MODE = 'chunked'
+    settings.VIDEO_CHUNK_MIN_DURATION = 600
+    settings.HLS_SEGMENT_FORMAT = 'ts'
+    settings.HLS_SHARED_AUDIO = False
+    long, short = {'has_audio': True, 'duration': 900.0}, {'has_audio': True, 'duration': 60.0}
+    assert shared_audio(long) and not muxed_audio(long)
+    assert muxed_audio(short) and not shared_audio(short)
@@ -0,0 +1,79 @@
+import os
+import django_rq
+import pytest
+from django.core.management import call_command
+from video_app.cleanup import find_orphans, remove_video_media
+from video_app.models import Video
+
+
+def make_file(path, size=10):
+    """Create a file with size bytes, including parent directories"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+
+
+@pytest.mark.django_db
+def test_deleting_video_enqueues_media_removal(django_capture_on_commit_callbacks):
+    """post_delete hands the file names to a job on the maintenance queue once the delete is committed"""
+    queue = django_rq.get_queue('maintenance')
+    queue.empty()
+    video = Video.objects.create(title='Gone', file='videos/gone.mp4', thumbnail='thumbnails/1.jpg')
+    video_id = video.id
+    with django_capture_on_commit_callbacks() as callbacks:
+        video.delete()
+        assert queue.count == 0
+    assert len(callbacks) == 1
+    callbacks[0]()
+    job = queue.get_jobs()[0]
+    assert job.func == remove_video_media
+    assert job.args == (video_id, 'videos/gone.mp4', 'thumbnails/1.jpg')
+    queue.empty()
+
+
+@pytest.mark.django_db
+def test_remove_video_media_keeps_shared_files(tmp_path, settings):
+    """The HLS tree is removed, a source another video still uses is kept"""
+    settings.MEDIA_ROOT = tmp_path
+    make_file(tmp_path / 'hls' / '5' / '480p' / 'segment_000.ts', 100)
+    make_file(tmp_path / 'videos' / 'shared.mp4', 50)
+    make_file(tmp_path / 'thumbnails' / '5.jpg', 7)
+    Video.objects.create(title='Twin', file='videos/shared.mp4')
+    assert remove_video_media(5, 'videos/shared.mp4', 'thumbnails/5.jpg') == 107
+    assert not (tmp_path / 'hls' / '5').exists()
+    assert (tmp_path / 'videos' / 'shared.mp4').exists()
+
+
+@pytest.mark.django_db
+def test_orphans_are_found_and_removed(tmp_path, settings):
+    """Entries without a Video are reported by the dry run and deleted by the real run"""
+    settings.MEDIA_ROOT = tmp_path
+    video = Video.objects.create(title='Kept', file='videos/kept.mp4')
+    make_file(tmp_path / 'hls' / str(video.id) / 'index.m3u8')
+    make_file(tmp_path / 'videos' / 'kept.mp4')
+    make_file(tmp_path / 'thumbnails' / f'{video.id}.jpg')
+    make_file(tmp_path / 'hls' / '999' / '720p' / 'segment_000.ts', 1000)
+    make_file(tmp_path / 'videos' / 'lost.mp4', 500)
+    make_file(tmp_path / 'thumbnails' / 'temp.jpg', 20)
+    make_file(tmp_path / 'uploads' / 'abandoned.part', 30)
+    orphans = find_orphans()
+    assert orphans == {
+        'hls': [str(tmp_path / 'hls' / '999')],
+        'videos': [str(tmp_path / 'videos' / 'lost.mp4')],
+        'thumbnails': [str(tmp_path / 'thumbnails' / 'temp.jpg')],
+        'uploads': [str(tmp_path / 'uploads' / 'abandoned.part')],
+    }
+    call_command('cleanup_media', dry_run=True, min_age=0)
+    assert (tmp_path / 'hls' / '999').exists()
+    call_command('cleanup_media', min_age=0)
+    assert not (tmp_path / 'hls' / '999').exists()
+    assert not os.path.exists(tmp_path / 'videos' / 'lost.mp4')
+    assert (tmp_path / 'videos' / 'kept.mp4').exists()
+    assert find_orphans() == {'hls': [], 'videos': [], 'thumbnails': [], 'uploads': []}
+
+
+@pytest.mark.django_db
+def test_recent_entries_are_left_alone(tmp_path, settings):
+    """Files younger than min_age may belong to an upload or transcode in progress"""
+    settings.MEDIA_ROOT = tmp_path
+    make_file(tmp_path / 'videos' / 'arriving.mp4')
+    assert find_orphans(min_age=3600)['videos'] == []
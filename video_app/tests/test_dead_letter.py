@@ -0,0 +1,175 @@
+import os
+import signal
+import django_rq
+import pytest
+from rq import SimpleWorker
+from rq.job import Job, JobStatus
+from core.workers import WeightedWorker
+from video_app.deadletter import record_failure, requeue_failed
+from video_app.idempotency import transcode_lock
+from video_app.models import FailedTask, Video
+from video_app.tasks import (
+    TranscodeError, enqueue_fanout, enqueue_job, encode_all_renditions, job_timeout, transcode_rendition_job,
+)
+
+
+def fail_job(job, exc):
+    """Run the failure callback the way a worker does after an attempt raised exc"""
+    try:
+        raise exc
+    except type(exc) as e:
+        record_failure(job, job.connection, type(e), e, e.__traceback__)
+
+
+def kill_work_horse(*args):
+    """Job body that dies like an OOM-killed ffmpeg run, without raising"""
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_timeouts_scale_with_encode_cost(settings):
+    """Every rendition job gets a timeout from its own cost, longer sources get longer timeouts"""
+    settings.VIDEO_JOB_TIMEOUT_BASE = 300
+    settings.VIDEO_JOB_TIMEOUT_FACTOR = 2
+    queue = django_rq.get_queue('video_long')
+    queue.empty()
+    enqueue_fanout(1, '/media/videos/long.mp4', ['720p', '1080p'], {'has_audio': True, 'duration': 3600.0}, 'video_long')
+    timeouts = {job.args[2]: job.timeout for job in queue.get_jobs() if job.func == transcode_rendition_job}
+    assert timeouts == {'720p': 300 + 2 * 3600, '1080p': job_timeout(3600 * 2.25)}
+    assert all(job.retries_left == settings.VIDEO_JOB_RETRIES for job in queue.get_jobs())
+    queue.empty()
+
+
+def test_retries_back_off_exponentially(settings):
+    """Retry delays double after every attempt"""
+    settings.VIDEO_JOB_RETRIES = 3
+    settings.VIDEO_JOB_RETRY_DELAY = 30
+    queue = django_rq.get_queue('video_short')
+    queue.empty()
+    enqueue_fanout(2, '/media/videos/clip.mp4', ['480p'], {'has_audio': False, 'duration': 10.0}, 'video_short')
+    assert queue.get_jobs()[0].retry_intervals == [30, 60, 120]
+    queue.empty()
+
+
+@pytest.mark.django_db
+def test_failed_rendition_raises_for_retry(tmp_path, settings, monkeypatch):
+    """A failed rendition in serial mode raises so RQ retries the job, the video is not failed before the last retry"""
+    settings.MEDIA_ROOT = tmp_path
+    settings.VIDEO_TRANSCODE_MODE = 'serial'
+    monkeypatch.setattr('video_app.tasks.transcode_rendition', lambda *args: False)
+    video = Video.objects.create(title='Flaky', file='videos/flaky.mp4')
+    with pytest.raises(TranscodeError):
+        encode_all_renditions(video.id, '/media/videos/flaky.mp4', {'height': 720, 'duration': 5.0, 'has_audio': True})
+    video.refresh_from_db()
+    assert video.status == Video.Status.TRANSCODING
+
+
+@pytest.mark.django_db
+def test_only_last_attempt_is_dead_lettered():
+    """Attempts with retries left are not recorded, the final one is stored and fails the video"""
+    video = Video.objects.create(title='Broken', file='videos/broken.mp4', status=Video.Status.TRANSCODING)
+    queue = django_rq.get_queue('video_short')
+    job = queue.enqueue(transcode_rendition_job, video.id, '/media/videos/broken.mp4', '480p', {},
+                        meta={'video_id': video.id})
+    job.retries_left = 1
+    fail_job(job, TranscodeError('ffmpeg crashed'))
+    assert not FailedTask.objects.exists()
+    job.retries_left = 0
+    fail_job(job, TranscodeError('ffmpeg crashed'))
+    task = FailedTask.objects.get(job_id=job.id)
+    assert task.func_name == 'video_app.tasks.transcode_rendition_job'
+    assert task.args == [video.id, '/media/videos/broken.mp4', '480p', {}]
+    assert task.reason == 'video_app.tasks.TranscodeError: ffmpeg crashed'
+    assert 'fail_job' in task.traceback
+    video.refresh_from_db()
+    assert video.status == Video.Status.FAILED
+    queue.empty()
+
+
+@pytest.mark.django_db
+def test_requeue_puts_failed_job_back_on_its_queue(settings):
+    """The requeue action moves the original job out of the failed registry with a fresh retry budget"""
+    video = Video.objects.create(title='Retry', file='videos/retry.mp4', status=Video.Status.FAILED)
+    queue = django_rq.get_queue('video_short')
+    queue.empty()
+    job = queue.enqueue(transcode_rendition_job, video.id, '/media/videos/retry.mp4', '480p', {})
+    queue.remove(job)
+    queue.failed_job_registry.add(job, exc_string='TranscodeError')
+    task = FailedTask.objects.create(
+        job_id=job.id, queue='video_short', func_name='video_app.tasks.transcode_rendition_job',
+        args=list(job.args), video=video, reason='TranscodeError', failed_at=video.created_at,
+    )
+    requeue_failed(task)
+    assert queue.get_job_ids() == [job.id]
+    assert Job.fetch(job.id, connection=queue.connection).retries_left == settings.VIDEO_JOB_RETRIES
+    task.refresh_from_db()
+    assert task.requeued_at is not None
+    video.refresh_from_db()
+    assert video.status == Video.Status.TRANSCODING
+    queue.empty()
+
+
+@pytest.mark.django_db
+def test_requeue_enqueues_new_job_when_original_expired():
+    """Without the original RQ job a new one with the stored arguments is enqueued"""
+    queue = django_rq.get_queue('maintenance')
+    queue.empty()
+    task = FailedTask.objects.create(
+        job_id='expired', queue='maintenance', func_name='video_app.cleanup.remove_video_media',
+        args=[3, 'videos/a.mp4', ''], reason='OSError', failed_at='2026-01-01T00:00:00Z',
+    )
+    job = requeue_failed(task)
+    assert job.id != 'expired'
+    assert job.func_name == 'video_app.cleanup.remove_video_media'
+    assert job.args == (3, 'videos/a.mp4', '')
+    queue.empty()
+
+
+@pytest.mark.django_db
+def test_killed_work_horse_is_dead_lettered(settings):
+    """A work horse killed on its last attempt still stores a FailedTask and fails the video"""
+    settings.VIDEO_JOB_RETRIES = 0
+    video = Video.objects.create(title='Killed', file='videos/killed.mp4', status=Video.Status.TRANSCODING)
+    queue = django_rq.get_queue('video_short')
+    queue.empty()
+    job = enqueue_job('video_short', kill_work_horse, video.id, video_id=video.id)
+    WeightedWorker([queue], connection=queue.connection).work(burst=True)
+    task = FailedTask.objects.get(job_id=job.id)
+    assert task.reason.startswith('core.workers.WorkHorseKilled: Work horse terminated unexpectedly')
+    assert task.attempts == 1
+    video.refresh_from_db()
+    assert video.status == Video.Status.FAILED
+    assert job.id in queue.failed_job_registry
+
+
+@pytest.mark.django_db
+def test_killed_work_horse_without_dead_letter_callback_is_not_recorded():
+    """A killed job that was not enqueued with record_failure, e.g. a mail job, is failed without a FailedTask"""
+    queue = django_rq.get_queue('emails')
+    queue.empty()
+    job = queue.enqueue(kill_work_horse, 1)
+    WeightedWorker([queue], connection=queue.connection).work(burst=True)
+    assert not FailedTask.objects.exists()
+    assert job.id in queue.failed_job_registry
+
+
+@pytest.mark.parametrize('retries', [0, 3])
+@pytest.mark.django_db
+def test_held_encode_lock_reschedules_job_without_failing_video(settings, retries):
+    """A job that finds its rendition locked is scheduled again with its retries intact, the video is untouched"""
+    settings.VIDEO_JOB_RETRIES = retries
+    settings.VIDEO_JOB_RETRY_DELAY = 30
+    video = Video.objects.create(title='Locked', file='videos/locked.mp4', status=Video.Status.TRANSCODING)
+    queue = django_rq.get_queue('video_short')
+    queue.empty()
+    job = enqueue_job('video_short', transcode_rendition_job, video.id, '/media/videos/locked.mp4', '480p', {},
+                      video_id=video.id)
+    with transcode_lock(video.id, '480p'):
+        SimpleWorker([queue], connection=queue.connection).work(burst=True)
+    job.refresh()
+    assert job.get_status() == JobStatus.SCHEDULED
+    assert job.id in queue.scheduled_job_registry
+    assert job.retries_left == retries
+    assert not FailedTask.objects.exists()
+    video.refresh_from_db()
+    assert video.status == Video.Status.TRANSCODING
+    queue.scheduled_job_registry.remove(job)
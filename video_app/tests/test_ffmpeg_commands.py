@@ -0,0 +1,71 @@
+import os
+import subprocess
+import pytest
+from video_app.ffmpeg import RENDITIONS, build_audio_cmd, build_rendition_cmd, build_multi_rendition_cmd, run_ffmpeg
+
+
+def test_multi_rendition_cmd_reads_source_once():
+    """Single-decode command has one input and splits it to one scaler per rendition"""
+    cmd = build_multi_rendition_cmd('/in/source.mp4', '/out/hls/1', RENDITIONS)
+    assert cmd.count('-i') == 1
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert graph.startswith('[0:v]split=3[v0][v1][v2]')
+    assert '[v0]scale=-2:480[v0out]' in graph
+    assert '[v2]scale=-2:1080[v2out]' in graph
+
+
+def test_multi_rendition_cmd_encodes_audio_once_for_every_rendition():
+    """Every rendition gets its own bitrate and HLS output, all of them muxing the one encoded audio stream"""
+    cmd = build_multi_rendition_cmd('/in/source.mp4', '/out/hls/1', RENDITIONS)
+    assert cmd[cmd.index('-b:v:1') + 1] == '2500k'
+    assert cmd.count('0:a:0') == 1
+    assert cmd.count('aac') == 1
+    outputs = cmd[cmd.index('tee') + 1].split('|')
+    assert [output.split(']')[-1] for output in outputs] == [
+        os.path.join('/out/hls/1', res, 'index.m3u8') for res in RENDITIONS
+    ]
+    assert outputs[1].startswith("[select=\\'v:1,a\\':f=\\'hls\\':")
+    assert f"hls_segment_filename=\\'{os.path.join('/out/hls/1', '720p', 'segment_%03d.ts')}\\'" in outputs[1]
+
+
+def test_rendition_cmd_targets_rendition_directory():
+    """Serial command writes segments and playlist into the rendition folder"""
+    cmd = build_rendition_cmd('/in/source.mp4', '/out/hls/1/720p', RENDITIONS['720p'])
+    assert cmd[cmd.index('-vf') + 1] == 'scale=-2:720'
+    assert cmd[cmd.index('-hls_segment_filename') + 1] == os.path.join('/out/hls/1/720p', 'segment_%03d.ts')
+    assert cmd[-1] == os.path.join('/out/hls/1/720p', 'index.m3u8')
+
+
+def test_fmp4_output_writes_one_file_per_rendition():
+    """fmp4 format muxes CMAF fragments into a single byte-range addressed file per rendition"""
+    cmd = build_multi_rendition_cmd('/in/source.mp4', '/out/hls/1', RENDITIONS, segment_format='fmp4')
+    output = cmd[cmd.index('tee') + 1].split('|')[0]
+    assert "hls_segment_type=\\'fmp4\\':hls_flags=\\'single_file\\'" in output
+    assert f"hls_segment_filename=\\'{os.path.join('/out/hls/1', '480p', 'stream.mp4')}\\'" in output
+    chunk = {'name': 'chunk_000', 'start': 0.0, 'end': 60.0}
+    chunk_cmd = build_multi_rendition_cmd('/in/source.mp4', '/out/hls/1', RENDITIONS, chunk=chunk, segment_format='fmp4')
+    assert 'hls_segment_type' not in chunk_cmd[chunk_cmd.index('tee') + 1]
+
+
+def test_audio_cmd_encodes_audio_only_once():
+    """The shared audio rendition maps only the first audio track and skips video"""
+    cmd = build_audio_cmd('/in/source.mp4', '/out/hls/1/audio')
+    assert cmd[cmd.index('-map') + 1] == '0:a:0'
+    assert '-vn' in cmd
+    assert cmd[-1] == os.path.join('/out/hls/1/audio', 'index.m3u8')
+
+
+def test_run_ffmpeg_kills_encoder_when_interrupted(tmp_path, monkeypatch):
+    """An exception in the progress loop takes the ffmpeg child down instead of orphaning it"""
+    fake = tmp_path / 'ffmpeg'
+    fake.write_text('#!/bin/sh\necho progress=continue\nexec sleep 30\n')
+    fake.chmod(0o755)
+    started = []
+    popen = subprocess.Popen
+    monkeypatch.setattr(subprocess, 'Popen', lambda *args, **kwargs: started.append(popen(*args, **kwargs)) or started[-1])
+
+    def interrupt(block):
+        raise RuntimeError('job timeout')
+    with pytest.raises(RuntimeError):
+        run_ffmpeg([str(fake)], on_progress=interrupt)
+    assert started[0].returncode == -9
@@ -0,0 +1,106 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from video_app.hls import build_master, measure_bandwidth, parse_segment_streams, write_master
+from video_app.models import Video
+
+
+def write_rendition(base_dir, res, sizes):
+    """Media playlist with 4 second segments of the given byte sizes"""
+    out_dir = base_dir / res
+    out_dir.mkdir(parents=True)
+    lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:4']
+    for i, size in enumerate(sizes):
+        (out_dir / f'segment_{i:03d}.ts').write_bytes(b'\0' * size)
+        lines += ['#EXTINF:4.000000,', f'segment_{i:03d}.ts']
+    (out_dir / 'index.m3u8').write_text('\n'.join(lines + ['#EXT-X-ENDLIST']) + '\n')
+
+
+def test_bandwidth_is_measured_from_segment_sizes(tmp_path):
+    """Peak is the largest segment bitrate, average spreads all bytes over the duration"""
+    write_rendition(tmp_path, '480p', [400_000, 200_000])
+    assert measure_bandwidth(str(tmp_path / '480p' / 'index.m3u8')) == (800_000, 600_000)
+
+
+def test_codec_strings_follow_rfc6381():
+    """H.264 profile/level and AAC profile map to the CODECS attribute values"""
+    streams = [
+        {'codec_type': 'video', 'codec_name': 'h264', 'profile': 'High', 'level': 31, 'width': 1280, 'height': 720},
+        {'codec_type': 'audio', 'codec_name': 'aac', 'profile': 'LC'},
+    ]
+    assert parse_segment_streams(streams) == {'width': 1280, 'height': 720, 'codecs': ['avc1.64001F', 'mp4a.40.2']}
+
+
+def test_master_lists_variants_by_bandwidth():
+    """Variants are sorted ascending and only carry attributes that could be measured"""
+    master = build_master([
+        {'uri': '720p/index.m3u8', 'bandwidth': 3_000_000, 'average_bandwidth': 2_600_000,
+         'width': 1280, 'height': 720, 'codecs': ['avc1.64001F', 'mp4a.40.2']},
+        {'uri': '480p/index.m3u8', 'bandwidth': 900_000, 'average_bandwidth': 850_000},
+    ])
+    lines = master.splitlines()
+    assert lines[0] == '#EXTM3U'
+    assert lines[3:] == [
+        '#EXT-X-STREAM-INF:BANDWIDTH=900000,AVERAGE-BANDWIDTH=850000',
+        '480p/index.m3u8',
+        '#EXT-X-STREAM-INF:BANDWIDTH=3000000,AVERAGE-BANDWIDTH=2600000,RESOLUTION=1280x720,CODECS="avc1.64001F,mp4a.40.2"',
+        '720p/index.m3u8',
+    ]
+
+
+def test_shared_audio_is_one_media_group():
+    """The audio rendition is declared once, variants reference it and include its bitrate and codec"""
+    audio = {'uri': 'audio/index.m3u8', 'bandwidth': 130_000, 'average_bandwidth': 128_000, 'codecs': ['mp4a.40.2']}
+    master = build_master([
+        {'uri': '480p/index.m3u8', 'bandwidth': 900_000, 'average_bandwidth': 850_000, 'codecs': ['avc1.64001E']},
+    ], audio)
+    assert master.splitlines()[3:] == [
+        '#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="Audio",DEFAULT=YES,AUTOSELECT=YES,URI="audio/index.m3u8"',
+        '#EXT-X-STREAM-INF:BANDWIDTH=1030000,AVERAGE-BANDWIDTH=978000,CODECS="avc1.64001E,mp4a.40.2",AUDIO="audio"',
+        '480p/index.m3u8',
+    ]
+
+
+def test_write_master_probes_first_segment(tmp_path, monkeypatch):
+    """Resolution and codecs come from the first encoded segment of each rendition"""
+    write_rendition(tmp_path, '480p', [100_000])
+    probed = []
+    monkeypatch.setattr('video_app.hls.probe_segment',
+                        lambda path: probed.append(path) or {'width': 854, 'height': 480, 'codecs': ['avc1.64001E']})
+    path = write_master(str(tmp_path), ['480p'])
+    assert probed == [str(tmp_path / '480p' / 'segment_000.ts')]
+    assert 'RESOLUTION=854x480,CODECS="avc1.64001E"' in open(path).read()
+
+
+@pytest.mark.django_db
+def test_master_playlist_is_served(tmp_path, settings):
+    """Authenticated clients get master.m3u8, videos without one return 404"""
+    User = get_user_model()
+    user = User.objects.create_user(username='abr@example.com', email='abr@example.com',
+                                    password='StrongP@ssw0rd', is_active=True)
+    client = APIClient()
+    assert client.post(reverse('login'), {'email': user.email, 'password': 'StrongP@ssw0rd'}, format='json').status_code == 200
+    video = Video.objects.create(title='Adaptive', category='Demo', file='videos/abr.mp4', status=Video.Status.READY)
+    settings.MEDIA_ROOT = tmp_path
+    response = client.get(reverse('video-master', args=[video.id]))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    (tmp_path / 'hls' / str(video.id)).mkdir(parents=True)
+    (tmp_path / 'hls' / str(video.id) / 'master.m3u8').write_text('#EXTM3U\n')
+    response = client.get(reverse('video-master', args=[video.id]))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == 'application/vnd.apple.mpegurl'
+
+
+def test_byte_range_segments_use_their_range_length(tmp_path):
+    """Single-file fMP4 renditions are measured per EXT-X-BYTERANGE, not by the size of the shared file"""
+    out_dir = tmp_path / '480p'
+    out_dir.mkdir()
+    (out_dir / 'stream.mp4').write_bytes(b'\0' * 1_000)
+    (out_dir / 'index.m3u8').write_text(
+        '#EXTM3U\n#EXT-X-MAP:URI="stream.mp4",BYTERANGE="100@0"\n'
+        '#EXTINF:4.000000,\n#EXT-X-BYTERANGE:600@100\nstream.mp4\n'
+        '#EXTINF:2.000000,\n#EXT-X-BYTERANGE:300@700\nstream.mp4\n#EXT-X-ENDLIST\n'
+    )
+    assert measure_bandwidth(str(out_dir / 'index.m3u8')) == (1200, 1200)
@@ -0,0 +1,113 @@
+import os
+import pytest
+from django.core.management import call_command
+from video_app import hotcache
+from video_app.hotcache import cache_stats, cached_copy, invalidate, is_hot, open_cached, reset_stats
+
+
+@pytest.fixture
+def hot(tmp_path, settings):
+    """Empty hot cache below tmp_path with fresh counters"""
+    settings.MEDIA_ROOT = tmp_path / 'media'
+    settings.HOT_CACHE_ENABLED = True
+    settings.HOT_CACHE_DIR = str(tmp_path / 'hot')
+    settings.HOT_CACHE_MAX_BYTES = 1000
+    settings.HOT_CACHE_MAX_OBJECT = 400
+    settings.HOT_CACHE_SEGMENTS = 2
+    reset_stats()
+    yield tmp_path / 'hot'
+    reset_stats()
+
+
+def media_file(settings, relative, size):
+    """Create a file below MEDIA_ROOT/hls and return its path"""
+    path = os.path.join(settings.MEDIA_ROOT, 'hls', relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as out:
+        out.write(b'x' * size)
+    return path
+
+
+def test_only_small_playlists_and_leading_segments_qualify(hot):
+    """Manifests and the first HOT_CACHE_SEGMENTS segments are cached, large or later objects are not"""
+    assert is_hot('/m/hls/1/720p/index.m3u8', 100)
+    assert is_hot('/m/hls/1/720p/segment_001.ts', 100)
+    assert not is_hot('/m/hls/1/720p/segment_002.ts', 100)
+    assert not is_hot('/m/hls/1/720p/segment_000.ts', 401)
+    assert not is_hot('/m/hls/1/720p/stream.mp4', 100)
+    assert not is_hot('/m/hls/1/720p/chunk_003_000.ts', 100)
+
+
+def test_second_read_is_a_hit_and_counted(hot, settings):
+    """The first request copies the file into the cache, the next one reads the copy"""
+    path = media_file(settings, '1/720p/segment_000.ts', 100)
+    first = cached_copy(path, os.stat(path))
+    assert first.startswith(str(hot))
+    assert cached_copy(path, os.stat(path)) == first
+    stats = cache_stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['bytes']) == (1, 1, 1, 100)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_rewritten_file_never_hits_stale_copy(hot, settings):
+    """A transcode that rewrites a playlist changes its key, and invalidation drops the video's entries"""
+    path = media_file(settings, '2/720p/index.m3u8', 100)
+    old = cached_copy(path, os.stat(path))
+    media_file(settings, '2/720p/index.m3u8', 120)
+    assert cached_copy(path, os.stat(path)) != old
+    invalidate(2)
+    assert not (hot / '2').exists()
+
+
+def test_copy_removed_by_another_process_falls_back_to_origin(hot, settings, monkeypatch):
+    """An eviction or invalidation between the lookup and open() serves the original file instead of failing"""
+    path = media_file(settings, '8/720p/index.m3u8', 100)
+    cached_copy(path, os.stat(path))
+
+    def lookup_then_invalidate(path, stat):
+        hot_path = cached_copy(path, stat)
+        invalidate(8)
+        return hot_path
+    monkeypatch.setattr(hotcache, 'cached_copy', lookup_then_invalidate)
+    with open_cached(path, os.stat(path)) as media:
+        assert media.name == path
+        assert media.read() == b'x' * 100
+
+
+def test_least_recently_used_entries_are_evicted(hot, settings):
+    """Beyond HOT_CACHE_MAX_BYTES the oldest entries go first until 90% of the budget is left"""
+    paths = [media_file(settings, f'{video_id}/720p/index.m3u8', 300) for video_id in range(3, 7)]
+    copies = []
+    for age, path in enumerate(paths[:3]):
+        copies.append(cached_copy(path, os.stat(path)))
+        os.utime(copies[-1], (1000 + age, 1000 + age))
+    cached_copy(paths[3], os.stat(paths[3]))
+    assert not os.path.exists(copies[0])
+    assert all(os.path.exists(copy) for copy in copies[1:])
+    assert cache_stats()['evictions'] == 1
+
+
+def test_stores_below_budget_only_update_the_byte_count(hot, settings, monkeypatch):
+    """The cache is scanned once to seed the shared byte count, stores and invalidations then just adjust it"""
+    first = media_file(settings, '9/720p/index.m3u8', 300)
+    cached_copy(first, os.stat(first))
+    assert (hot / '.size').read_text() == '300'
+
+    def no_scan():
+        raise AssertionError('cache scanned below budget')
+    monkeypatch.setattr(hotcache, 'entries', no_scan)
+    second = media_file(settings, '10/720p/index.m3u8', 200)
+    cached_copy(second, os.stat(second))
+    assert (hot / '.size').read_text() == '500'
+    invalidate(9)
+    assert (hot / '.size').read_text() == '200'
+
+
+def test_stats_command_reports_hit_rate(hot, settings, capsys):
+    """The management command prints the aggregated counters"""
+    path = media_file(settings, '7/720p/index.m3u8', 50)
+    cached_copy(path, os.stat(path))
+    cached_copy(path, os.stat(path))
+    call_command('hot_cache_stats')
+    out = capsys.readouterr().out
+    assert 'Hits: 1, misses: 1, hit rate: 50.0%' in out
@@ -0,0 +1,91 @@
+import json
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from video_app.etags import ETAG_FILE, write_etags
+from video_app.idempotency import hash_file
+from video_app.models import Video
+
+
+@pytest.fixture
+def viewer():
+    """Authenticated API client"""
+    user = get_user_model().objects.create_user(username='cache@example.com', email='cache@example.com',
+                                                password='pw', is_active=True)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def video(tmp_path, settings):
+    """Ready video with one finished rendition and its ETag sidecar"""
+    settings.MEDIA_ROOT = tmp_path
+    video = Video.objects.create(title='Cached', file='videos/cached.mp4', status=Video.Status.READY)
+    out_dir = tmp_path / 'hls' / str(video.id) / '720p'
+    out_dir.mkdir(parents=True)
+    (out_dir / 'segment_000.ts').write_bytes(b'0123456789' * 10)
+    (out_dir / 'index.m3u8').write_text('#EXTM3U\n#EXTINF:4.0,\nsegment_000.ts\n#EXT-X-ENDLIST\n')
+    write_etags(str(tmp_path / 'hls' / str(video.id)))
+    return video
+
+
+def segment_url(video):
+    """URL of the only segment of the fixture video"""
+    return reverse('video-segment', args=[video.id, '720p', 'segment_000.ts'])
+
+
+@pytest.mark.django_db
+def test_sidecar_holds_content_hashes(tmp_path, video):
+    """ETags are content hashes of every served file, marker files are skipped"""
+    base_dir = tmp_path / 'hls' / str(video.id)
+    (base_dir / '720p' / '.done').write_text('')
+    entries = write_etags(str(base_dir))
+    assert set(entries) == {'720p/segment_000.ts', '720p/index.m3u8'}
+    expected = hash_file(str(base_dir / '720p' / 'segment_000.ts'))[:32]
+    assert json.loads((base_dir / ETAG_FILE).read_text())['720p/segment_000.ts']['etag'] == f'"{expected}"'
+
+
+@pytest.mark.django_db
+def test_segment_carries_validators_and_immutable_policy(viewer, video):
+    """Segments get the precomputed ETag, Last-Modified and a year-long immutable Cache-Control"""
+    response = viewer.get(segment_url(video))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'].startswith('"') and '-' not in response['ETag']
+    assert 'Last-Modified' in response
+    assert response['Cache-Control'] == 'private, max-age=31536000, immutable'
+
+
+@pytest.mark.django_db
+def test_matching_etag_returns_not_modified(viewer, video):
+    """A revalidation with the current ETag costs a 304 without a body"""
+    etag = viewer.get(segment_url(video))['ETag']
+    response = viewer.get(segment_url(video), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response['ETag'] == etag
+    assert response.content == b''
+    assert viewer.get(segment_url(video), HTTP_IF_NONE_MATCH='"stale"').status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_if_range_only_honours_current_validator(viewer, video):
+    """A Range with a matching If-Range gets 206, with an outdated one the whole file"""
+    etag = viewer.get(segment_url(video))['ETag']
+    partial = viewer.get(segment_url(video), HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=etag)
+    assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert b''.join(partial.streaming_content) == b'0123456789'
+    full = viewer.get(segment_url(video), HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"old"')
+    assert full.status_code == status.HTTP_200_OK
+    assert len(b''.join(full.streaming_content)) == 100
+
+
+@pytest.mark.django_db
+def test_playlists_are_revalidated_daily(viewer, video, settings):
+    """Unsigned VOD playlists are cacheable for a day but not immutable"""
+    settings.MEDIA_SIGNED_URLS = False
+    response = viewer.get(reverse('video-stream', args=[video.id, '720p']))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Cache-Control'] == 'private, max-age=86400'
+    assert 'ETag' in response
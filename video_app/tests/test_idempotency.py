@@ -0,0 +1,85 @@
+import hashlib
+import os
+import pytest
+from video_app.ffmpeg import RENDITIONS
+from video_app.idempotency import hash_file, link_tree, mark_rendition_done, transcode_lock
+from video_app.models import Video
+from video_app.tasks import COMPLETE_MARKER, TranscodeDeferred, reuse_duplicate, transcode_rendition, transcode_to_hls
+
+
+def test_hash_file_matches_sha256(tmp_path):
+    """Block-wise hashing gives the plain SHA-256 of the file"""
+    source = tmp_path / 'source.mp4'
+    source.write_bytes(b'x' * 3_000_000)
+    assert hash_file(str(source)) == hashlib.sha256(b'x' * 3_000_000).hexdigest()
+
+
+def test_link_tree_recreates_directory(tmp_path):
+    """Every file of the source tree shows up under the target with the same content"""
+    src = tmp_path / 'hls' / '1'
+    (src / '720p').mkdir(parents=True)
+    (src / '720p' / 'index.m3u8').write_text('#EXTM3U\n')
+    (src / '720p' / 'segment_000.ts').write_bytes(b'ts')
+    assert link_tree(str(src), str(tmp_path / 'hls' / '2')) == 2
+    assert (tmp_path / 'hls' / '2' / '720p' / 'segment_000.ts').read_bytes() == b'ts'
+
+
+def test_finished_rendition_is_skipped(tmp_path):
+    """A retried job does not run ffmpeg again for a rendition with a completion marker"""
+    out_dir = tmp_path / '480p'
+    out_dir.mkdir()
+    mark_rendition_done(str(out_dir))
+    info = {'has_audio': True, 'duration': 10.0}
+    assert transcode_rendition(1, '/does/not/exist.mp4', str(tmp_path), '480p', RENDITIONS['480p'], info) is True
+
+
+def test_lock_is_exclusive_per_video_and_label():
+    """A second holder is refused until the first releases the lock"""
+    with transcode_lock(501, 'encode') as first:
+        assert first is True
+        with transcode_lock(501, 'encode') as second:
+            assert second is False
+        with transcode_lock(501, '720p') as other_label:
+            assert other_label is True
+    with transcode_lock(501, 'encode') as again:
+        assert again is True
+
+
+def test_held_encode_lock_defers_job():
+    """A duplicate transcode job raises, so RQ reschedules it instead of recording a success"""
+    with transcode_lock(502, 'encode'):
+        with pytest.raises(TranscodeDeferred):
+            transcode_to_hls(502, '/does/not/exist.mp4')
+
+
+@pytest.mark.django_db
+def test_identical_upload_reuses_existing_output(tmp_path, settings):
+    """A second upload with the same bytes gets the first video's HLS tree without encoding"""
+    settings.MEDIA_ROOT = tmp_path
+    source = tmp_path / 'videos' / 'clip.mp4'
+    source.parent.mkdir()
+    source.write_bytes(b'same bytes')
+    original = Video.objects.create(title='Original', file='videos/clip.mp4', source_hash=hash_file(str(source)))
+    copy = Video.objects.create(title='Copy', file='videos/clip.mp4')
+    original_dir = tmp_path / 'hls' / str(original.id)
+    (original_dir / '480p').mkdir(parents=True)
+    (original_dir / '480p' / 'index.m3u8').write_text('#EXTM3U\n#EXTINF:4.0,\nsegment_000.ts\n#EXT-X-ENDLIST\n')
+    (original_dir / '480p' / 'segment_000.ts').write_bytes(b'ts')
+    (original_dir / COMPLETE_MARKER).write_text('480p')
+    assert reuse_duplicate(copy.id, str(source)) is True
+    copy_dir = tmp_path / 'hls' / str(copy.id)
+    assert (copy_dir / '480p' / 'index.m3u8').exists()
+    assert (copy_dir / COMPLETE_MARKER).read_text() == '480p'
+    assert os.stat(original_dir / COMPLETE_MARKER).st_nlink == 1
+    copy.refresh_from_db()
+    assert copy.source_hash == original.source_hash
+
+
+@pytest.mark.django_db
+def test_unique_upload_is_not_reused(tmp_path, settings):
+    """Sources without a finished twin go through normal transcoding"""
+    settings.MEDIA_ROOT = tmp_path
+    source = tmp_path / 'unique.mp4'
+    source.write_bytes(b'unique bytes')
+    video = Video.objects.create(title='Unique', file='videos/unique.mp4')
+    assert reuse_duplicate(video.id, str(source)) is False
@@ -0,0 +1,76 @@
+import os
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from video_app import prefetch
+from video_app.models import Video
+
+
+def test_next_segments_keep_padding_and_rendition(tmp_path):
+    """The following segments of the same rendition directory, with the number's zero padding"""
+    path = str(tmp_path / '720p' / 'segment_009.ts')
+    assert prefetch.next_segments(path, 2) == [
+        str(tmp_path / '720p' / 'segment_010.ts'),
+        str(tmp_path / '720p' / 'segment_011.ts'),
+    ]
+    assert prefetch.next_segments(str(tmp_path / 'seg_7.m4s'), 1) == [str(tmp_path / 'seg_8.m4s')]
+    assert prefetch.next_segments(str(tmp_path / 'stream.mp4'), 3) == []
+    assert prefetch.next_segments(str(tmp_path / 'init.mp4'), 3) == []
+
+
+@pytest.fixture
+def advised(monkeypatch):
+    """Paths posix_fadvise(WILLNEED) was called for, read back through the fd"""
+    calls = []
+
+    def fake_fadvise(fd, offset, length, advice):
+        assert advice == os.POSIX_FADV_WILLNEED
+        calls.append(os.readlink(f'/proc/self/fd/{fd}'))
+    monkeypatch.setattr(os, 'posix_fadvise', fake_fadvise)
+    return calls
+
+
+def test_prefetch_warms_existing_next_segments_once(tmp_path, settings, advised):
+    """Existing successors are advised in the background, missing ones skipped, repeats deduplicated"""
+    settings.PREFETCH_SEGMENTS = 3
+    for number in range(3):
+        (tmp_path / f'segment_{number:03d}.ts').write_bytes(b'x')
+    prefetch.prefetch_next(str(tmp_path / 'segment_000.ts'))
+    prefetch._queue.join()
+    assert advised == [str(tmp_path / 'segment_001.ts'), str(tmp_path / 'segment_002.ts')]
+    prefetch.prefetch_next(str(tmp_path / 'segment_000.ts'))
+    prefetch._queue.join()
+    assert len(advised) == 2
+    (tmp_path / 'segment_003.ts').write_bytes(b'x')
+    prefetch.prefetch_next(str(tmp_path / 'segment_001.ts'))
+    prefetch._queue.join()
+    assert advised[-1] == str(tmp_path / 'segment_003.ts')
+
+
+def test_prefetch_disabled_with_zero(tmp_path, settings, advised):
+    """PREFETCH_SEGMENTS=0 queues nothing"""
+    settings.PREFETCH_SEGMENTS = 0
+    (tmp_path / 'segment_011.ts').write_bytes(b'x')
+    prefetch.prefetch_next(str(tmp_path / 'segment_010.ts'))
+    prefetch._queue.join()
+    assert advised == []
+
+
+@pytest.mark.django_db
+def test_segment_view_schedules_read_ahead(tmp_path, settings, monkeypatch):
+    """Serving a segment queues read-ahead from that segment's path"""
+    settings.MEDIA_ROOT = tmp_path
+    scheduled = []
+    monkeypatch.setattr('video_app.api.views.prefetch_next', scheduled.append)
+    user = get_user_model().objects.create_user(username='p@example.com', email='p@example.com', password='pw',
+                                                is_active=True)
+    client = APIClient()
+    client.force_authenticate(user)
+    video = Video.objects.create(title='Prefetch', file='videos/prefetch.mp4', status=Video.Status.READY)
+    seg_dir = tmp_path / 'hls' / str(video.id) / '480p'
+    seg_dir.mkdir(parents=True)
+    (seg_dir / 'segment_010.ts').write_bytes(b'segment')
+    response = client.get(reverse('video-segment', args=[video.id, '480p', 'segment_010.ts']))
+    assert response.status_code == 200
+    assert scheduled == [str(seg_dir / 'segment_010.ts')]
@@ -0,0 +1,61 @@
+import pytest
+from video_app.ffmpeg import RENDITIONS, build_multi_rendition_cmd, build_rendition_cmd
+from video_app.probe import ProbeError, parse_probe_output, select_renditions
+
+
+def probe_data(streams, duration='12.5', bit_rate='1500000'):
+    """Build a minimal ffprobe JSON document"""
+    return {'streams': streams, 'format': {'duration': duration, 'bit_rate': bit_rate}}
+
+
+VIDEO_STREAM = {'codec_type': 'video', 'codec_name': 'h264', 'width': 854, 'height': 480}
+AUDIO_STREAM = {'codec_type': 'audio', 'codec_name': 'aac'}
+
+
+def test_parse_probe_output_reads_source_properties():
+    """Resolution, duration, codecs and bitrate are taken from the probe result"""
+    info = parse_probe_output(probe_data([VIDEO_STREAM, AUDIO_STREAM]))
+    assert info == {
+        'width': 854, 'height': 480, 'duration': 12.5,
+        'video_codec': 'h264', 'audio_codec': 'aac',
+        'bitrate': 1500000, 'has_audio': True,
+    }
+
+
+def test_parse_probe_output_detects_missing_audio():
+    """A source without an audio stream is flagged so audio encoding can be skipped"""
+    info = parse_probe_output(probe_data([VIDEO_STREAM]))
+    assert info['has_audio'] is False
+    assert info['audio_codec'] == ''
+
+
+def test_parse_probe_output_rejects_audio_only_files():
+    """Files without a real video stream fail fast, cover art does not count"""
+    cover = {'codec_type': 'video', 'codec_name': 'mjpeg', 'width': 500, 'height': 500, 'disposition': {'attached_pic': 1}}
+    with pytest.raises(ProbeError):
+        parse_probe_output(probe_data([AUDIO_STREAM, cover]))
+
+
+def test_parse_probe_output_rejects_unknown_duration():
+    """Streams ffprobe cannot time are not worth encoding"""
+    with pytest.raises(ProbeError):
+        parse_probe_output(probe_data([VIDEO_STREAM], duration='N/A'))
+
+
+def test_select_renditions_drops_upscales():
+    """A 720p source is not encoded to 1080p"""
+    assert list(select_renditions(RENDITIONS, 720)) == ['480p', '720p']
+
+
+def test_select_renditions_keeps_smallest_for_tiny_sources():
+    """Sources below the smallest rendition still get one playable rendition"""
+    assert list(select_renditions(RENDITIONS, 360)) == ['480p']
+
+
+def test_commands_skip_audio_for_silent_sources():
+    """No audio maps or AAC encoder when the source has no audio track"""
+    multi = build_multi_rendition_cmd('/in.mp4', '/out', RENDITIONS, has_audio=False)
+    assert '0:a:0' not in multi and '-an' in multi
+    assert [output.split("\\'")[1] for output in multi[multi.index('tee') + 1].split('|')] == ['v:0', 'v:1', 'v:2']
+    single = build_rendition_cmd('/in.mp4', '/out/480p', RENDITIONS['480p'], has_audio=False)
+    assert '-an' in single and 'aac' not in single
@@ -0,0 +1,80 @@
+import django_rq
+from core.workers import WeightedWorker
+from video_app.tasks import encode_cost, transcode_queue
+
+
+def test_cost_grows_with_duration_and_renditions():
+    """A 720p rendition costs its duration, larger renditions cost proportionally more pixels"""
+    info = {'duration': 100.0}
+    assert encode_cost(info, ['720p']) == 100.0
+    assert encode_cost(info, ['480p', '720p', '1080p']) > 3 * 100.0
+
+
+def test_transcodes_are_routed_by_cost(settings):
+    """Short clips stay on video_short, feature-length sources go to video_long"""
+    settings.VIDEO_LONG_COST = 1800
+    renditions = ['480p', '720p', '1080p']
+    assert transcode_queue({'duration': 60.0}, renditions) == 'video_short'
+    assert transcode_queue({'duration': 7200.0}, renditions) == 'video_long'
+
+
+def serve(worker) -> str:
+    """Take one job the way the worker's dequeue does: from the first queue in credit order that has one"""
+    for queue in worker._ordered_queues:
+        if queue.count and queue.pop_job_id():
+            worker.reorder_queues(queue)
+            return queue.name
+    return None
+
+
+def fill(queue, count: int):
+    for _ in range(count):
+        queue.enqueue(sum, [1])
+
+
+def test_weighted_worker_serves_queues_by_weight(settings):
+    """With all queues busy, jobs are taken in proportion to the queue weights"""
+    settings.RQ_QUEUE_WEIGHTS = {'emails': 3, 'video_long': 1}
+    queues = [django_rq.get_queue('video_long'), django_rq.get_queue('emails')]
+    for queue in queues:
+        queue.empty()
+        fill(queue, 10)
+    worker = WeightedWorker(queues, connection=queues[0].connection)
+    assert [queue.name for queue in worker._ordered_queues] == ['emails', 'video_long']
+    served = [serve(worker) for _ in range(8)]
+    assert served.count('emails') == 6
+    assert served.count('video_long') == 2
+    for queue in queues:
+        queue.empty()
+
+
+def test_idle_queue_does_not_bank_credit(settings):
+    """A queue that sat idle while another was busy gets its normal share once both have work, not a burst"""
+    settings.RQ_QUEUE_WEIGHTS = {'emails': 10, 'video_short': 5, 'video_long': 2}
+    short, long, emails = (django_rq.get_queue(name) for name in ('video_short', 'video_long', 'emails'))
+    for queue in (short, long, emails):
+        queue.empty()
+    worker = WeightedWorker([emails, short, long], connection=short.connection)
+    fill(short, 100)
+    assert [serve(worker) for _ in range(100)] == ['video_short'] * 100
+    assert all(abs(credit) <= 17 for credit in worker._credits.values())
+    fill(short, 20)
+    fill(long, 20)
+    served = [serve(worker) for _ in range(14)]
+    assert served.count('video_short') == 10
+    assert served.count('video_long') == 4
+    for queue in (short, long):
+        queue.empty()
+
+
+def test_account_emails_use_emails_queue(monkeypatch):
+    """Activation mails are enqueued on the emails queue, away from transcoding jobs"""
+    from auth_app.tasks import send_activation_email_async
+    requested = []
+    queue = django_rq.get_queue('emails')
+    monkeypatch.setattr('auth_app.tasks.django_rq.get_queue', lambda name: requested.append(name) or queue)
+    queue.empty()
+    send_activation_email_async({'email': 'user@example.com'}, 'uid', 'token')
+    assert requested == ['emails']
+    assert queue.count == 1
+    queue.empty()
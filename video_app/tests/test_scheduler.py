@@ -0,0 +1,77 @@
+import threading
+import time
+from video_app.ffmpeg import RENDITIONS, build_multi_rendition_cmd, build_rendition_cmd
+from video_app.scheduler import encode_slot, plan_encode
+
+
+def test_throughput_policy_runs_more_narrow_encodes():
+    """Throughput packs many encodes with few threads, latency gives few encodes many threads"""
+    assert plan_encode(32, 'throughput', 0) == {'slots': 16, 'threads': 2, 'preset': 'medium'}
+    assert plan_encode(32, 'latency', 0) == {'slots': 4, 'threads': 8, 'preset': 'medium'}
+    assert plan_encode(2, 'latency', 0)['slots'] == 1
+
+
+def test_explicit_limit_and_queue_depth_preset():
+    """ENCODE_MAX_CONCURRENT overrides the core-based limit, a deep queue picks a faster preset"""
+    assert plan_encode(16, 'throughput', 5, max_concurrent=4) == {'slots': 4, 'threads': 4, 'preset': 'fast'}
+    assert plan_encode(16, 'throughput', 40)['preset'] == 'veryfast'
+
+
+def test_encoder_settings_reach_ffmpeg():
+    """Preset and threads are passed to x264 only when the scheduler hands them out"""
+    encoder = {'threads': 4, 'preset': 'fast'}
+    cmd = build_rendition_cmd('/in.mp4', '/out/480p', RENDITIONS['480p'], True, encoder)
+    assert cmd[cmd.index('-preset') + 1] == 'fast'
+    assert cmd[cmd.index('-threads') + 1] == '4'
+    cmd = build_multi_rendition_cmd('/in.mp4', '/out', RENDITIONS, True, encoder=encoder)
+    assert cmd[cmd.index('-preset') + 1] == 'fast'
+    assert '-preset' not in build_rendition_cmd('/in.mp4', '/out/480p', RENDITIONS['480p'], True,
+                                                {'threads': None, 'preset': None})
+
+
+def test_single_decode_splits_thread_budget_between_renditions():
+    """One ffmpeg with three x264 encoders stays within the slot's threads instead of tripling them"""
+    cmd = build_multi_rendition_cmd('/in.mp4', '/out', RENDITIONS, True, encoder={'threads': 6, 'preset': 'fast'})
+    assert cmd[cmd.index('-threads') + 1] == '2'
+    cmd = build_multi_rendition_cmd('/in.mp4', '/out', RENDITIONS, True, encoder={'threads': 2, 'preset': 'fast'})
+    assert cmd[cmd.index('-threads') + 1] == '1'
+
+
+def test_slots_limit_concurrent_encodes(settings, monkeypatch):
+    """A third encode waits until one of the two slots on the host is released"""
+    settings.ENCODE_MAX_CONCURRENT = 2
+    settings.ENCODE_SLOT_POLL = 0.05
+    monkeypatch.setattr('video_app.scheduler.queue_depth', lambda: 0)
+    release = threading.Event()
+    holding = []
+
+    def hold():
+        with encode_slot('holder'):
+            holding.append(True)
+            release.wait(5)
+
+    holders = [threading.Thread(target=hold) for _ in range(2)]
+    for holder in holders:
+        holder.start()
+    while len(holding) < 2:
+        time.sleep(0.01)
+    acquired = threading.Event()
+
+    def wait_for_slot():
+        with encode_slot('waiter'):
+            acquired.set()
+
+    waiter = threading.Thread(target=wait_for_slot)
+    waiter.start()
+    assert not acquired.wait(0.3)
+    release.set()
+    assert acquired.wait(5)
+    for thread in [*holders, waiter]:
+        thread.join()
+
+
+def test_disabled_scheduler_leaves_ffmpeg_defaults(settings):
+    """Without the scheduler encodes start immediately with ffmpeg's own defaults"""
+    settings.ENCODE_SCHEDULER_ENABLED = False
+    with encode_slot() as encoder:
+        assert encoder == {'threads': None, 'preset': None}
@@ -0,0 +1,76 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from video_app.models import Video
+from video_app.signing import expiry, sign_playlist, signature, verify
+
+
+def test_urls_issued_in_one_window_share_expiry(settings):
+    """Expiry is at least the TTL ahead and rounded to a quarter of it"""
+    settings.MEDIA_URL_TTL = 400
+    assert expiry(1001) == expiry(1100) == 1500
+    assert expiry(1101) == 1600
+
+
+def test_signature_is_bound_to_segment_and_expiry(settings):
+    """A signature only verifies for the exact location and expiry it was issued for, and only until then"""
+    sig = signature(7, '720p', 'segment_001.ts', 2000)
+    assert verify(7, '720p', 'segment_001.ts', '2000', sig, now=1000)
+    assert not verify(7, '720p', 'segment_002.ts', '2000', sig, now=1000)
+    assert not verify(8, '720p', 'segment_001.ts', '2000', sig, now=1000)
+    assert not verify(7, '720p', 'segment_001.ts', '2001', sig, now=1000)
+    assert not verify(7, '720p', 'segment_001.ts', '2000', sig, now=2001)
+    assert not verify(7, '720p', 'segment_001.ts', 'never', sig, now=1000)
+
+
+def test_playlist_segments_and_init_section_are_signed():
+    """Segment lines and EXT-X-MAP URIs get the query, tags stay untouched"""
+    playlist = '#EXTM3U\n#EXT-X-MAP:URI="stream.mp4",BYTERANGE="800@0"\n#EXTINF:4.0,\nstream.mp4\n#EXT-X-ENDLIST\n'
+    signed = sign_playlist(playlist, 3, '480p', 5000).splitlines()
+    query = f'?expires=5000&sig={signature(3, "480p", "stream.mp4", 5000)}'
+    assert signed[1] == f'#EXT-X-MAP:URI="stream.mp4{query}",BYTERANGE="800@0"'
+    assert signed[3] == f'stream.mp4{query}'
+    assert signed[4] == '#EXT-X-ENDLIST'
+
+
+@pytest.fixture
+def rendition(tmp_path, settings):
+    """Ready video with a one-segment 720p rendition"""
+    settings.MEDIA_ROOT = tmp_path
+    settings.MEDIA_SIGNED_URLS = True
+    video = Video.objects.create(title='Signed', file='videos/signed.mp4', status=Video.Status.READY)
+    out_dir = tmp_path / 'hls' / str(video.id) / '720p'
+    out_dir.mkdir(parents=True)
+    (out_dir / 'segment_000.ts').write_bytes(b'signed segment')
+    (out_dir / 'index.m3u8').write_text('#EXTM3U\n#EXTINF:4.0,\nsegment_000.ts\n#EXT-X-ENDLIST\n')
+    return video
+
+
+@pytest.mark.django_db
+def test_signed_segment_needs_no_login_and_no_queries(rendition, django_assert_num_queries):
+    """The signed URL from the playlist is served without JWT and without touching the database"""
+    user = get_user_model().objects.create_user(username='s@example.com', email='s@example.com', password='pw',
+                                                is_active=True)
+    viewer = APIClient()
+    viewer.force_authenticate(user)
+    playlist = viewer.get(reverse('video-stream', args=[rendition.id, '720p']))
+    assert playlist.status_code == status.HTTP_200_OK
+    segment_uri = playlist.content.decode().splitlines()[2]
+    assert segment_uri.startswith('segment_000.ts?expires=')
+    url = reverse('video-segment', args=[rendition.id, '720p', 'segment_000.ts']) + segment_uri[len('segment_000.ts'):]
+    with django_assert_num_queries(0):
+        response = APIClient().get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert b''.join(response.streaming_content) == b'signed segment'
+    assert response['Cache-Control'].startswith('public, max-age=')
+
+
+@pytest.mark.django_db
+def test_tampered_signature_is_rejected(rendition):
+    """A signature for another segment, or none at all without login, is refused"""
+    url = reverse('video-segment', args=[rendition.id, '720p', 'segment_000.ts'])
+    sig = signature(rendition.id, '720p', 'segment_999.ts', expiry())
+    assert APIClient().get(f'{url}?expires={expiry()}&sig={sig}').status_code == status.HTTP_403_FORBIDDEN
+    assert APIClient().get(url).status_code == status.HTTP_403_FORBIDDEN
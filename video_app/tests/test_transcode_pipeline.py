@@ -0,0 +1,137 @@
+import os
+import pytest
+import django_rq
+from video_app.ffmpeg import RENDITIONS
+from video_app.models import Video
+from video_app.probe import ProbeError
+from video_app.tasks import (
+    COMPLETE_MARKER, TranscodeError, enqueue_fanout, finalize_transcode,
+    transcode_audio_job, transcode_rendition_job, generate_thumbnail_job, plan_transcode, set_status,
+)
+
+
+def write_playlist(base_dir, res, finished=True):
+    """Write a minimal rendition playlist, optionally without the end tag"""
+    out_dir = base_dir / res
+    out_dir.mkdir(parents=True, exist_ok=True)
+    body = '#EXTM3U\n#EXTINF:4.0,\nsegment_000.ts\n'
+    if finished:
+        body += '#EXT-X-ENDLIST\n'
+    (out_dir / 'index.m3u8').write_text(body)
+    (out_dir / 'segment_000.ts').write_bytes(b'ts')
+
+
+@pytest.mark.django_db
+def test_finalize_marks_video_complete(tmp_path, settings):
+    """Finalizer writes the completion marker when every rendition is finished and the video becomes ready"""
+    settings.MEDIA_ROOT = tmp_path
+    video = Video.objects.create(title='Finished', file='videos/finished.mp4', status=Video.Status.TRANSCODING)
+    base_dir = tmp_path / 'hls' / str(video.id)
+    for res in RENDITIONS:
+        write_playlist(base_dir, res)
+    finalize_transcode(video.id)
+    assert (base_dir / COMPLETE_MARKER).exists()
+    assert (base_dir / 'master.m3u8').exists()
+    video.refresh_from_db()
+    assert video.status == Video.Status.READY
+    assert video.ready_at is not None
+
+
+@pytest.mark.django_db
+def test_finalize_rejects_unfinished_rendition(tmp_path, settings):
+    """Finalizer fails and writes no marker if one playlist has no end tag"""
+    settings.MEDIA_ROOT = tmp_path
+    base_dir = tmp_path / 'hls' / '8'
+    write_playlist(base_dir, '480p')
+    write_playlist(base_dir, '720p', finished=False)
+    with pytest.raises(TranscodeError):
+        finalize_transcode(8)
+    assert not os.path.exists(base_dir / COMPLETE_MARKER)
+
+
+def test_fanout_enqueues_parts_and_dependent_finalizer():
+    """One job per rendition plus a thumbnail job, the finalizer waits for all of them"""
+    queue = django_rq.get_queue('default')
+    queue.empty()
+    info = {'has_audio': True, 'duration': 30.0}
+    finalizer = enqueue_fanout(9, '/media/videos/source.mp4', list(RENDITIONS), info)
+    queued = queue.get_jobs()
+    assert [job.func for job in queued].count(transcode_rendition_job) == len(RENDITIONS)
+    assert generate_thumbnail_job in [job.func for job in queued]
+    assert finalizer.get_status() == 'deferred'
+    assert set(finalizer.dependency_ids) == {job.id for job in queued}
+    queue.empty()
+
+
+def test_fanout_encodes_shared_audio_once(settings):
+    """With shared audio a single audio job runs next to the video-only rendition jobs"""
+    settings.HLS_SHARED_AUDIO = True
+    queue = django_rq.get_queue('default')
+    queue.empty()
+    finalizer = enqueue_fanout(10, '/media/videos/source.mp4', list(RENDITIONS), {'has_audio': True, 'duration': 30.0})
+    audio_jobs = [job for job in queue.get_jobs() if job.func == transcode_audio_job]
+    assert len(audio_jobs) == 1
+    assert audio_jobs[0].id in finalizer.dependency_ids
+    queue.empty()
+    enqueue_fanout(11, '/media/videos/silent.mp4', list(RENDITIONS), {'has_audio': False, 'duration': 30.0})
+    assert transcode_audio_job not in [job.func for job in queue.get_jobs()]
+    queue.empty()
+
+
+@pytest.mark.django_db
+def test_finalize_requires_complete_audio_rendition(tmp_path, settings):
+    """A started but unfinished audio rendition keeps the video from becoming ready"""
+    settings.MEDIA_ROOT = tmp_path
+    base_dir = tmp_path / 'hls' / '12'
+    write_playlist(base_dir, '480p')
+    write_playlist(base_dir, 'audio', finished=False)
+    with pytest.raises(TranscodeError):
+        finalize_transcode(12, ['480p'])
+    write_playlist(base_dir, 'audio')
+    finalize_transcode(12, ['480p'])
+    assert 'AUDIO="audio"' in (base_dir / 'master.m3u8').read_text()
+
+
+@pytest.mark.django_db
+def test_unreadable_upload_is_marked_failed(tmp_path, monkeypatch):
+    """A source ffprobe cannot read ends in the failed state with the reason recorded"""
+    source = tmp_path / 'broken.mp4'
+    source.write_bytes(b'not a video')
+
+    def reject(path):
+        raise ProbeError('Source has no video stream')
+
+    monkeypatch.setattr('video_app.tasks.probe_source', reject)
+    video = Video.objects.create(title='Broken', file='videos/broken.mp4')
+    plan_transcode(video.id, str(source))
+    video.refresh_from_db()
+    assert video.status == Video.Status.FAILED
+    assert video.failure_reason == 'Source has no video stream'
+    assert video.status_changed_at is not None
+
+
+@pytest.mark.django_db
+def test_late_failure_keeps_ready_video():
+    """A leftover job failing after the video became ready does not take it offline"""
+    video = Video.objects.create(title='Done', file='videos/done.mp4', status=Video.Status.READY)
+    set_status(video.id, Video.Status.FAILED, 'late failure')
+    video.refresh_from_db()
+    assert video.status == Video.Status.READY
+
+
+@pytest.mark.django_db
+def test_probed_metadata_is_stored_on_video(tmp_path, settings, monkeypatch):
+    """Planning saves runtime, resolution, codecs and file size on the Video row"""
+    settings.MEDIA_ROOT = tmp_path
+    source = tmp_path / 'clip.mp4'
+    source.write_bytes(b'x' * 2048)
+    info = {'width': 1280, 'height': 720, 'duration': 42.5, 'video_codec': 'h264',
+            'audio_codec': 'aac', 'bitrate': 1_500_000, 'has_audio': True}
+    monkeypatch.setattr('video_app.tasks.probe_source', lambda path: info)
+    video = Video.objects.create(title='Clip', file='videos/clip.mp4')
+    plan_transcode(video.id, str(source))
+    video.refresh_from_db()
+    assert (video.duration, video.width, video.height) == (42.5, 1280, 720)
+    assert (video.video_codec, video.audio_codec, video.bitrate) == ('h264', 'aac', 1_500_000)
+    assert video.file_size == 2048
+    assert video.status == Video.Status.TRANSCODING
@@ -0,0 +1,65 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from video_app.ffmpeg import RENDITIONS, build_multi_rendition_cmd
+from video_app.models import Video
+from video_app.trickplay import build_vtt, trickplay_params
+
+PARAMS = {'interval': 10, 'width': 160, 'height': 90, 'columns': 2, 'rows': 2, 'pattern': '/out/trickplay/sprite_%03d.jpg'}
+
+
+def test_vtt_maps_time_ranges_to_tiles():
+    """Cues walk through the tiles row by row and continue on the next sheet"""
+    vtt = build_vtt(45.0, PARAMS)
+    lines = vtt.splitlines()
+    assert lines[0] == 'WEBVTT'
+    assert '00:00:00.000 --> 00:00:10.000' in lines
+    assert 'sprite_001.jpg#xywh=0,0,160,90' in lines
+    assert 'sprite_001.jpg#xywh=160,90,160,90' in lines
+    assert '00:00:40.000 --> 00:00:45.000' in lines
+    assert 'sprite_002.jpg#xywh=0,0,160,90' in lines
+
+
+def test_sprites_and_poster_share_the_rendition_decode():
+    """Sprite sheets and the poster are extra outputs of the single-decode command"""
+    poster = {'time': 2.0, 'path': '/media/thumbnails/1.jpg'}
+    cmd = build_multi_rendition_cmd('/in.mp4', '/out', RENDITIONS, True, trickplay=PARAMS, poster=poster)
+    assert cmd.count('-i') == 1
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert graph.startswith('[0:v]split=5[v0][v1][v2][psprites][pposter]')
+    assert '[psprites]fps=1/10,scale=160:90,tile=2x2[sprites]' in graph
+    assert cmd[cmd.index('[sprites]') + 1:][-1] == '/media/thumbnails/1.jpg'
+    assert PARAMS['pattern'] in cmd
+
+
+@pytest.mark.django_db
+def test_trickplay_files_are_served(tmp_path, settings):
+    """Authenticated clients get the VTT index and sprite sheets, other names are rejected"""
+    User = get_user_model()
+    user = User.objects.create_user(username='scrub@example.com', email='scrub@example.com',
+                                    password='StrongP@ssw0rd', is_active=True)
+    client = APIClient()
+    assert client.post(reverse('login'), {'email': user.email, 'password': 'StrongP@ssw0rd'}, format='json').status_code == 200
+    video = Video.objects.create(title='Scrub', category='Demo', file='videos/scrub.mp4', status=Video.Status.READY)
+    out_dir = tmp_path / 'hls' / str(video.id) / 'trickplay'
+    out_dir.mkdir(parents=True)
+    (out_dir / 'thumbnails.vtt').write_text('WEBVTT\n')
+    (out_dir / 'sprite_001.jpg').write_bytes(b'jpeg')
+    settings.MEDIA_ROOT = tmp_path
+    response = client.get(reverse('video-trickplay', args=[video.id, 'thumbnails.vtt']))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == 'text/vtt'
+    response = client.get(reverse('video-trickplay', args=[video.id, 'sprite_001.jpg']))
+    assert b''.join(response.streaming_content) == b'jpeg'
+    response = client.get(reverse('video-trickplay', args=[video.id, 'index.m3u8']))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_short_clips_are_sampled_more_often(tmp_path, settings):
+    """Sources shorter than two intervals still get at least one sampled frame per half duration"""
+    settings.TRICKPLAY_INTERVAL = 10
+    info = {'width': 1280, 'height': 720, 'duration': 3.0}
+    assert trickplay_params(str(tmp_path), info)['interval'] == 1
+    assert trickplay_params(str(tmp_path), {**info, 'duration': 600.0})['interval'] == 10
@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import io
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from video_app.models import UploadSession, Video
+from video_app.uploads import UploadError, append_chunk, parse_metadata
+
+CONTENT = b'0123456789' * 100
+
+
+def b64(value) -> str:
+    """Base64 text of a str or bytes value"""
+    return base64.b64encode(value.encode() if isinstance(value, str) else value).decode()
+
+
+@pytest.fixture
+def staff_client(db):
+    """APIClient logged in as a staff user"""
+    User = get_user_model()
+    user = User.objects.create_user(username='uploader@example.com', email='uploader@example.com',
+                                    password='StrongP@ssw0rd', is_active=True, is_staff=True)
+    client = APIClient()
+    assert client.post(reverse('login'), {'email': user.email, 'password': 'StrongP@ssw0rd'}, format='json').status_code == 200
+    return client
+
+
+def start_upload(client, length=len(CONTENT)):
+    """Create an upload and return its URL"""
+    response = client.post(reverse('upload-create'), HTTP_UPLOAD_LENGTH=str(length),
+                           HTTP_UPLOAD_METADATA=f'filename {b64("movie.mp4")},title {b64("My Movie")}')
+    assert response.status_code == status.HTTP_201_CREATED
+    return response['Location']
+
+
+def send_chunk(client, url, offset, chunk, **headers):
+    """PATCH one chunk at offset"""
+    return client.generic('PATCH', url, chunk, content_type='application/offset+octet-stream',
+                          HTTP_UPLOAD_OFFSET=str(offset), **headers)
+
+
+def test_metadata_header_is_decoded():
+    """Upload-Metadata pairs are base64 decoded, keys without value become empty strings"""
+    assert parse_metadata(f'filename {b64("a.mp4")},is_confidential') == {'filename': 'a.mp4', 'is_confidential': ''}
+
+
+def test_upload_in_chunks_creates_video(staff_client, tmp_path, settings):
+    """Chunks are appended at the tracked offset and the last one creates the Video"""
+    settings.MEDIA_ROOT = tmp_path
+    url = start_upload(staff_client)
+    response = send_chunk(staff_client, url, 0, CONTENT[:400])
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response['Upload-Offset'] == '400'
+    assert staff_client.head(url)['Upload-Offset'] == '400'
+    checksum = f'sha256 {b64(hashlib.sha256(CONTENT[400:]).digest())}'
+    response = send_chunk(staff_client, url, 400, CONTENT[400:], HTTP_UPLOAD_CHECKSUM=checksum)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    video = Video.objects.get(pk=response['Video-Id'])
+    assert video.title == 'My Movie'
+    assert video.file.name == 'videos/movie.mp4'
+    assert (tmp_path / 'videos' / 'movie.mp4').read_bytes() == CONTENT
+    assert not list((tmp_path / 'uploads').iterdir())
+
+
+def test_wrong_offset_and_bad_checksum_are_rejected(staff_client, tmp_path, settings):
+    """A chunk for another offset conflicts, a corrupted chunk is discarded and can be resent"""
+    settings.MEDIA_ROOT = tmp_path
+    url = start_upload(staff_client)
+    assert send_chunk(staff_client, url, 100, CONTENT[100:200]).status_code == status.HTTP_409_CONFLICT
+    checksum = f'sha256 {b64(hashlib.sha256(b"something else").digest())}'
+    response = send_chunk(staff_client, url, 0, CONTENT[:100], HTTP_UPLOAD_CHECKSUM=checksum)
+    assert response.status_code == 460
+    assert UploadSession.objects.get().offset == 0
+    assert send_chunk(staff_client, url, 0, CONTENT[:100]).status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_overlapping_append_is_rejected_before_writing(staff_client, tmp_path, settings):
+    """A resent chunk arriving while the first attempt still streams gets 409 and leaves the file alone"""
+    settings.MEDIA_ROOT = tmp_path
+    start_upload(staff_client)
+    session = UploadSession.objects.get()
+    rejected = []
+
+    class SlowStream:
+        """Request body that triggers the retry while the first request is mid-chunk"""
+        def __init__(self, data):
+            self.data = data
+
+        def read(self, size):
+            if not rejected:
+                with pytest.raises(UploadError) as retry:
+                    append_chunk(UploadSession.objects.get(), 0, io.BytesIO(b'x' * 50), 50)
+                rejected.append(retry.value.status)
+            block, self.data = self.data[:size], self.data[size:]
+            return block
+
+    assert append_chunk(session, 0, SlowStream(CONTENT[:100]), 100) == 100
+    assert rejected == [409]
+    assert (tmp_path / 'uploads' / f'{session.id}.part').read_bytes() == CONTENT[:100]
+    assert UploadSession.objects.get().offset == 100
+
+
+def test_upload_can_be_aborted(staff_client, tmp_path, settings):
+    """DELETE removes the session and its temp file"""
+    settings.MEDIA_ROOT = tmp_path
+    url = start_upload(staff_client)
+    send_chunk(staff_client, url, 0, CONTENT[:100])
+    assert staff_client.delete(url).status_code == status.HTTP_204_NO_CONTENT
+    assert not UploadSession.objects.exists()
+    assert not list((tmp_path / 'uploads').iterdir())
+    assert staff_client.head(url).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_uploads_require_staff():
+    """Regular users cannot start uploads"""
+    User = get_user_model()
+    user = User.objects.create_user(username='viewer@example.com', email='viewer@example.com',
+                                    password='StrongP@ssw0rd', is_active=True)
+    client = APIClient()
+    client.post(reverse('login'), {'email': user.email, 'password': 'StrongP@ssw0rd'}, format='json')
+    response = client.post(reverse('upload-create'), HTTP_UPLOAD_LENGTH='10',
+                           HTTP_UPLOAD_METADATA=f'filename {b64("a.mp4")}')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -57,13 +57,15 @@ def test_video_list_returns_videos_when_authenticated(api_client, active_user):
         title='Movie Title',
         description='Movie Description',
         category='Drama',
-        file='videos/test1.mp4'
+        file='videos/test1.mp4',
+        status=Video.Status.READY
     )
     Video.objects.create(
         title='Another Movie',
         description='Another Description',
         category='Romance',
-        file='videos/test2.mp4'
+        file='videos/test2.mp4',
+        status=Video.Status.READY
     )
     url = reverse('video-list')
     response = api_client.get(url)
@@ -94,4 +96,18 @@ def test_video_list_empty_when_no_items(api_client, active_user):
     url = reverse('video-list')
     response = api_client.get(url)
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == []
\ No newline at end of file
+    assert response.json() == []
+
+
+@pytest.mark.django_db
+def test_video_list_hides_unfinished_videos(api_client, active_user):
+    """Videos that are still processing or failed are not listed"""
+    login_resp = api_client.post(reverse('login'), {'email': active_user.email, 'password': 'StrongP@ssw0rd'}, format='json')
+    api_client.cookies = login_resp.cookies
+    Video.objects.create(title='Ready', file='videos/ready.mp4', status=Video.Status.READY, duration=95.0, height=1080)
+    Video.objects.create(title='Encoding', file='videos/encoding.mp4', status=Video.Status.TRANSCODING)
+    Video.objects.create(title='Broken', file='videos/broken.mp4', status=Video.Status.FAILED)
+    response = api_client.get(reverse('video-list'))
+    assert [video['title'] for video in response.json()] == ['Ready']
+    assert response.json()[0]['duration'] == 95.0
+    assert response.json()[0]['height'] == 1080
@@ -0,0 +1,82 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from video_app.models import Video
+from video_app.progress import ProgressReporter, get_progress, progress_key
+import django_rq
+
+
+@pytest.fixture
+def logged_in_client(db):
+    """APIClient carrying the JWT cookies of an active user"""
+    User = get_user_model()
+    user = User.objects.create_user(
+        username='progress@example.com',
+        email='progress@example.com',
+        password='StrongP@ssw0rd',
+        is_active=True
+    )
+    client = APIClient()
+    login_resp = client.post(reverse('login'), {'email': user.email, 'password': 'StrongP@ssw0rd'}, format='json')
+    assert login_resp.status_code == 200
+    return client
+
+
+def test_reporter_computes_percent_speed_and_eta(settings):
+    """A progress block halfway through a 60s source at 2x speed leaves 15s"""
+    settings.VIDEO_PROGRESS_INTERVAL = 0
+    reporter = ProgressReporter(1, ['720p'], 60.0)
+    stats = reporter.stats({'out_time_us': '30000000', 'speed': '2.0x', 'progress': 'continue'}, False)
+    assert stats['state'] == 'running'
+    assert stats['percent'] == 50.0
+    assert stats['speed'] == 2.0
+    assert stats['eta_seconds'] == 15
+
+
+def test_reporter_handles_missing_values():
+    """ffmpeg reports N/A before the first frame is encoded"""
+    reporter = ProgressReporter(1, ['720p'], 60.0)
+    stats = reporter.stats({'out_time_us': 'N/A', 'speed': 'N/A'}, False)
+    assert stats['percent'] == 0.0
+    assert stats['eta_seconds'] is None
+
+
+def test_reporter_throttles_updates(settings):
+    """Only the first block inside the interval and the final block are published"""
+    settings.VIDEO_PROGRESS_INTERVAL = 3600
+    connection = django_rq.get_connection('default')
+    connection.delete(progress_key(41))
+    reporter = ProgressReporter(41, ['480p', '720p'], 10.0)
+    reporter({'out_time_us': '1000000', 'speed': '1x', 'progress': 'continue'})
+    reporter({'out_time_us': '5000000', 'speed': '1x', 'progress': 'continue'})
+    assert get_progress(41)['720p']['percent'] == 10.0
+    reporter({'out_time_us': '10000000', 'speed': '1x', 'progress': 'end'})
+    progress = get_progress(41)
+    assert progress['480p']['state'] == 'done'
+    assert progress['720p']['percent'] == 100.0
+    connection.delete(progress_key(41))
+
+
+@pytest.mark.django_db
+def test_progress_endpoint_returns_published_stats(logged_in_client, settings):
+    """Authenticated clients read per-rendition progress of a video"""
+    settings.VIDEO_PROGRESS_INTERVAL = 0
+    video = Video.objects.create(title='Progress', category='Demo', file='videos/progress.mp4')
+    django_rq.get_connection('default').delete(progress_key(video.id))
+    ProgressReporter(video.id, ['480p'], 20.0)({'out_time_us': '5000000', 'speed': '1.5x', 'progress': 'continue'})
+    response = logged_in_client.get(reverse('video-progress', args=[video.id]))
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data['video_id'] == video.id
+    assert data['percent'] == 25.0
+    assert data['renditions']['480p']['speed'] == 1.5
+    django_rq.get_connection('default').delete(progress_key(video.id))
+
+
+@pytest.mark.django_db
+def test_queue_progress_requires_admin(logged_in_client):
+    """The queue-wide overview is limited to staff users"""
+    response = logged_in_client.get(reverse('video-progress-list'))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
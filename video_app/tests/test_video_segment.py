@@ -21,7 +21,7 @@ def test_segment_found(tmp_path, settings):
     login_url = reverse('login')
     login_resp = client.post(login_url, {'email': user.email, 'password': 'StrongP@ssw0rd'}, format='json')
     assert login_resp.status_code == 200
-    video = Video.objects.create(title='SegmentTest', category='Demo', file='videos/test.mp4')
+    video = Video.objects.create(title='SegmentTest', category='Demo', file='videos/test.mp4', status=Video.Status.READY)
     seg_dir = tmp_path / "hls" / str(video.id) / "720p"
     seg_dir.mkdir(parents=True)
     seg_path = seg_dir / "index0.ts"
@@ -49,8 +49,75 @@ def test_segment_not_found(tmp_path, settings):
     login_url = reverse('login')
     login_resp = client.post(login_url, {'email': user.email, 'password': 'StrongP@ssw0rd'}, format='json')
     assert login_resp.status_code == 200
-    video = Video.objects.create(title='MissingSegment', category='Demo', file='videos/test2.mp4')
+    video = Video.objects.create(title='MissingSegment', category='Demo', file='videos/test2.mp4', status=Video.Status.READY)
     settings.MEDIA_ROOT = tmp_path
     url = reverse('video-segment', args=[video.id, '720p', 'missing.ts'])
     response = client.get(url)
-    assert response.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_segment_byte_range(tmp_path, settings):
+    """Range requests into a single-file fMP4 rendition return 206 with only the requested bytes"""
+    User = get_user_model()
+    user = User.objects.create_user(
+        username='streamer3@example.com',
+        email='streamer3@example.com',
+        password='StrongP@ssw0rd',
+        is_active=True
+    )
+    client = APIClient()
+    login_resp = client.post(reverse('login'), {'email': user.email, 'password': 'StrongP@ssw0rd'}, format='json')
+    assert login_resp.status_code == 200
+    video = Video.objects.create(title='RangeTest', category='Demo', file='videos/test3.mp4', status=Video.Status.READY)
+    seg_dir = tmp_path / "hls" / str(video.id) / "720p"
+    seg_dir.mkdir(parents=True)
+    (seg_dir / "stream.mp4").write_bytes(b"0123456789")
+    settings.MEDIA_ROOT = tmp_path
+    url = reverse('video-segment', args=[video.id, '720p', 'stream.mp4'])
+    response = client.get(url, HTTP_RANGE='bytes=2-5')
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response['Content-Type'] == 'video/mp4'
+    assert response['Content-Range'] == 'bytes 2-5/10'
+    assert b''.join(response.streaming_content) == b"2345"
+    response = client.get(url, HTTP_RANGE='bytes=-3')
+    assert b''.join(response.streaming_content) == b"789"
+    response = client.get(url, HTTP_RANGE='bytes=20-')
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response['Content-Range'] == 'bytes */10'
+
+
+@pytest.mark.django_db
+def test_segment_is_offloaded_to_proxy(tmp_path, settings):
+    """With X-Accel delivery Django only authorises and names the internal location, nginx sends the bytes"""
+    settings.MEDIA_ROOT = tmp_path
+    settings.MEDIA_DELIVERY = 'x-accel'
+    settings.MEDIA_ACCEL_PREFIX = '/protected-media/'
+    User = get_user_model()
+    user = User.objects.create_user(username='proxy@example.com', email='proxy@example.com', password='pw', is_active=True)
+    client = APIClient()
+    client.force_authenticate(user)
+    video = Video.objects.create(title='Proxied', file='videos/proxied.mp4', status=Video.Status.READY)
+    seg_dir = tmp_path / 'hls' / str(video.id) / '720p'
+    seg_dir.mkdir(parents=True)
+    (seg_dir / 'segment_000.ts').write_bytes(b'x' * 100)
+    response = client.get(reverse('video-segment', args=[video.id, '720p', 'segment_000.ts']),
+                          HTTP_RANGE='bytes=0-9')
+    assert response.status_code == status.HTTP_200_OK
+    assert response['X-Accel-Redirect'] == f'/protected-media/hls/{video.id}/720p/segment_000.ts'
+    assert response['Content-Type'] == 'video/MP2T'
+    assert response.content == b''
+    settings.MEDIA_DELIVERY = 'x-sendfile'
+    response = client.get(reverse('video-segment', args=[video.id, '720p', 'segment_000.ts']))
+    assert response['X-Sendfile'] == str(seg_dir / 'segment_000.ts')
+
+
+@pytest.mark.django_db
+def test_offload_still_requires_authentication(tmp_path, settings):
+    """Anonymous requests never reach the internal redirect"""
+    settings.MEDIA_ROOT = tmp_path
+    settings.MEDIA_DELIVERY = 'x-accel'
+    video = Video.objects.create(title='Private', file='videos/private.mp4', status=Video.Status.READY)
+    response = APIClient().get(reverse('video-segment', args=[video.id, '720p', 'segment_000.ts']))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert 'X-Accel-Redirect' not in response
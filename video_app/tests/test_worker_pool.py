@@ -0,0 +1,75 @@
+import os
+import time
+from core.workers import WorkerSupervisor
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll condition until it is true or timeout seconds passed"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_recycled_worker_is_replaced(settings):
+    """A worker that exits after its job budget is restarted in the same slot"""
+    settings.RQ_WORKER_RESPAWN_DELAY = 0
+    supervisor = WorkerSupervisor(['default'], 2, max_jobs=1, target=lambda slot: None)
+    supervisor.start()
+    first_pids = {slot: state['pid'] for slot, state in supervisor.slots.items()}
+
+    def all_restarted():
+        supervisor.reap()
+        return all(state['restarts'] >= 1 for state in supervisor.slots.values())
+
+    assert wait_for(all_restarted)
+    assert all(supervisor.slots[slot]['pid'] != pid for slot, pid in first_pids.items())
+    assert all(state['last_exit'] == 0 for state in supervisor.slots.values())
+    supervisor.stop(timeout=5)
+    assert supervisor.alive() == []
+
+
+def gone(pid: int) -> bool:
+    """True once a process has exited, zombies waiting for another parent included"""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            return stat.read().rsplit(')', 1)[1].split()[0] == 'Z'
+    except FileNotFoundError:
+        return True
+
+
+def test_stop_waits_for_workers_then_kills(settings, tmp_path, monkeypatch):
+    """Workers get SIGTERM first; one that ignores it is killed with its children after the timeout"""
+    monkeypatch.setattr('core.workers.COLD_SHUTDOWN_GRACE', 0.5)
+    child_pid_file = tmp_path / 'child.pid'
+
+    def stubborn(slot):
+        import signal
+        import subprocess
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        child = subprocess.Popen(['sleep', '30'])
+        child_pid_file.write_text(str(child.pid))
+        time.sleep(30)
+
+    supervisor = WorkerSupervisor(['default'], 1, target=stubborn)
+    supervisor.start()
+    pid = supervisor.slots[0]['pid']
+    assert wait_for(child_pid_file.exists)
+    child_pid = int(child_pid_file.read_text())
+    started = time.monotonic()
+    supervisor.stop(timeout=0.5)
+    assert time.monotonic() - started < 5
+    assert supervisor.alive() == []
+    assert not os.path.exists(f'/proc/{pid}')
+    assert wait_for(lambda: gone(child_pid))
+
+
+def test_health_reports_every_slot(settings):
+    """The health report lists process state per slot, even for workers that are not registered yet"""
+    supervisor = WorkerSupervisor(['default'], 1, target=lambda slot: time.sleep(30))
+    supervisor.start()
+    report = supervisor.health()
+    assert report[0]['slot'] == 0
+    assert report[0]['alive'] is True
+    assert report[0]['restarts'] == 0
+    supervisor.stop(timeout=0.5)
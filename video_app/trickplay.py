@@ -0,0 +1,66 @@
+"""Seek-preview sprite sheets and the WebVTT index that maps playback time to sprite tiles"""
+import math
+import os
+from django.conf import settings
+
+
+TRICKPLAY_DIR = 'trickplay'
+VTT_NAME = 'thumbnails.vtt'
+SPRITE_PATTERN = 'sprite_%03d.jpg'
+
+
+def trickplay_params(base_dir: str, info: dict) -> dict:
+    """
+    Sprite geometry for a source: fixed tile width, height following the source aspect ratio
+    Clips shorter than two intervals are sampled more often, otherwise ffmpeg's fps filter
+    emits no frame before the end of the stream and the sprite output fails
+    Creates base_dir/trickplay/ where the sheets are written
+    """
+    out_dir = os.path.join(base_dir, TRICKPLAY_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    width = settings.TRICKPLAY_WIDTH
+    height = max(2, round(width * info['height'] / info['width'] / 2) * 2)
+    return {
+        'interval': max(1, min(settings.TRICKPLAY_INTERVAL, int(info['duration'] // 2))),
+        'width': width,
+        'height': height,
+        'columns': settings.TRICKPLAY_COLUMNS,
+        'rows': settings.TRICKPLAY_ROWS,
+        'pattern': os.path.join(out_dir, SPRITE_PATTERN),
+    }
+
+
+def format_timestamp(seconds: float) -> str:
+    """WebVTT timestamp, e.g. 00:01:05.500"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f'{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}'
+
+
+def build_vtt(duration: float, params: dict) -> str:
+    """One cue per sampled frame pointing at its tile via a media fragment (#xywh=x,y,w,h)"""
+    interval = params['interval']
+    per_sheet = params['columns'] * params['rows']
+    lines = ['WEBVTT', '']
+    for index in range(math.ceil(duration / interval)):
+        start, end = index * interval, min((index + 1) * interval, duration)
+        sheet, position = divmod(index, per_sheet)
+        x = (position % params['columns']) * params['width']
+        y = (position // params['columns']) * params['height']
+        sprite = SPRITE_PATTERN % (sheet + 1)
+        lines += [
+            f'{format_timestamp(start)} --> {format_timestamp(end)}',
+            f'{sprite}#xywh={x},{y},{params["width"]},{params["height"]}',
+            '',
+        ]
+    return '\n'.join(lines)
+
+
+def write_vtt(base_dir: str, duration: float, params: dict) -> str:
+    """Write base_dir/trickplay/thumbnails.vtt and return its path"""
+    path = os.path.join(base_dir, TRICKPLAY_DIR, VTT_NAME)
+    with open(path, 'w') as vtt:
+        vtt.write(build_vtt(duration, params))
+    return path
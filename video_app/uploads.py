@@ -0,0 +1,153 @@
+"""Resumable uploads in the style of the tus protocol: offset-tracked chunks appended to a temp file on disk"""
+import base64
+import binascii
+import fcntl
+import hashlib
+import logging
+import os
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from video_app.models import UploadSession, Video
+
+logger = logging.getLogger(__name__)
+
+TUS_VERSION = '1.0.0'
+UPLOAD_DIR = 'uploads'
+BLOCK_SIZE = 1024 * 1024
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+
+
+class UploadError(Exception):
+    """Raised when an upload request cannot be accepted, carries the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_metadata(header: str) -> dict:
+    """Decode an Upload-Metadata header: comma separated 'key base64value' pairs"""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode() if value else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f'Upload-Metadata value for {key} is not valid base64', 400)
+    return metadata
+
+
+def parse_checksum(header: str):
+    """Split an Upload-Checksum header ('sha256 base64digest') into algorithm and raw digest"""
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(' ')
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(f'Unsupported checksum algorithm {algorithm}', 400)
+    try:
+        return algorithm, base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise UploadError('Upload-Checksum digest is not valid base64', 400)
+
+
+def part_path(session: UploadSession) -> str:
+    """Temp file the chunks of an upload are written to"""
+    return os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR, f'{session.id}.part')
+
+
+def create_upload(user, length: int, metadata: dict) -> UploadSession:
+    """Register a new upload of length bytes and create its empty temp file"""
+    if length <= 0:
+        raise UploadError('Upload-Length must be positive', 400)
+    if length > settings.UPLOAD_MAX_SIZE:
+        raise UploadError(f'Uploads are limited to {settings.UPLOAD_MAX_SIZE} bytes', 413)
+    filename = os.path.basename(metadata.get('filename', ''))
+    if not filename:
+        raise UploadError('Upload-Metadata must contain a filename', 400)
+    session = UploadSession.objects.create(
+        user=user,
+        filename=filename,
+        title=metadata.get('title') or os.path.splitext(filename)[0],
+        description=metadata.get('description', ''),
+        category=metadata.get('category') or None,
+        length=length,
+    )
+    os.makedirs(os.path.dirname(part_path(session)), exist_ok=True)
+    open(part_path(session), 'wb').close()
+    logger.info(f'Upload {session.id} started: {filename}, {length} bytes')
+    return session
+
+
+def append_chunk(session: UploadSession, offset: int, stream, length: int, checksum=None) -> int:
+    """
+    Write length bytes from stream at offset and return the new upload offset
+    The chunk is hashed while it is written, so verifying Upload-Checksum needs no second read
+    Without a checksum an interrupted chunk keeps the bytes that arrived, with one it is discarded
+    The temp file is locked before the offset is checked and stays locked until the new offset is stored:
+    a client that resends a chunk while its first attempt is still streaming gets 409 instead of
+    writing into (or truncating) the same bytes
+    """
+    if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError(f'Chunks are limited to {settings.UPLOAD_CHUNK_MAX_SIZE} bytes', 413)
+    if offset + length > session.length:
+        raise UploadError('Chunk exceeds Upload-Length', 413)
+    digest = hashlib.new(checksum[0]) if checksum else None
+    written = 0
+    with open(part_path(session), 'r+b') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError('Another request is still writing to this upload', 409)
+        session.refresh_from_db(fields=['offset'])
+        if offset != session.offset:
+            raise UploadError(f'Upload-Offset {offset} does not match current offset {session.offset}', 409)
+        part.seek(offset)
+        try:
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                part.write(block)
+                if digest:
+                    digest.update(block)
+                written += len(block)
+        except OSError as e:
+            logger.warning(f'Upload {session.id} interrupted at {offset + written} bytes: {e}')
+        if checksum and (written != length or digest.digest() != checksum[1]):
+            part.truncate(offset)
+            raise UploadError('Checksum mismatch', 460)
+        part.truncate(offset + written)
+        moved = UploadSession.objects.filter(pk=session.pk, offset=offset).update(
+            offset=offset + written, updated_at=timezone.now()
+        )
+    if not moved:
+        raise UploadError('Upload was modified by a concurrent request', 409)
+    session.offset = offset + written
+    return session.offset
+
+
+def complete_upload(session: UploadSession) -> Video:
+    """
+    Move the finished temp file into videos/ and create the Video, which triggers transcoding
+    os.replace renames within MEDIA_ROOT, so the file is never copied
+    """
+    name = default_storage.get_available_name(os.path.join('videos', get_valid_filename(session.filename)))
+    target = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(part_path(session), target)
+    video = Video.objects.create(
+        title=session.title, description=session.description, category=session.category, file=name
+    )
+    session.video = video
+    session.save(update_fields=['video', 'updated_at'])
+    logger.info(f'Upload {session.id} completed as video {video.id}')
+    return video
+
+
+def delete_upload(session: UploadSession):
+    """Drop an upload and its temp file"""
+    if os.path.exists(part_path(session)):
+        os.remove(part_path(session))
+    session.delete()